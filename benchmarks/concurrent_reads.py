@@ -0,0 +1,85 @@
+"""
+Read throughput of concurrent session by number of threads on read-heavy mix(every thread runs queries, every
+``write_every``-th operation is insert or update). Run: ``python -m benchmarks.concurrent_reads``
+
+Threads of one process share GIL, so reads scale only while they run outside of it(numpy scans of columnar tables) and
+only with free CPU cores.
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+
+import src.constants as cst
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.table import DictConstraints
+
+_isbns = itertools.count(10 ** 12)
+
+
+def make_session(rows: int, columnar: bool, concurrent: bool) -> DatabaseSession:
+    session = DatabaseSession(concurrent=concurrent)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), columnar=columnar)
+    session.create_idx("library", "range", "year")
+    rng = random.Random(1)
+    session.insert_many("library", [
+        Book(f"Title {n}", rng.choice(cst.DEFAULT_AUTHORS), rng.randint(1800, 2020), rng.choice(cst.DEFAULT_GENRES), n,
+             rng.randint(20, 600))
+        for n in range(rows)
+    ])
+    return session
+
+
+def run(session: DatabaseSession, threads: int, seconds: float, write_every: int) -> float:
+    """
+    :return: operations per second
+    """
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(number: int):
+        rng = random.Random(number)
+        ops = 0
+        while time.perf_counter() < stop:
+            ops += 1
+            if ops % write_every == 0:
+                if ops % (2 * write_every):
+                    session.insert("library", Book("New", "Author", 2000, "Genre", next(_isbns), 100))
+                else:
+                    session.update("library", {"pages": rng.randint(20, 600)}, isbn=rng.randrange(1000))
+            else:
+                year = rng.randint(1800, 2010)
+                session.select("library", year__ge=year, year__lt=year + 10, pages__gt=300)
+        done[number] = ops
+
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(done) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--write-every", type=int, default=20)
+    args = parser.parse_args()
+    for columnar in (False, True):
+        storage = "columnar" if columnar else "rows"
+        baseline = run(make_session(args.rows, columnar, concurrent=False), 1, args.seconds, args.write_every)
+        print(f"{storage:>8}: without locks, 1 thread: {baseline:9.1f} ops/s")
+        session = make_session(args.rows, columnar, concurrent=True)
+        for threads in args.threads:
+            throughput = run(session, threads, args.seconds, args.write_every)
+            print(f"{storage:>8}: {threads} thread(s): {throughput:9.1f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
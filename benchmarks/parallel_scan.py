@@ -0,0 +1,70 @@
+"""
+Latency of full scans of columnar table by number of scan worker processes(``DatabaseSession(scan_workers=...)``).
+Run: ``python -m benchmarks.parallel_scan``
+
+Workers speed up scans only with free CPU cores; the first query of every table version also copies columns to shared
+memory, so it is measured separately.
+"""
+import argparse
+import random
+import time
+
+import src.constants as cst
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.table import DictConstraints
+
+QUERIES = [
+    {"year__ge": 1900, "year__lt": 1950, "pages__gt": 300},
+    {"author": cst.DEFAULT_AUTHORS[0], "pages__le": 100},
+    {"genre__in": cst.DEFAULT_GENRES[:2], "year": 2000},
+]
+
+
+def make_session(rows: list[Book], workers: int) -> DatabaseSession:
+    session = DatabaseSession(scan_workers=workers, scan_threshold=0)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({}), columnar=True)
+    session.insert_many("library", rows)
+    return session
+
+
+def run(session: DatabaseSession, repeat: int) -> tuple[float, float]:
+    """
+    :return: ``(first query, average query)`` in milliseconds
+    """
+    started = time.perf_counter()
+    session.select("library", **QUERIES[0])
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for filters in QUERIES:
+            session.select("library", **filters)
+    return first * 1000, (time.perf_counter() - started) * 1000 / (repeat * len(QUERIES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    rng = random.Random(1)
+    rows = [
+        Book(f"Title {n}", rng.choice(cst.DEFAULT_AUTHORS), rng.randint(1800, 2020), rng.choice(cst.DEFAULT_GENRES), n,
+             rng.randint(20, 600))
+        for n in range(args.rows)
+    ]
+    first, average = run(make_session(rows, 0), args.repeat)
+    print(f"serial: first {first:8.1f} ms, average {average:8.1f} ms")
+    for workers in args.workers:
+        session = make_session(rows, workers)
+        try:
+            first, average = run(session, args.repeat)
+        finally:
+            session.close()
+        print(f"{workers} worker(s): first {first:8.1f} ms, average {average:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Load test of database server on localhost: server runs in its own process(``python -m src.server``), client processes
+run ``--concurrency`` coroutines each(requests of coroutines are pipelined over pool of connections) with read-heavy mix
+(every ``write_every``-th operation is insert). Run: ``python -m benchmarks.server_load``
+"""
+import argparse
+import ast
+import asyncio
+import itertools
+import multiprocessing
+import random
+import subprocess
+import sys
+import time
+
+import src.constants as cst
+from src.book import Book
+from src.database.client import DatabaseClient
+
+
+def book(n: int, rng: random.Random) -> Book:
+    return Book(f"Title {n}", rng.choice(cst.DEFAULT_AUTHORS), rng.randint(1800, 2020), rng.choice(cst.DEFAULT_GENRES), n,
+                rng.randint(20, 600))
+
+
+async def prepare(address: tuple[str, int], rows: int) -> None:
+    async with DatabaseClient(*address, pool_size=1) as client:
+        await client.execute("CREATE DTYPE BOOK (title str, author str, year int, genre str, isbn int, pages int)")
+        await client.execute("CREATE TABLE library (BOOK) COLUMNAR")
+        rng = random.Random(1)
+        for start in range(0, rows, 10_000):
+            await client.insert_many("library", [book(n, rng) for n in range(start, min(start + 10_000, rows))])
+
+
+async def load(address: tuple[str, int], number: int, concurrency: int, pool_size: int, seconds: float, write_every: int) -> int:
+    """
+    :return: number of completed operations
+    """
+    isbns = itertools.count(10 ** 12 * (number + 1))
+    stop = time.perf_counter() + seconds
+    done = 0
+
+    async def worker(rng: random.Random):
+        nonlocal done
+        ops = 0
+        while time.perf_counter() < stop:
+            ops += 1
+            if ops % write_every == 0:
+                await client.insert("library", book(next(isbns), rng))
+            else:
+                year = rng.randint(1800, 2015)
+                await client.select("library", year__ge=year, year__lt=year + 5, author=rng.choice(cst.DEFAULT_AUTHORS))
+            done += 1
+
+    async with DatabaseClient(*address, pool_size=pool_size, dtypes={"library": Book}) as client:
+        await asyncio.gather(*(worker(random.Random(number * concurrency + n)) for n in range(concurrency)))
+    return done
+
+
+def run_client(args: tuple) -> int:
+    return asyncio.run(load(*args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--write-every", type=int, default=10)
+    args = parser.parse_args()
+    server = subprocess.Popen([sys.executable, "-m", "src.server", "--port", "0"], stdout=subprocess.PIPE, text=True)
+    try:
+        address = ast.literal_eval(server.stdout.readline().removeprefix("Listening on "))
+        asyncio.run(prepare(address, args.rows))
+        with multiprocessing.Pool(args.processes) as pool:
+            for concurrency in args.concurrency:
+                started = time.perf_counter()
+                done = pool.map(run_client, [
+                    (address, number, concurrency, args.pool_size, args.seconds, args.write_every)
+                    for number in range(args.processes)
+                ])
+                throughput = sum(done) / (time.perf_counter() - started)
+                print(f"{args.processes} process(es) x {concurrency} coroutine(s): {throughput:9.1f} ops/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
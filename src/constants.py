@@ -22,7 +22,11 @@ OPERATORS: dict[str, Callable] = {
     'lt': operator.lt,
     'le': operator.le,
     'eq': operator.eq,
+    'ne': operator.ne,
     'in': ops.in_,
+    'startswith': ops.startswith,
+    'contains': ops.contains,
+    'icontains': ops.icontains,
 }
 
 class EventType(StrEnum):
@@ -35,4 +39,12 @@ class EventType(StrEnum):
 
 class Constraint(StrEnum):
     UNIQUE = 'unique'
-    FOREIGN_KEY = 'foreign_key'
\ No newline at end of file
+    FOREIGN_KEY = 'foreign_key'
+
+class Durability(StrEnum):
+    COMMIT = 'commit'
+    """fsync on every commit(concurrent commits share one fsync)"""
+    INTERVAL = 'interval'
+    """fsync at most every ``interval_ms``: commits within the interval are grouped"""
+    NONE = 'none'
+    """no fsync, records are handed to OS on commit"""
@@ -0,0 +1,214 @@
+"""
+Asyncio front end of ``DatabaseSession``. Queries and writes run in executor threads, so event loop is not blocked by
+scans. Inserts of coroutines that arrive while previous batch of table is applied are coalesced into ``insert_many``
+"""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterator, Callable
+
+from src.database.session import DatabaseSession
+from src.orm.collection import CollectionView
+
+
+class AsyncDatabaseSession:
+    """
+    Awaitable operations of concurrent ``DatabaseSession``(schema is created on ``session`` directly). Concurrent
+    ``insert`` calls are queued per table and applied in batches of at most ``batch_size`` rows by one ``insert_many``
+    (rows of failed batch are inserted one by one, so every call gets its own result). Transaction runs all its
+    operations in one dedicated thread(transactions of session are per thread)
+    :param session: concurrent session to wrap(created with ``kwargs`` if not set)
+    :param executor: executor of queries and writes(default executor of event loop if not set)
+    :param batch_size: max number of rows inserted by one batch
+    :param kwargs: arguments of ``DatabaseSession``(``concurrent`` is always set)
+    :raise ValueError: session is not concurrent
+    """
+    def __init__(self, session: DatabaseSession | None = None, executor: Executor | None = None, batch_size: int = 1000, **kwargs):
+        if session is None:
+            session = DatabaseSession(concurrent=True, **kwargs)
+        elif not session.concurrent:
+            raise ValueError("Session must be created with concurrent=True")
+        self.session = session
+        self.batch_size = batch_size
+        self._executor = executor
+        self._transaction: ContextVar[ThreadPoolExecutor | None] = ContextVar("transaction", default=None)
+        self._pending: dict[str, list[tuple[Any, asyncio.Future]]] = {}
+        """Queued inserts by table: ``[(row, future of caller)]``"""
+        self._flushing: dict[str, asyncio.Task] = {}
+
+    async def _run(self, func: Callable, *args, **kwargs):
+        """Run function in thread of current transaction or in executor"""
+        executor = self._transaction.get() or self._executor
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Transaction context manager: operations awaited inside it(by current task and tasks it creates) belong to
+        transaction. Rolls back on exception or cancellation. Usage: ``async with session.transaction(): ...``
+        :raise RuntimeError: transaction already in progress
+        """
+        if self._transaction.get() is not None:
+            raise RuntimeError("Transaction already in progress")
+        executor = ThreadPoolExecutor(1, thread_name_prefix="transaction")
+        token = self._transaction.set(executor)
+        try:
+            await self._run(self.session.begin)
+            try:
+                yield self
+            except BaseException:
+                await self._run(self.session.rollback)
+                raise
+            await self._run(self.session.commit)
+        finally:
+            self._transaction.reset(token)
+            executor.shutdown(wait=False)
+
+    async def insert(self, table_name: str, row) -> None:
+        """
+        Insert row into table(queued and inserted with rows of other calls, see ``AsyncDatabaseSession``)
+        :param table_name: table name
+        :param row: dtype of the table object
+        :raise ConstraintFailed: some of constraints failed
+        """
+        if self._transaction.get() is not None:
+            return await self._run(self.session.insert, table_name, row)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(table_name, []).append((row, future))
+        if table_name not in self._flushing:
+            self._flushing[table_name] = asyncio.create_task(self._flush(table_name))
+        await future
+
+    async def _flush(self, table_name: str) -> None:
+        """Insert queued rows of table in batches until queue is empty"""
+        queue = self._pending[table_name]
+        try:
+            while queue:
+                batch = [(row, future) for row, future in queue[:self.batch_size] if not future.cancelled()]
+                del queue[:self.batch_size]
+                if not batch:
+                    continue
+                errors = await self._run(self._insert_batch, table_name, [row for row, _ in batch])
+                for (_, future), error in zip(batch, errors):
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+        except BaseException as error:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(error)
+            queue.clear()
+            raise
+        finally:
+            del self._flushing[table_name]
+            del self._pending[table_name]
+
+    def _insert_batch(self, table_name: str, rows: list) -> list[Exception | None]:
+        """
+        :return: errors of rows(``None`` for inserted rows)
+        """
+        try:
+            self.session.insert_many(table_name, rows)
+            return [None] * len(rows)
+        except Exception as error:
+            if len(rows) == 1:
+                return [error]
+        errors: list[Exception | None] = []
+        for row in rows:
+            try:
+                self.session.insert(table_name, row)
+                errors.append(None)
+            except Exception as error:
+                errors.append(error)
+        return errors
+
+    async def insert_many(self, table_name: str, rows: list) -> None:
+        """
+        Insert rows into table at once(see ``DatabaseSession.insert_many``)
+        """
+        await self._run(self.session.insert_many, table_name, list(rows))
+
+    async def select(self, table_name: str, **filters) -> set[int]:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: set of indexes(row ids for tables with stable ids)
+        """
+        return await self._run(self.session.select, table_name, **filters)
+
+    async def select_many(self, table_name: str, queries: list[dict]) -> list[set[int]]:
+        """
+        Run several queries of table by one executor call
+        :param table_name: table name
+        :param queries: filters of queries(see ``DatabaseSession.select``)
+        :return: results of queries in their order
+        """
+        return await self._run(lambda: [self.session.select(table_name, **filters) for filters in queries])
+
+    async def select_rows(self, table_name: str, **filters) -> CollectionView:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: read-only ``CollectionView`` of copied records(ordered by position)
+        """
+        return await self._run(self.session.select_rows, table_name, **filters)
+
+    async def iter_rows(self, table_name: str, order_by: str | None = None, limit: int | None = None, offset: int = 0,
+                        chunk_size: int = 1000, **filters) -> AsyncIterator:
+        """
+        Async cursor over matching records(see ``DatabaseSession.iter_rows``). Records are fetched in executor by chunks.
+        Usage: ``async for row in session.iter_rows('library', order_by='year', genre='Horror'): ...``
+        :param chunk_size: number of records fetched at once
+        """
+        rows = await self._run(self.session.iter_rows, table_name, order_by, limit, offset, **filters)
+        while chunk := await self._run(lambda: list(islice(rows, chunk_size))):
+            for row in chunk:
+                yield row
+
+    async def select_fields(self, table_name: str, fields: tuple[str, ...], columns: bool = False, **filters) -> list[tuple] | dict[str, list]:
+        """
+        Projection of matching rows(see ``DatabaseSession.select_fields``)
+        """
+        return await self._run(self.session.select_fields, table_name, fields, columns, **filters)
+
+    async def aggregate(self, table_name: str, group_by: str | list[str] | None = None, aggs: dict | None = None, **filters) -> dict:
+        """
+        Aggregate matching rows(see ``DatabaseSession.aggregate``)
+        """
+        return await self._run(self.session.aggregate, table_name, group_by, aggs, **filters)
+
+    async def update(self, table_name: str, values: dict, **filters) -> None:
+        """
+        Update matching rows(see ``DatabaseSession.update``)
+        :raise ConstraintFailed: some of constraints failed
+        """
+        await self._run(self.session.update, table_name, values, **filters)
+
+    async def delete(self, table_name: str, **filters) -> None:
+        """
+        Delete matching rows(see ``DatabaseSession.delete``)
+        """
+        await self._run(self.session.delete, table_name, **filters)
+
+    async def execute(self, query: str) -> list | None:
+        """
+        Execute text query(see ``DatabaseSession.execute``)
+        :return: list of records for SELECT, ``None`` for other queries
+        :raise SyntaxError: query is malformed
+        """
+        def execute():
+            result = self.session.execute(query)
+            return None if result is None else list(result)
+
+        return await self._run(execute)
+
+    async def close(self) -> None:
+        """Wait for queued inserts, close session"""
+        await asyncio.gather(*self._flushing.values(), return_exceptions=True)
+        await self._run(self.session.close)
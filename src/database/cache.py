@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    maxsize: int = 0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Size-bounded cache, least recently used entries are evicted first. Thread-safe
+    :param maxsize: max number of entries
+    """
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError("`maxsize` must be positive")
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K, default: Any = None, valid: Callable[[V], bool] | None = None) -> V | Any:
+        """
+        Get entry and mark it as recently used
+        :param key: key of entry
+        :param default: value to return on miss
+        :param valid: check of stored value; invalid entry is dropped and counted as miss
+        :return: stored value or ``default``
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if valid is not None and not valid(value):
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.evictions, len(self._data), self.maxsize)
+
+
+def freeze(value: Any) -> Hashable:
+    """
+    Make hashable representation of filter value(lists become tuples, sets become frozensets etc.)
+    :param value: value to freeze
+    :return: hashable value
+    :raise TypeError: value can't be frozen
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    hash(value)
+    return value
+
+
+def query_key(table_name: str, filters: dict[str, Any]) -> tuple | None:
+    """
+    Normalized cache key of query
+    :param table_name: table name
+    :param filters: query filters
+    :return: key or ``None`` if filters can't be hashed
+    """
+    try:
+        return table_name, tuple(sorted((name, freeze(value)) for name, value in filters.items()))
+    except TypeError:
+        return None
@@ -0,0 +1,220 @@
+"""
+Asyncio client of ``DatabaseServer`` with pool of connections and request pipelining
+"""
+import asyncio
+import builtins
+from pathlib import Path
+from typing import Any, Iterator
+
+import src.constants as cst
+from src.database.protocol import HEADER, Op, Rows, Status, decode, encode, frame, row_values
+from src.orm.exceptions import ConstraintFailed
+
+_BUILTIN_ERRORS = {"KeyError", "ValueError", "TypeError", "RuntimeError", "TimeoutError", "SyntaxError", "IndexError"}
+
+
+class RemoteError(Exception):
+    """Error of server that has no local counterpart"""
+    def __init__(self, kind: str, message: str):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+
+def _error(payload: tuple) -> Exception:
+    kind, message, args = payload
+    if kind == "ConstraintFailed" and len(args) == 3:
+        constraint, field, value = args
+        return ConstraintFailed(cst.Constraint(constraint), field, value)
+    if kind in _BUILTIN_ERRORS:
+        return getattr(builtins, kind)(*args)
+    return RemoteError(kind, message)
+
+
+class _Connection:
+    """
+    Connection with requests in flight: requests are written without waiting for responses, responses are matched to
+    requests by id
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._closed: ConnectionError | None = None
+        self._receiver = asyncio.create_task(self._receive())
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+
+    async def request(self, op: Op, args: tuple):
+        """
+        :return: result of request
+        :raise ConnectionError: connection is closed
+        :raise TypeError: some of arguments can't be encoded(request is not sent)
+        """
+        if self._closed is not None:
+            raise self._closed
+        payload = encode(args)
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        self._writer.write(frame(self._next_id, op, payload))
+        await self._writer.drain()
+        return await future
+
+    async def _receive(self) -> None:
+        try:
+            while True:
+                size, request_id, code = HEADER.unpack(await self._reader.readexactly(HEADER.size))
+                payload = await self._reader.readexactly(size)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if code == Status.OK:
+                    future.set_result(decode(payload))
+                else:
+                    future.set_exception(_error(decode(payload)))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as error:
+            self._closed = ConnectionError(f"Connection to server is closed: {error!r}")
+        except asyncio.CancelledError:
+            self._closed = ConnectionError("Connection to server is closed")
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(self._closed)
+        self._pending.clear()
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
+
+
+class DatabaseClient:
+    """
+    Client of ``DatabaseServer``. Opens ``pool_size`` connections; every request goes to connection with the fewest
+    requests in flight and is sent without waiting for previous responses, so concurrent calls(e.g. ``asyncio.gather``)
+    are pipelined. Rows of tables in ``dtypes`` are returned as dtype objects(as tuples of values otherwise).
+    Usage: ``async with DatabaseClient(port=port, dtypes={'library': Book}) as client: await client.select(...)``
+    :param host: server host
+    :param port: server port
+    :param path: Unix socket path of server(``host`` and ``port`` are not used if set)
+    :param pool_size: number of connections
+    :param dtypes: dtypes(dataclasses) of rows by table name
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 7890, path: str | Path | None = None, pool_size: int = 4,
+                 dtypes: dict[str, type] | None = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.pool_size = pool_size
+        self.dtypes = dict(dtypes or {})
+        self._pool: list[_Connection] = []
+
+    async def connect(self) -> "DatabaseClient":
+        """Open connections of pool"""
+        for _ in range(self.pool_size - len(self._pool)):
+            if self.path is not None:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._pool.append(_Connection(reader, writer))
+        return self
+
+    async def close(self) -> None:
+        """Close connections(requests in flight fail with ``ConnectionError``)"""
+        pool, self._pool = self._pool, []
+        await asyncio.gather(*(connection.close() for connection in pool))
+
+    async def __aenter__(self) -> "DatabaseClient":
+        return await self.connect()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _request(self, op: Op, *args):
+        if not self._pool:
+            raise RuntimeError("Client is not connected")
+        connection = min(self._pool, key=lambda item: item.inflight)
+        return await connection.request(op, args)
+
+    def _rows(self, rows: Rows) -> list:
+        dtype = self.dtypes.get(rows.table_name)
+        if dtype is None:
+            return rows.values
+        return [dtype(*values) for values in rows.values]
+
+    async def ping(self) -> None:
+        await self._request(Op.PING)
+
+    async def select(self, table_name: str, **filters) -> set[int]:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: set of indexes(row ids for tables with stable ids)
+        """
+        return await self._request(Op.SELECT, table_name, filters)
+
+    async def select_many(self, table_name: str, queries: list[dict]) -> list[set[int]]:
+        """
+        Run several queries of table by one request
+        :param table_name: table name
+        :param queries: filters of queries
+        :return: results of queries in their order
+        """
+        return await self._request(Op.SELECT_MANY, table_name, list(queries))
+
+    async def select_rows(self, table_name: str, **filters) -> list:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: matching records(ordered by position)
+        """
+        return self._rows(await self._request(Op.SELECT_ROWS, table_name, filters))
+
+    async def iter_rows(self, table_name: str, order_by: str | None = None, limit: int | None = None, offset: int = 0, **filters) -> Iterator:
+        """
+        Page of matching records(see ``DatabaseSession.iter_rows``), fetched by one request
+        :return: iterator of records
+        """
+        return iter(self._rows(await self._request(Op.ITER_ROWS, table_name, order_by, limit, offset, filters)))
+
+    async def insert(self, table_name: str, row: Any) -> None:
+        """
+        :param table_name: table name
+        :param row: dtype object(or tuple of its field values)
+        :raise ConstraintFailed: some of constraints failed
+        """
+        values = row if isinstance(row, tuple) else row_values(row)
+        await self._request(Op.INSERT, table_name, values)
+
+    async def insert_many(self, table_name: str, rows: list) -> None:
+        """
+        Insert rows at once by one request(see ``DatabaseSession.insert_many``)
+        :raise ConstraintFailed: some of constraints failed
+        """
+        values = [row if isinstance(row, tuple) else row_values(row) for row in rows]
+        await self._request(Op.INSERT_MANY, table_name, values)
+
+    async def update(self, table_name: str, values: dict, **filters) -> None:
+        """
+        Update matching rows(see ``DatabaseSession.update``)
+        """
+        await self._request(Op.UPDATE, table_name, values, filters)
+
+    async def delete(self, table_name: str, **filters) -> None:
+        """
+        Delete matching rows(see ``DatabaseSession.delete``)
+        """
+        await self._request(Op.DELETE, table_name, filters)
+
+    async def execute(self, query: str) -> list | None:
+        """
+        Execute text query on server(see ``DatabaseSession.execute``)
+        :return: records for SELECT, ``None`` for other queries
+        """
+        rows = await self._request(Op.EXECUTE, query)
+        return None if rows is None else self._rows(rows)
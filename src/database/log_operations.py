@@ -1,22 +1,135 @@
-from dataclasses import dataclass
-from typing import Any, Union
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Union
 
 
 @dataclass
 class Insert:
+    """Row was inserted. ``position`` is row id for tables with stable ids"""
     table_name: str
     position: int
+    row: Any = None
+
+@dataclass
+class InsertMany:
+    """Rows were inserted at once on positions ``start``, ``start + 1``, ..."""
+    table_name: str
+    start: int
+    rows: list
 
 @dataclass
 class Update:
+    """Row was updated. ``position`` is row id for tables with stable ids"""
     table_name: str
     position: int
     old_row: Any
+    new_row: Any = None
+
+@dataclass
+class UpdateMany:
+    """Fields of rows were set at once. ``positions`` are row ids for tables with stable ids"""
+    table_name: str
+    positions: list[int]
+    values: dict
+    old_values: dict | None = None
+    """``{field: old values}`` in order of ``positions``"""
 
 @dataclass
 class Delete:
+    """Row was deleted. ``position`` is row id for tables with stable ids"""
     table_name: str
     position: int
     row: Any
 
-LogOperation = Union[Insert, Update, Delete]
\ No newline at end of file
+@dataclass
+class DeleteMany:
+    """Rows were deleted at once from ascending ``positions``(row ids for tables with stable ids)"""
+    table_name: str
+    positions: list[int]
+    rows: list | None = None
+
+@dataclass
+class Compact:
+    """Tombstoned slots of table with stable ids were reclaimed(ids of rows changed)"""
+    table_name: str
+
+LogOperation = Union[Insert, InsertMany, Update, UpdateMany, Delete, DeleteMany, Compact]
+
+LogRecord = tuple
+"""Redo record of operation: ``(kind, table_name, position or list of positions, row values, list of row values, dict of field values or None)``"""
+
+
+def _values(row) -> tuple:
+    return tuple(getattr(row, field.name) for field in fields(row))
+
+
+def to_record(operation: LogOperation) -> LogRecord:
+    """
+    Redo record of operation(rows are stored as tuples of field values, so records don't depend on dtype classes)
+    :param operation: operation with redo data(``Insert.row``, ``Update.new_row``)
+    :return: record
+    """
+    if isinstance(operation, Insert):
+        return "I", operation.table_name, operation.position, _values(operation.row)
+    if isinstance(operation, InsertMany):
+        return "M", operation.table_name, operation.start, [_values(row) for row in operation.rows]
+    if isinstance(operation, Update):
+        return "U", operation.table_name, operation.position, _values(operation.new_row)
+    if isinstance(operation, UpdateMany):
+        return "S", operation.table_name, operation.positions, operation.values
+    if isinstance(operation, Delete):
+        return "D", operation.table_name, operation.position, None
+    if isinstance(operation, DeleteMany):
+        return "R", operation.table_name, operation.positions, None
+    return "C", operation.table_name, None, None
+
+
+def undo(table, operation: LogOperation, auto_update: bool = True) -> None:
+    """
+    Apply undo data of operation to table. Slots of undone inserts are dropped from the end of table with stable ids(ids
+    are given again, as on write-ahead log replay)
+    :param table: ``Table`` operation was applied to
+    :param operation: operation with undo data(``Update.old_row``, ``Delete.row`` etc.)
+    :param auto_update: update indexes(rebuild them after undo otherwise)
+    """
+    if isinstance(operation, Delete):
+        table.insert(operation.row, operation.position, auto_update=auto_update)
+    elif isinstance(operation, Insert):
+        table.remove_by_index(operation.position, auto_update=auto_update)
+        if table.stable_ids:
+            table.truncate(operation.position)
+    elif isinstance(operation, InsertMany):
+        table.remove_many(list(range(operation.start, operation.start + len(operation.rows))), auto_update=auto_update)
+        if table.stable_ids:
+            table.truncate(operation.start)
+    elif isinstance(operation, Update):
+        table.restore_at(operation.position, operation.old_row, auto_update=auto_update)
+    elif isinstance(operation, UpdateMany):
+        table.restore_fields(operation.positions, operation.old_values, auto_update=auto_update)
+    elif isinstance(operation, DeleteMany):
+        table.restore_many(operation.positions, operation.rows, auto_update=auto_update)
+
+
+def from_record(record: LogRecord, dtype_of: Callable[[str], type]) -> LogOperation:
+    """
+    :param record: record made by ``to_record``
+    :param dtype_of: returns dtype of table by table name
+    :return: operation with redo data(undo data is not restored)
+    """
+    kind, table_name, position, values = record
+    match kind:
+        case "I":
+            return Insert(table_name, position, dtype_of(table_name)(*values))
+        case "M":
+            dtype = dtype_of(table_name)
+            return InsertMany(table_name, position, [dtype(*row_values) for row_values in values])
+        case "U":
+            return Update(table_name, position, None, dtype_of(table_name)(*values))
+        case "S":
+            return UpdateMany(table_name, position, values)
+        case "D":
+            return Delete(table_name, position, None)
+        case "R":
+            return DeleteMany(table_name, position)
+        case "C":
+            return Compact(table_name)
+    raise ValueError(f"Unknown log record: {kind!r}")
@@ -0,0 +1,295 @@
+"""
+Multi-version reads. Every committed transaction gets new version number of database. Snapshot sees committed state of
+tables as of its version: table of snapshot is built from a copy of the live table by applying undo data of the changes
+made after that version(``Update.old_row``, ``Delete.row`` etc.), so readers hold no table locks and don't wait for
+transactions(only for copying of rows, which waits for operation in progress). Built versions are shared by snapshots
+and dropped with committed changes nobody can see anymore when the last snapshot that needs them is closed
+"""
+import threading
+from collections import Counter
+from typing import Iterable, Iterator, Mapping
+
+from src.database.log_operations import Compact, LogOperation, undo
+from src.orm.collection import CollectionView
+from src.orm.index.abstract import Field
+from src.orm.planner import parse_filter
+from src.orm.table import Table
+
+
+class _Version:
+    """
+    Read-only table of version. Indexes of live table are built on the first query that filters or orders by their field
+    """
+    def __init__(self, table: Table, index_types: dict[Field, str]):
+        self._table = table
+        self._index_types = dict(index_types)
+        self._lock = threading.Lock()
+
+    def indexed(self, fields: Iterable[str]) -> Table:
+        """
+        :param fields: fields query uses
+        :return: table with indexes of these fields(and composite indexes whose first field is one of them)
+        """
+        fields = set(fields)
+        needed = [key for key in self._index_types if (key if isinstance(key, str) else key[0]) in fields]
+        if needed:
+            with self._lock:
+                for key in needed:
+                    index_type = self._index_types.pop(key, None)
+                    if index_type is not None:
+                        self._table.create_index(index_type, key)
+        return self._table
+
+
+class _TableHistory:
+    """
+    Changes of table kept for snapshots. ``mutex`` is held while table is changed by one operation and while its rows
+    are copied
+    """
+    def __init__(self):
+        self.mutex = threading.RLock()
+        self.pending: list[LogOperation] = []
+        """Operations of transaction in progress"""
+        self.committed: list[tuple[int, list[LogOperation]]] = []
+        """``(version, operations)`` of committed transactions newer than the oldest open snapshot"""
+        self.base = 0
+        """Version of the latest committed change that is not kept in ``committed``"""
+        self.versions: dict[int, _Version] = {}
+        """Built versions by version of their last change"""
+
+    def last_change(self, version: int) -> int:
+        """
+        :return: version of the latest change of table visible to snapshot of ``version``
+        """
+        changes = [number for number, _ in self.committed if number <= version]
+        return changes[-1] if changes else self.base
+
+
+class VersionStore:
+    """
+    Versions of committed state of session tables. Session changes table while holding its ``mutex``, records operations
+    of transaction(``record``) and calls ``commit`` when transaction is committed(or operation is applied without it)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histories: dict[str, _TableHistory] = {}
+        self._readers: Counter[int] = Counter()
+        self.version = 0
+
+    def _history(self, table_name: str) -> _TableHistory:
+        history = self._histories.get(table_name)
+        if history is None:
+            with self._lock:
+                history = self._histories.setdefault(table_name, _TableHistory())
+        return history
+
+    def mutex(self, table_name: str) -> threading.RLock:
+        """
+        :return: mutex of table to hold while it is changed
+        """
+        return self._history(table_name).mutex
+
+    def drop(self, table_name: str) -> None:
+        """Forget history of dropped table"""
+        with self._lock:
+            self._histories.pop(table_name, None)
+
+    def record(self, operations: list[LogOperation]) -> None:
+        """
+        Record operations applied by transaction in progress(mutex of their table must be held)
+        """
+        for operation in operations:
+            self._history(operation.table_name).pending.append(operation)
+
+    def discard(self, operation: LogOperation) -> None:
+        """
+        Forget operation of transaction in progress after it was undone(mutex of its table must be held)
+        """
+        pending = self._history(operation.table_name).pending
+        if pending and pending[-1] is operation:
+            pending.pop()
+
+    def commit(self, operations: list[LogOperation]) -> None:
+        """
+        Make operations committed as new version(recorded operations of transaction are not pending anymore)
+        :param operations: operations of committed transaction or operations applied outside of transaction
+        """
+        if not operations:
+            return
+        changes: dict[str, list[LogOperation]] = {}
+        if len(operations) == 1:
+            changes[operations[0].table_name] = operations
+        else:
+            for operation in operations:
+                changes.setdefault(operation.table_name, []).append(operation)
+        with self._lock:
+            self.version += 1
+            for name, table_changes in changes.items():
+                history = self._histories.get(name)
+                if history is None:  # table was dropped
+                    continue
+                if self._readers:
+                    history.committed.append((self.version, table_changes))
+                else:
+                    history.base = self.version
+                if history.pending:
+                    history.pending = []
+
+    def compact(self, table_name: str, table: Table) -> dict[int, int]:
+        """
+        Compact table(``Table.compact``) as new version. Changes of ids can't be undone, so versions of table are built for
+        all open snapshots before. Mutex of table must be held
+        :return: mapping ``{old_id: new_id}``
+        """
+        history = self._history(table_name)
+        while True:
+            with self._lock:
+                missing = [version for version in self._readers if history.last_change(version) not in history.versions]
+                if not missing:
+                    mapping = table.compact()
+                    if mapping:
+                        self.version += 1
+                        if self._readers:
+                            history.committed.append((self.version, [Compact(table_name)]))
+                        else:
+                            history.base = self.version
+                    return mapping
+            for version in missing:
+                self.table(table_name, table, version)
+
+    def table(self, table_name: str, live: Table, version: int) -> _Version:
+        """
+        :param table_name: table name
+        :param live: table of session
+        :param version: version of snapshot
+        :return: read-only table with committed rows as of version
+        :raise RuntimeError: table was compacted after changes snapshot doesn't see(versions are built by ``compact`` before)
+        """
+        history = self._history(table_name)
+        with history.mutex:
+            with self._lock:
+                key = history.last_change(version)
+                cached = history.versions.get(key)
+                if cached is not None:
+                    return cached
+                changes = [operation for number, operations in history.committed if number > version for operation in operations]
+                changes += history.pending
+            rows = live.collection.copy()
+            index_types = live.index_types
+        compacted = [pos for pos, operation in enumerate(changes) if isinstance(operation, Compact)]
+        if compacted and compacted[-1]:
+            raise RuntimeError(f"Table {table_name} was compacted after snapshot")
+        table = Table(rows, live.constraints)
+        table.created = True
+        for operation in reversed(changes):
+            undo(table, operation, auto_update=False)
+        built = _Version(table, index_types)
+        with self._lock:
+            if version in self._readers:
+                built = history.versions.setdefault(key, built)
+        return built
+
+    def open(self) -> int:
+        """
+        :return: version of new snapshot
+        """
+        with self._lock:
+            self._readers[self.version] += 1
+            return self.version
+
+    def close(self, version: int) -> None:
+        """
+        Close snapshot: drop committed changes and built tables no open snapshot needs
+        :param version: version of snapshot
+        """
+        with self._lock:
+            self._readers[version] -= 1
+            if not self._readers[version]:
+                del self._readers[version]
+            oldest = min(self._readers, default=None)
+            for history in self._histories.values():
+                while history.committed and (oldest is None or history.committed[0][0] <= oldest):
+                    history.base = history.committed.pop(0)[0]
+                needed = {history.last_change(reader) for reader in self._readers}
+                for key in [key for key in history.versions if key not in needed]:
+                    del history.versions[key]
+
+
+def _fields(filters: dict) -> list[str]:
+    return [parse_filter(filter_)[0] for filter_ in filters]
+
+
+class Snapshot:
+    """
+    Consistent read-only view of committed data of session as of ``version``(changes of transactions committed later and
+    of transactions in progress, including transaction of current thread, are not visible). Schema changes are not
+    versioned. Close snapshot when done(``with session.snapshot() as snap: ...``)
+    """
+    def __init__(self, store: VersionStore, tables: Mapping[str, Table]):
+        self._store = store
+        self._tables = tables
+        self.version = store.open()
+        self._closed = False
+
+    def table(self, table_name: str, fields: Iterable[str] = ()) -> Table:
+        """
+        :param table_name: table name
+        :param fields: fields to build indexes of(if live table has them)
+        :return: read-only table as of snapshot version
+        :raise RuntimeError: snapshot is closed
+        """
+        if self._closed:
+            raise RuntimeError("Snapshot is closed")
+        return self._store.table(table_name, self._tables[table_name], self.version).indexed(fields)
+
+    def select(self, table_name: str, **filters) -> set[int]:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: set of indexes(row ids for tables with stable ids) in snapshot version of table
+        """
+        return self.table(table_name, _fields(filters)).query(**filters)
+
+    def select_rows(self, table_name: str, **filters) -> CollectionView:
+        """
+        :param table_name: table name
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``(see ``DatabaseSession.select``)
+        :return: lazy read-only ``CollectionView`` of records(ordered by position)
+        """
+        table = self.table(table_name, _fields(filters))
+        return CollectionView(table, table.query(**filters))
+
+    def iter_rows(self, table_name: str, order_by: str | None = None, limit: int | None = None, offset: int = 0, **filters) -> Iterator:
+        """
+        Cursor over matching records(see ``DatabaseSession.iter_rows``)
+        """
+        fields = _fields(filters)
+        if order_by is not None:
+            fields.append(order_by.lstrip("-"))
+        table = self.table(table_name, fields)
+        return (table[pos] for pos in table.iter_query(order_by, limit, offset, **filters))
+
+    def select_fields(self, table_name: str, fields: tuple[str, ...], columns: bool = False, **filters) -> list[tuple] | dict[str, list]:
+        """
+        Projection of matching rows of snapshot version of table(see ``DatabaseSession.select_fields``)
+        """
+        return self.table(table_name, [*_fields(filters), *fields]).select_fields(fields, columns, **filters)
+
+    def aggregate(self, table_name: str, group_by: str | list[str] | None = None, aggs: dict | None = None, **filters) -> dict:
+        """
+        Aggregate matching rows of snapshot version of table(see ``DatabaseSession.aggregate``)
+        """
+        fields = _fields(filters)
+        fields.extend([group_by] if isinstance(group_by, str) else group_by or ())
+        return self.table(table_name, fields).aggregate(group_by, aggs, **filters)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._store.close(self.version)
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,149 +1,379 @@
 import datetime
+import re
 import shlex
 import dataclasses
+import types
+import typing
+from functools import lru_cache
+from typing import Any
 
 from src.database.query_plan import QueryPlan, QueryType
+from src.orm.planner import parse_filter
+
+FIELD_TYPES: dict[str, type] = {
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": bool,
+    "datetime": datetime.datetime,
+    "date": datetime.date,
+}
+
+FILTER_OPERATORS: dict[str, str] = {
+    "=": "eq",
+    "==": "eq",
+    "!=": "ne",
+    "<>": "ne",
+    ">": "gt",
+    "<": "lt",
+    ">=": "ge",
+    "<=": "le",
+    "in": "in",
+    "startswith": "startswith",
+    "contains": "contains",
+    "icontains": "icontains",
+}
+
+_PUNCTUATION = "(),=<>!"
+_SPLIT_PUNCTUATION = re.compile(r"[<>!=]=|<>|.")
+_QUOTES = "'\""
+_TRUE = {"true", "1", "yes"}
+_FALSE = {"false", "0", "no"}
+
+
+class _Tokens:
+    """
+    Cursor over query tokens. Keywords are compared case-insensitively, quoted tokens never match keywords
+    """
+    def __init__(self, tokens: list[str]):
+        self._tokens = tokens
+        self._pos = 0
+
+    def peek(self) -> str | None:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def next(self, what: str = "token") -> str:
+        token = self.peek()
+        if token is None:
+            raise SyntaxError(f"Expected {what}, got end of query")
+        self._pos += 1
+        return token
+
+    def is_keyword(self, *keywords: str) -> bool:
+        token = self.peek()
+        return token is not None and token.lower() in keywords
+
+    def accept(self, keyword: str) -> bool:
+        if self.is_keyword(keyword):
+            self._pos += 1
+            return True
+        return False
+
+    def expect(self, keyword: str) -> None:
+        token = self.next(repr(keyword))
+        if token.lower() != keyword:
+            raise SyntaxError(f"Expected {keyword!r} (got {token})")
+
+    def name(self, what: str = "name") -> str:
+        token = self.next(what)
+        if token[0] in _QUOTES or token[0] in _PUNCTUATION:
+            raise SyntaxError(f"Expected {what} (got {token})")
+        return token
+
+    def value(self) -> str:
+        token = self.next("value")
+        if token[0] in _QUOTES:
+            return token[1:-1]
+        if token[0] in _PUNCTUATION:
+            raise SyntaxError(f"Expected value (got {token})")
+        return token
+
+    def end(self) -> None:
+        if self.peek() is not None:
+            raise SyntaxError(f"Unexpected {self.peek()}")
 
 
 class QueryParser:
+    """
+    Parser of text queries:
+
+    - ``CREATE DTYPE name (field type, ...)``
+    - ``CREATE TABLE name (dtype) [STABLE_IDS] [COLUMNAR]``
+    - ``SELECT [*] FROM table [WHERE filters] [ORDER BY field [ASC | DESC]] [LIMIT n] [OFFSET n]``
+    - ``INSERT INTO table [(field, ...)] VALUES (value, ...)[, (value, ...)]``
+    - ``UPDATE table SET field = value[, field = value] [WHERE filters]``
+    - ``DELETE FROM table [WHERE filters]``
+
+    Filters are ``field op value`` joined with ``AND``(``op`` is one of ``FILTER_OPERATORS``, ``in`` takes ``(value, ...)``).
+    Values are kept as strings, use ``typed_values`` to convert them to field types of dtype
+    """
+    @staticmethod
+    def tokenize(query: str) -> list[str]:
+        """
+        Split query into tokens: words, quoted strings(quotes are kept) and punctuation(``(``, ``,``, operators)
+        :param query: text query
+        :return: list of tokens
+        """
+        lexer = shlex.shlex(query, posix=False, punctuation_chars=_PUNCTUATION)
+        lexer.whitespace_split = True
+        tokens = []
+        for token in lexer:
+            if token[0] in _PUNCTUATION and len(token) > 1:
+                # shlex joins adjacent punctuation, e.g. ``),(``
+                tokens.extend(_SPLIT_PUNCTUATION.findall(token))
+            else:
+                tokens.append(token)
+        return tokens
+
     @staticmethod
     def parse(query: str) -> QueryPlan | None:
-        raise NotImplementedError
-        shlex_splitted = shlex.split(query)
-        if not shlex_splitted:
+        """
+        :param query: text query
+        :return: plan of query(``None`` for empty query)
+        :raise SyntaxError: query is malformed
+        """
+        try:
+            splitted = QueryParser.tokenize(query)
+        except ValueError as e:
+            raise SyntaxError(f"Can't tokenize query: {e}") from None
+        if not splitted:
             return None
-        shlex_splitted[0] = shlex_splitted[0].lower()
-        match shlex_splitted[0]:
+        tokens = _Tokens(splitted)
+        command = tokens.next().lower()
+        match command:
             case "create":
-                QueryParser._process_create(shlex_splitted[1:])
+                plan = QueryParser._process_create(tokens)
             case "select":
-                QueryParser._process_select(shlex_splitted[1:])
-
+                plan = QueryParser._process_select(tokens)
+            case "insert":
+                plan = QueryParser._process_insert(tokens)
+            case "update":
+                plan = QueryParser._process_update(tokens)
+            case "delete":
+                plan = QueryParser._process_delete(tokens)
+            case _:
+                raise SyntaxError(f"Unknown query type: {command.upper()}")
+        tokens.end()
+        return plan
 
     @staticmethod
-    def _process_create(splitted: list[str],):
-        typeof = splitted[0].lower()
+    def _process_create(tokens: _Tokens) -> QueryPlan:
+        typeof = tokens.next("DTYPE or TABLE").lower()
         match typeof:
             case "dtype":
-                return QueryParser._process_create_dtype(splitted[1:])
+                return QueryParser._process_create_dtype(tokens)
             case "table":
-                return QueryParser._process_create_table(splitted[1:])
+                return QueryParser._process_create_table(tokens)
             case _:
-                raise SyntaxError(f"Unknown query type: CREATE {typeof}")
-
+                raise SyntaxError(f"Unknown query type: CREATE {typeof.upper()}")
 
     @staticmethod
-    def _process_create_dtype(splitted: list[str]):
-        types = {
-            "int": int,
-            "float": float,
-            "str": str,
-            "bool": bool,
-            "datetime": datetime,
-        }
+    def _process_create_dtype(tokens: _Tokens) -> QueryPlan:
+        name = tokens.name("dtype name")
         fields = []
-        name = splitted[0]
-        if name.endswith("("):
-            name = name[:-1]
-        else:
-            if not splitted[1].startswith("("):
-                raise SyntaxError(f"Expected '(' near {name}")
-        state = 0
-        field = []
-        for token in splitted[1:]:
-            if token in (",", ")"):
-                continue
-            if token == ")":
-                if state == 1:
-                    token = token[:-1]
-                    field.append(types[token])
-                fields.append(tuple(field))
+        tokens.expect("(")
+        while True:
+            field = tokens.name("field name")
+            type_name = tokens.name("field type")
+            if type_name.lower() not in FIELD_TYPES:
+                raise SyntaxError(f"Unknown field type: {type_name}")
+            fields.append((field, FIELD_TYPES[type_name.lower()]))
+            if not tokens.accept(","):
                 break
-            if state == 1:
-                token = types[token]
-            field.append(token)
-            state = ~state
+        tokens.expect(")")
 
         dtype = dataclasses.make_dataclass(name, fields)
         return QueryPlan(
+            operation = QueryType.CREATE,
             table = '',
-            kwargs = {"dtype": dtype},
-            operation = QueryType.CREATE
+            kwargs = {"name": name, "dtype": dtype},
         )
 
     @staticmethod
-    def _process_create_table(splitted: list[str],):
-        name = splitted[0]
-        if name.endswith("("):
-            name = name[:-1]
-            dtype = splitted[1]
-        else:
-            if not splitted[1].startswith("("):
-                raise SyntaxError(f"Expected '(' near {name}")
-            dtype = splitted[2]
-
-        if dtype.endswith(")"):
-            dtype = dtype[:-1]
+    def _process_create_table(tokens: _Tokens) -> QueryPlan:
+        name = tokens.name("table name")
+        tokens.expect("(")
+        dtype = tokens.name("dtype name")
+        tokens.expect(")")
+        options = {"stable_ids": False, "columnar": False}
+        while tokens.is_keyword(*options):
+            options[tokens.next().lower()] = True
 
         return QueryPlan(
             operation = QueryType.CREATE,
             table = name,
-            kwargs = {"dtype": dtype},
+            kwargs = {"dtype_name": dtype, **options},
         )
 
     @staticmethod
-    def _process_select(splitted: list[str],):
-        op = splitted[0].lower()
-        if op.lower() != "from":
-            raise SyntaxError(f"Expected 'from' (got {op})")
-
-        name = splitted[1]
-        ind = 2
-        for token in splitted[2:]:
-            if token.lower() == "where":
-                break
-            ind += 1
-        filters = QueryParser._process_filters(splitted[ind+1:])
+    def _process_select(tokens: _Tokens) -> QueryPlan:
+        tokens.accept("*")
+        tokens.expect("from")
+        name = tokens.name("table name")
+        filters = QueryParser._process_where(tokens)
+        order_by = None
+        if tokens.accept("order"):
+            tokens.expect("by")
+            order_by = tokens.name("field name")
+            if tokens.accept("desc"):
+                order_by = f"-{order_by}"
+            else:
+                tokens.accept("asc")
+        limit = QueryParser._process_number(tokens) if tokens.accept("limit") else None
+        offset = QueryParser._process_number(tokens) if tokens.accept("offset") else 0
         return QueryPlan(
             operation = QueryType.SELECT,
             table = name,
-            kwargs = {"filters": filters},
+            kwargs = {"filters": filters, "order_by": order_by, "limit": limit, "offset": offset},
         )
 
     @staticmethod
-    def _process_insert(splitted: list[str],):
-        op = splitted[0].lower()
-        if op != "into":
-            raise SyntaxError(f"Expected 'into' (got {op})")
-        name = splitted[1]
+    def _process_insert(tokens: _Tokens) -> QueryPlan:
+        tokens.expect("into")
+        name = tokens.name("table name")
+        fields = None
+        if tokens.peek() == "(":
+            fields = QueryParser._process_list(tokens, tokens.name)
+        tokens.expect("values")
+        rows = [QueryParser._process_list(tokens, tokens.value)]
+        while tokens.accept(","):
+            rows.append(QueryParser._process_list(tokens, tokens.value))
+        if fields is not None and any(len(row) != len(fields) for row in rows):
+            raise SyntaxError(f"Expected {len(fields)} values in every row")
+        return QueryPlan(
+            operation = QueryType.INSERT,
+            table = name,
+            kwargs = {"fields": fields, "rows": tuple(rows)},
+        )
+
+    @staticmethod
+    def _process_update(tokens: _Tokens) -> QueryPlan:
+        name = tokens.name("table name")
+        tokens.expect("set")
+        values = {}
+        while True:
+            field = tokens.name("field name")
+            tokens.expect("=")
+            values[field] = tokens.value()
+            if not tokens.accept(","):
+                break
+        filters = QueryParser._process_where(tokens)
+        return QueryPlan(
+            operation = QueryType.UPDATE,
+            table = name,
+            kwargs = {"values": values, "filters": filters},
+        )
 
+    @staticmethod
+    def _process_delete(tokens: _Tokens) -> QueryPlan:
+        tokens.expect("from")
+        name = tokens.name("table name")
+        filters = QueryParser._process_where(tokens)
+        return QueryPlan(
+            operation = QueryType.DELETE,
+            table = name,
+            kwargs = {"filters": filters},
+        )
 
     @staticmethod
-    def _process_filters(splitted: list[str],):
-        op_map = {
-            "=": "eq",
-            ">": "gt",
-            "<": "lt",
-            ">=": "ge",
-            "<=": "le",
-            "in": "in"
-        }
-        state = 0
-        field = op = ""
-        filters = {}
-        for token in splitted:
-            match state:
-                case 0:
-                    field = token
-                case 1:
-                    op = op_map[token]
-                case 2:
-                    val = token
-                    filters[f"{field}__{op}"] = val
-                    field = op = ""
-
-            state = (state + 1) % 3
+    def _process_where(tokens: _Tokens) -> dict[str, Any]:
+        if not tokens.accept("where"):
+            return {}
+        return QueryParser._process_filters(tokens)
 
+    @staticmethod
+    def _process_filters(tokens: _Tokens) -> dict[str, Any]:
+        filters = {}
+        while True:
+            field = tokens.name("field name")
+            token = tokens.next("operator")
+            op = FILTER_OPERATORS.get(token.lower())
+            if op is None:
+                raise SyntaxError(f"Unknown operator: {token}")
+            key = f"{field}__{op}"
+            if key in filters:
+                raise SyntaxError(f"Duplicate filter: {field} {token}")
+            filters[key] = QueryParser._process_list(tokens, tokens.value) if op == "in" else tokens.value()
+            if not tokens.accept("and"):
+                break
         return filters
 
+    @staticmethod
+    def _process_list(tokens: _Tokens, item) -> tuple:
+        tokens.expect("(")
+        items = [item()]
+        while tokens.accept(","):
+            items.append(item())
+        tokens.expect(")")
+        return tuple(items)
+
+    @staticmethod
+    def _process_number(tokens: _Tokens) -> int:
+        token = tokens.next("number")
+        if not token.isdigit():
+            raise SyntaxError(f"Expected non-negative integer (got {token})")
+        return int(token)
+
 
+@lru_cache(maxsize=128)  # bounded: dtypes may be created at runtime, cache must not keep all of them alive
+def field_types(dtype: type) -> dict[str, Any]:
+    """
+    :param dtype: dataclass
+    :return: resolved types of dataclass fields
+    """
+    hints = typing.get_type_hints(dtype)
+    return {field.name: hints.get(field.name, Any) for field in dataclasses.fields(dtype)}
+
+
+def convert_value(value: str, type_: Any) -> Any:
+    """
+    Convert text value of query to field type
+    :param value: text value
+    :param type_: type of field(``Any`` and unknown types keep value as is)
+    :return: converted value
+    :raise ValueError: value can't be converted
+    """
+    if typing.get_origin(type_) in (typing.Union, types.UnionType):
+        for arg in typing.get_args(type_):
+            if arg is type(None):
+                continue
+            try:
+                return convert_value(value, arg)
+            except ValueError:
+                pass
+        raise ValueError(f"Invalid value {value!r} for type {type_}")
+    if type_ is bool:
+        lowered = value.lower()
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+        raise ValueError(f"Invalid value {value!r} for type bool")
+    if type_ in (datetime.datetime, datetime.date, datetime.time):
+        return type_.fromisoformat(value)
+    if type_ in (int, float, str):
+        try:
+            return type_(value)
+        except ValueError:
+            raise ValueError(f"Invalid value {value!r} for type {type_.__name__}") from None
+    return value
+
+
+def typed_values(dtype: type, values: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert text values of filters or updates to field types of dtype
+    :param dtype: dataclass of table
+    :param values: ``{FIELD: value}`` or ``{FIELD__OPERATOR: value}``; tuples(``in`` filters) are converted item by item
+    :return: dict with converted values(values of unknown fields are kept as is)
+    :raise ValueError: value can't be converted
+    """
+    types_ = field_types(dtype)
+    typed = {}
+    for key, value in values.items():
+        field, _ = parse_filter(key)
+        type_ = types_.get(field, Any)
+        if isinstance(value, tuple):
+            typed[key] = tuple(convert_value(item, type_) for item in value)
+        else:
+            typed[key] = convert_value(value, type_)
+    return typed
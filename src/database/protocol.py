@@ -0,0 +1,289 @@
+"""
+Binary protocol of database server. Every message is a frame: header(payload length, request id, code) and payload
+with one encoded value. Request code is ``Op``, response code is ``Status``; responses carry id of their request, so
+client can send many requests without waiting(pipelining) and match responses that come in any order.
+
+Values are encoded with one-byte tags: ``None``/bools, 64-bit ints, floats, strings, bytes, dates, lists, tuples,
+dicts, lists and sets of ints(as packed ``array('q')``) and ``Rows``(values of dtype rows without field names)
+"""
+import datetime
+import struct
+from array import array
+from dataclasses import dataclass, fields
+from enum import IntEnum
+from operator import attrgetter
+from typing import Any, Callable, Iterable
+
+HEADER = struct.Struct("<IIB")
+"""Frame header: payload length, request id, ``Op`` or ``Status``"""
+
+MAX_PAYLOAD = 1 << 30
+
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_SIZE = struct.Struct("<I")
+_ROWS = struct.Struct("<HI")
+_INT_MIN, _INT_MAX = -1 << 63, (1 << 63) - 1
+
+
+class Op(IntEnum):
+    """Request codes. Payload is a tuple of arguments"""
+    PING = 0
+    SELECT = 1
+    """``(table, filters)`` -> set of ids"""
+    SELECT_MANY = 2
+    """``(table, [filters, ...])`` -> list of sets of ids"""
+    SELECT_ROWS = 3
+    """``(table, filters)`` -> ``Rows``"""
+    ITER_ROWS = 4
+    """``(table, order_by, limit, offset, filters)`` -> ``Rows``"""
+    INSERT = 5
+    """``(table, values of row)``"""
+    INSERT_MANY = 6
+    """``(table, [values of row, ...])``"""
+    UPDATE = 7
+    """``(table, values, filters)``"""
+    DELETE = 8
+    """``(table, filters)``"""
+    EXECUTE = 9
+    """``(query,)`` -> ``Rows`` for SELECT, ``None`` otherwise"""
+
+
+class Status(IntEnum):
+    """Response codes"""
+    OK = 0
+    ERROR = 1
+    """Payload: ``(exception class name, message, args)``"""
+
+
+@dataclass
+class Rows:
+    """Values of dtype rows of table(in order of dtype fields)"""
+    table_name: str
+    values: list[tuple]
+
+    @classmethod
+    def of(cls, table_name: str, dtype: type, rows: Iterable) -> "Rows":
+        """
+        :param table_name: table name
+        :param dtype: dataclass of rows
+        :param rows: dtype objects
+        """
+        names = [field.name for field in fields(dtype)]
+        getter = attrgetter(*names)
+        if len(names) == 1:
+            return cls(table_name, [(getter(row),) for row in rows])
+        return cls(table_name, [getter(row) for row in rows])
+
+
+def row_values(row) -> tuple:
+    """
+    :return: field values of dtype object
+    """
+    return tuple(getattr(row, field.name) for field in fields(row))
+
+
+def _encode_int(out: bytearray, value: int) -> None:
+    if _INT_MIN <= value <= _INT_MAX:
+        out += b"i"
+        out += _INT.pack(value)
+    else:
+        data = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+        out += b"I"
+        out += _SIZE.pack(len(data))
+        out += data
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    data = value.encode()
+    out += _SIZE.pack(len(data))
+    out += data
+
+
+def _encode_ints(out: bytearray, tag: bytes, values) -> bool:
+    """Encode ints as packed array(``False`` if some values are not ints or don't fit)"""
+    if not all(type(value) is int for value in values):
+        return False
+    try:
+        data = array('q', values)
+    except OverflowError:
+        return False
+    out += tag
+    out += _SIZE.pack(len(data))
+    out += data.tobytes()
+    return True
+
+
+def _encode_items(out: bytearray, tag: bytes, values) -> None:
+    out += tag
+    out += _SIZE.pack(len(values))
+    for value in values:
+        _encode(out, value)
+
+
+def _encode(out: bytearray, value) -> None:
+    kind = type(value)
+    if value is None:
+        out += b"N"
+    elif kind is bool:
+        out += b"T" if value else b"F"
+    elif kind is int:
+        _encode_int(out, value)
+    elif kind is float:
+        out += b"f"
+        out += _FLOAT.pack(value)
+    elif kind is str:
+        out += b"s"
+        _write_str(out, value)
+    elif kind is list:
+        if not (value and _encode_ints(out, b"q", value)):
+            _encode_items(out, b"l", value)
+    elif kind is tuple:
+        _encode_items(out, b"t", value)
+    elif kind is set or kind is frozenset:
+        if not _encode_ints(out, b"Q", value):
+            _encode_items(out, b"S", value)
+    elif kind is dict:
+        out += b"m"
+        out += _SIZE.pack(len(value))
+        for key, item in value.items():
+            _encode(out, key)
+            _encode(out, item)
+    elif kind is bytes:
+        out += b"b"
+        out += _SIZE.pack(len(value))
+        out += value
+    elif kind is datetime.datetime:
+        out += b"d"
+        _write_str(out, value.isoformat())
+    elif kind is datetime.date:
+        out += b"a"
+        _write_str(out, value.isoformat())
+    elif kind is Rows:
+        out += b"R"
+        _write_str(out, value.table_name)
+        width = len(value.values[0]) if value.values else 0
+        out += _ROWS.pack(width, len(value.values))
+        for row in value.values:
+            for item in row:
+                _encode(out, item)
+    else:
+        raise TypeError(f"Can't encode value of type {kind.__name__}")
+
+
+def encode(value) -> bytes:
+    """
+    :param value: value to encode
+    :return: payload
+    :raise TypeError: value(or its item) has type protocol doesn't support
+    """
+    out = bytearray()
+    _encode(out, value)
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def skip(self, size: int) -> int:
+        """
+        :return: offset of skipped bytes
+        """
+        start = self.pos
+        self.pos += size
+        if self.pos > len(self.data):
+            raise ValueError("Payload is truncated")
+        return start
+
+    def take(self, size: int) -> memoryview:
+        start = self.skip(size)
+        return self.data[start:self.pos]
+
+    def size(self) -> int:
+        return _SIZE.unpack_from(self.data, self.skip(_SIZE.size))[0]
+
+    def count(self, item_size: int = 1) -> int:
+        """
+        Read number of items of container. Every encoded value takes at least one byte(its tag), so number of items is
+        checked against rest of payload before any of them is decoded
+        :param item_size: min number of bytes of one item
+        :raise ValueError: payload is too short for such number of items
+        """
+        count = self.size()
+        if count * item_size > len(self.data) - self.pos:
+            raise ValueError("Payload is truncated")
+        return count
+
+    def text(self) -> str:
+        return str(self.take(self.size()), "utf-8")
+
+    def ints(self) -> list[int]:
+        data = array('q')
+        data.frombytes(self.take(self.size() * data.itemsize))
+        return data.tolist()
+
+    def value(self):
+        tag = self.data[self.skip(1)]
+        decode = _DECODERS.get(tag)
+        if decode is None:
+            raise ValueError(f"Unknown tag {chr(tag)!r}")
+        return decode(self)
+
+
+def _decode_rows(reader: _Reader) -> Rows:
+    table_name = reader.text()
+    width, count = _ROWS.unpack_from(reader.data, reader.skip(_ROWS.size))
+    if count and not width:
+        raise ValueError("Rows without fields")
+    if width * count > len(reader.data) - reader.pos:
+        raise ValueError("Payload is truncated")
+    value = reader.value
+    return Rows(table_name, [tuple(value() for _ in range(width)) for _ in range(count)])
+
+
+def _decode_dict(reader: _Reader) -> dict:
+    value = reader.value
+    return {value(): value() for _ in range(reader.count(2))}
+
+
+_DECODERS: dict[int, Callable[[_Reader], Any]] = {
+    ord("N"): lambda reader: None,
+    ord("T"): lambda reader: True,
+    ord("F"): lambda reader: False,
+    ord("i"): lambda reader: _INT.unpack_from(reader.data, reader.skip(_INT.size))[0],
+    ord("I"): lambda reader: int.from_bytes(reader.take(reader.size()), "little", signed=True),
+    ord("f"): lambda reader: _FLOAT.unpack_from(reader.data, reader.skip(_FLOAT.size))[0],
+    ord("s"): _Reader.text,
+    ord("b"): lambda reader: bytes(reader.take(reader.size())),
+    ord("l"): lambda reader: [reader.value() for _ in range(reader.count())],
+    ord("t"): lambda reader: tuple(reader.value() for _ in range(reader.count())),
+    ord("S"): lambda reader: {reader.value() for _ in range(reader.count())},
+    ord("q"): _Reader.ints,
+    ord("Q"): lambda reader: set(reader.ints()),
+    ord("m"): _decode_dict,
+    ord("d"): lambda reader: datetime.datetime.fromisoformat(reader.text()),
+    ord("a"): lambda reader: datetime.date.fromisoformat(reader.text()),
+    ord("R"): _decode_rows,
+}
+
+
+def decode(payload: bytes):
+    """
+    :param payload: encoded value
+    :return: value
+    :raise ValueError: payload is malformed
+    """
+    reader = _Reader(payload)
+    value = reader.value()
+    if reader.pos != len(reader.data):
+        raise ValueError("Trailing bytes in payload")
+    return value
+
+
+def frame(request_id: int, code: int, payload: bytes) -> bytes:
+    """
+    :return: message with header
+    """
+    return HEADER.pack(len(payload), request_id, code) + payload
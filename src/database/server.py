@@ -0,0 +1,178 @@
+"""
+Database server: one ``AsyncDatabaseSession`` shared by clients over TCP or Unix socket(see ``src.database.protocol``)
+"""
+import asyncio
+from pathlib import Path
+
+from src.app_logger import AppLogger
+from src.database.async_session import AsyncDatabaseSession
+from src.database.protocol import HEADER, MAX_PAYLOAD, Op, Rows, Status, decode, encode, frame
+from src.orm.exceptions import ConstraintFailed
+
+
+def error_payload(error: Exception) -> bytes:
+    """
+    :return: encoded ``(exception class name, message, args)``(args are dropped if they can't be encoded)
+    """
+    if isinstance(error, ConstraintFailed):
+        args = (error.constraint_type.value, error.field, error.value)
+    else:
+        args = error.args
+    try:
+        return encode((type(error).__name__, str(error), args))
+    except TypeError:
+        return encode((type(error).__name__, str(error), ()))
+
+
+class DatabaseServer:
+    """
+    Serves session to clients over TCP(``host``, ``port``) or Unix socket(``path``). Requests of connection are executed
+    concurrently and answered as soon as they are done, so clients can pipeline them; at most ``max_inflight`` requests
+    of connection are in progress(reading of connection is paused above it). Concurrent inserts of all clients are
+    coalesced by session. Usage: ``async with DatabaseServer(db) as server: await server.serve_forever()``
+    :param db: session to serve
+    :param host: TCP host
+    :param port: TCP port(``0`` - any free port, see ``address``)
+    :param path: Unix socket path(TCP is not used if set)
+    :param max_inflight: max number of requests of connection in progress
+    """
+    def __init__(self, db: AsyncDatabaseSession, host: str = "127.0.0.1", port: int = 0, path: str | Path | None = None,
+                 max_inflight: int = 256):
+        self.db = db
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_inflight = max_inflight
+        self.address: tuple[str, int] | str | None = None
+        """Listening address: ``(host, port)`` or Unix socket path"""
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._logger = AppLogger.get_logger(__name__)
+
+    async def start(self) -> None:
+        """Start listening"""
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._serve, self.path)
+            self.address = str(self.path)
+        else:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        self._logger.info(f"Listening on {self.address}")
+
+    async def serve_forever(self) -> None:
+        """
+        Serve until cancelled
+        :raise RuntimeError: server is not started
+        """
+        if self._server is None:
+            raise RuntimeError("Server is not started")
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """
+        Stop listening and close connections(requests in progress are finished first). Connections are closed before
+        waiting for server: ``wait_closed`` waits for all of them since Python 3.12.1
+        """
+        if self._server is None:
+            return
+        self._server.close()
+        for connection in list(self._connections):
+            connection.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self) -> "DatabaseServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = asyncio.current_task()
+        assert connection is not None  # connection callbacks run as tasks
+        self._connections.add(connection)
+        slots = asyncio.Semaphore(self.max_inflight)
+        requests: set[asyncio.Task] = set()
+
+        def finished(request: asyncio.Task) -> None:
+            requests.discard(request)
+            slots.release()
+
+        try:
+            while True:
+                size, request_id, code = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if size > MAX_PAYLOAD:
+                    raise ValueError(f"Request of {size} bytes is too large")
+                payload = await reader.readexactly(size)
+                await slots.acquire()
+                request = asyncio.create_task(self._respond(writer, request_id, code, payload))
+                requests.add(request)
+                request.add_done_callback(finished)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as error:
+            self._logger.error(f"Closing connection: {error}")
+        finally:
+            await asyncio.gather(*requests, return_exceptions=True)
+            writer.close()
+            self._connections.discard(connection)
+
+    async def _respond(self, writer: asyncio.StreamWriter, request_id: int, code: int, payload: bytes) -> None:
+        try:
+            response = frame(request_id, Status.OK, encode(await self._dispatch(Op(code), decode(payload))))
+        except Exception as error:
+            response = frame(request_id, Status.ERROR, error_payload(error))
+        if writer.is_closing():
+            return
+        writer.write(response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _dispatch(self, op: Op, args: tuple):
+        """
+        :return: result of request(see ``Op``)
+        """
+        db = self.db
+        session = db.session
+        match op:
+            case Op.PING:
+                return None
+            case Op.SELECT:
+                table_name, filters = args
+                return await db.select(table_name, **filters)
+            case Op.SELECT_MANY:
+                table_name, queries = args
+                return await db.select_many(table_name, queries)
+            case Op.SELECT_ROWS:
+                table_name, filters = args
+                return Rows.of(table_name, session.table_dtype(table_name), await db.select_rows(table_name, **filters))
+            case Op.ITER_ROWS:
+                table_name, order_by, limit, offset, filters = args
+                rows = [row async for row in db.iter_rows(table_name, order_by, limit, offset, **filters)]
+                return Rows.of(table_name, session.table_dtype(table_name), rows)
+            case Op.INSERT:
+                table_name, values = args
+                await db.insert(table_name, session.table_dtype(table_name)(*values))
+            case Op.INSERT_MANY:
+                table_name, rows = args
+                dtype = session.table_dtype(table_name)
+                await db.insert_many(table_name, [dtype(*values) for values in rows])
+            case Op.UPDATE:
+                table_name, values, filters = args
+                await db.update(table_name, values, **filters)
+            case Op.DELETE:
+                table_name, filters = args
+                await db.delete(table_name, **filters)
+            case Op.EXECUTE:
+                query, = args
+                result = await db.execute(query)
+                if result is None:
+                    return None
+                plan = session.parse(query)
+                assert plan is not None  # only non-empty queries return rows
+                return Rows.of(plan.table, session.table_dtype(plan.table), result)
+        return None
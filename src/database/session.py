@@ -1,10 +1,24 @@
+import threading
 from collections import UserDict
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from dataclasses import is_dataclass, replace
-from typing import Any, TypeVar, Generic, Sequence
+from pathlib import Path
+from typing import Any, TypeVar, Generic, Iterator, Sequence
 import src.constants as cst
-from src.database.log_operations import Insert, Update, Delete, LogOperation
-from src.orm.collection import Collection, ImmutableCollection
+from src.database import snapshot
+from src.database.mvcc import Snapshot, VersionStore
+from src.database.cache import CacheStats, LRUCache, query_key
+from src.database.parser import QueryParser, field_types, typed_values
+from src.database.query_plan import QueryPlan, QueryType
+from src.database.wal import WriteAheadLog
+from src.database.log_operations import (
+    Insert, InsertMany, Update, UpdateMany, Delete, DeleteMany, Compact, LogOperation, from_record, to_record, undo
+)
+from src.orm.collection import Collection, CollectionView
+from src.orm.columnar import ColumnarCollection
+from src.orm.locks import RWLock
+from src.orm.parallel import ParallelScanner
+from src.orm.prepared import PreparedQuery
 from src.orm.table import Table, DictConstraints
 
 K = TypeVar("K")
@@ -24,49 +38,312 @@ class RaiseOnExistDict(UserDict[K, V], Generic[K, V]):
         self.data[key] = value
 
 
+class _TransactionState:
+    """
+    State of transaction: undo log, savepoints, write locks of tables held until commit or rollback
+    """
+    def __init__(self):
+        self.operations: list[LogOperation] | None = None
+        self.savepoints: list[tuple[str, int]] = []
+        self.locks: dict[str, RWLock] = {}
+
+
+class _ThreadTransactionState(_TransactionState, threading.local):
+    """
+    State of transaction of every thread
+    """
+
+
 class DatabaseSession:
     """
     Database session. As this database stores values in Python collection, session also represents the whole database(it stores tables, dtypes etc.)
+
+    In concurrent mode session can be shared by threads: every table has reader-writer lock(many concurrent readers or
+    one writer), transactions are per thread and hold write locks of tables they change until commit or rollback.
+    Results of ``select_rows``/``iter_rows`` are copied while read lock is held. Create tables before starting threads
+    :param cache_size: max number of cached query results(``0`` - cache disabled). Cached results are invalidated by table version
+    :param plan_cache_size: max number of cached plans of text queries(``0`` - cache disabled), see ``execute``
+    :param concurrent: lock tables, so session can be used by several threads
+    :param lock_timeout: max seconds to wait for lock of table in concurrent mode(``TimeoutError`` is raised, e.g. when
+    transactions lock the same tables in different order); ``None`` - wait forever
+    :param scan_workers: number of processes to run full scans of columnar tables in(``0`` - scans are not parallel),
+    see ``ParallelScanner``
+    :param scan_threshold: min number of rows of table to scan it in parallel
     """
-    def __init__(self):
+    def __init__(self, cache_size: int = 0, plan_cache_size: int = 128, concurrent: bool = False, lock_timeout: float | None = None,
+                 scan_workers: int = 0, scan_threshold: int = 1_000_000):
         self._tables: RaiseOnExistDict[str, Table] = RaiseOnExistDict()
         self._dtypes: RaiseOnExistDict[str, DataclassInstance] = RaiseOnExistDict()
-        self._transaction: list | None = None
+        self._concurrent = concurrent
+        self._lock_timeout = lock_timeout
+        self._state = _ThreadTransactionState() if concurrent else _TransactionState()
+        self._cache: LRUCache[tuple, tuple[int, frozenset[int]]] | None = LRUCache(cache_size) if cache_size else None
+        self._plans: LRUCache[str, QueryPlan] | None = LRUCache(plan_cache_size) if plan_cache_size else None
+        self._wal: WriteAheadLog | None = None
+        self._snapshot_seq = 0
+        self._versions = VersionStore()
+        self._scanner = ParallelScanner(scan_workers, scan_threshold) if scan_workers else None
+
+    @property
+    def concurrent(self) -> bool:
+        """Tables are locked, so session can be used by several threads"""
+        return self._concurrent
+
+    @property
+    def _transaction(self) -> list[LogOperation] | None:
+        return self._state.operations
+
+    @_transaction.setter
+    def _transaction(self, operations: list[LogOperation] | None) -> None:
+        self._state.operations = operations
+
+    @property
+    def _savepoints(self) -> list[tuple[str, int]]:
+        return self._state.savepoints
+
+    @_savepoints.setter
+    def _savepoints(self, savepoints: list[tuple[str, int]]) -> None:
+        self._state.savepoints = savepoints
+
+    @contextmanager
+    def _read_locked(self, table: Table):
+        """Hold read lock of table(concurrent mode only)"""
+        if table.lock is None:
+            yield
+            return
+        with table.lock.read(self._lock_timeout):
+            yield
+
+    @contextmanager
+    def _write_locked(self, table_name: str):
+        """
+        Hold write lock of table(concurrent mode only) and mutex of its versions(so snapshots don't copy rows in the middle
+        of operation). Lock taken in transaction is held until commit or rollback
+        """
+        lock = self._tables[table_name].lock
+        state = self._state
+        release = False
+        if lock is not None and table_name not in state.locks:
+            lock.acquire_write(self._lock_timeout)
+            if state.operations is not None:
+                state.locks[table_name] = lock
+            else:
+                release = True
+        try:
+            with self._versions.mutex(table_name):
+                yield
+        finally:
+            if release:
+                lock.release_write()
+
+    @contextmanager
+    def _all_read_locked(self):
+        """Hold read locks of all tables(in order of names, concurrent mode only)"""
+        with ExitStack() as stack:
+            for name in sorted(self._tables):
+                stack.enter_context(self._read_locked(self._tables[name]))
+            yield
+
+    def _release_locks(self) -> None:
+        """Release write locks held by transaction"""
+        locks = self._state.locks
+        while locks:
+            locks.popitem()[1].release_write()
 
     def begin(self) -> None:
         """Begin transaction"""
         if self._transaction is not None:
             raise RuntimeError("Transaction already in progress")
         self._transaction = []
+        self._savepoints = []
 
     def commit(self) -> None:
-        """Commit transaction"""
+        """
+        Commit transaction. With write-ahead log transaction is logged first(it is rolled back if logging fails)
+        """
         if self._transaction is None:
             raise RuntimeError("No transaction in progress")
+        if self._wal is not None and self._transaction:
+            try:
+                self._wal.append([to_record(operation) for operation in self._transaction])
+            except Exception:
+                self.rollback()
+                raise
+        self._versions.commit(self._transaction)
         self._transaction = None
+        self._savepoints = []
+        self._release_locks()
 
     def rollback(self) -> None:
         """Rollback transaction"""
         if self._transaction is None:
             raise RuntimeError("No transaction in progress")
 
-        for operation in self._transaction[::-1]:
-            self.rollback_action(operation)
+        try:
+            self._undo(self._transaction)
+        finally:
+            self._transaction = None
+            self._savepoints = []
+            self._release_locks()
 
-        self._transaction = None
+    def savepoint(self, name: str | None = None) -> str:
+        """
+        Mark current state of transaction to roll back to with ``rollback_to``. Savepoints can be nested
+        :param name: name of savepoint(generated if not set; the latest savepoint is used if name is reused)
+        :return: name of savepoint
+        :raise RuntimeError: no transaction in progress
+        """
+        if self._transaction is None:
+            raise RuntimeError("No transaction in progress")
+        if name is None:
+            name = f"savepoint_{len(self._savepoints)}"
+        self._savepoints.append((name, len(self._transaction)))
+        return name
 
-    def rollback_action(self, action: LogOperation) -> None:
+    def rollback_to(self, name: str) -> None:
+        """
+        Undo operations made after savepoint. Savepoint is kept, savepoints created after it are released
+        :param name: name of savepoint
+        :raise KeyError: savepoint not found
+        """
+        index = self._find_savepoint(name)
+        start = self._savepoints[index][1]
+        self._undo(self._transaction[start:])
+        del self._transaction[start:]
+        del self._savepoints[index + 1:]
+
+    def release(self, name: str) -> None:
+        """
+        Forget savepoint and savepoints created after it(operations are kept in transaction)
+        :param name: name of savepoint
+        :raise KeyError: savepoint not found
+        """
+        del self._savepoints[self._find_savepoint(name):]
+
+    def _find_savepoint(self, name: str) -> int:
+        """
+        :return: index of the latest savepoint with name
+        :raise KeyError: savepoint not found
+        """
+        if self._transaction is None:
+            raise RuntimeError("No transaction in progress")
+        for index in range(len(self._savepoints) - 1, -1, -1):
+            if self._savepoints[index][0] == name:
+                return index
+        raise KeyError(f"Savepoint {name!r} not found")
+
+    def _undo(self, operations: list[LogOperation]) -> None:
+        """
+        Rollback operations in reverse order. Indexes are repaired incrementally, except tables where putting deleted rows
+        back shifts positions(tables without stable ids): their indexes are rebuilt once after all operations are undone
+        :param operations: operations to rollback
+        """
+        deferred = {
+            operation.table_name for operation in operations
+            if isinstance(operation, (Delete, DeleteMany)) and not self._tables[operation.table_name].stable_ids
+        }
+        for operation in reversed(operations):
+            with self._versions.mutex(operation.table_name):
+                self.rollback_action(operation, auto_update=operation.table_name not in deferred)
+                self._versions.discard(operation)
+        for table_name in deferred:
+            self._tables[table_name].rebuild_indexes()
+
+    def rollback_action(self, action: LogOperation, auto_update: bool = True) -> None:
         """
         Rollbacks action
-        :param action: ``LogOperation``: action to rollback"""
+        :param action: ``LogOperation``: action to rollback
+        :param auto_update: update indexes(rebuild them after rollback otherwise)
+        """
+        undo(self._tables[action.table_name], action, auto_update)
+
+    def _log(self, operations: list[LogOperation]) -> None:
+        """
+        Record applied operations: in transaction log(for rollback) or in write-ahead log as committed transaction. Versions
+        of snapshots get them too. Operations are undone if logging fails
+        """
+        if self._transaction is not None:
+            self._transaction.extend(operations)
+            self._versions.record(operations)
+            return
+        if self._wal is not None and operations:
+            try:
+                self._wal.append([to_record(operation) for operation in operations])
+            except Exception:
+                self._undo(operations)
+                raise
+        self._versions.commit(operations)
+
+    def redo_action(self, action: LogOperation) -> None:
+        """
+        Apply logged action again(on write-ahead log replay)
+        :param action: ``LogOperation`` with redo data
+        :raise RuntimeError: action doesn't match state of table
+        """
         table = self._tables[action.table_name]
-        if isinstance(action, Delete):
-            table.insert(action.row, action.position, auto_update=True)
-        elif isinstance(action, Insert):
-            table.remove_by_index(action.position, auto_update=True)
+        if isinstance(action, Insert):
+            pos = table.append(action.row)
+            if pos != action.position:
+                raise RuntimeError(f"Log doesn't match table {action.table_name}: row {action.position} inserted at {pos}")
+        elif isinstance(action, InsertMany):
+            positions = table.append_many(action.rows)
+            if positions.start != action.start:
+                raise RuntimeError(f"Log doesn't match table {action.table_name}: rows {action.start}... inserted at {positions.start}")
         elif isinstance(action, Update):
-            table._rows[action.position] = action.old_row
-            table.rebuild_indexes()
+            table.restore_at(action.position, action.new_row)
+        elif isinstance(action, UpdateMany):
+            table.update_many(action.positions, action.values)
+        elif isinstance(action, Delete):
+            table.remove_by_index(action.position, auto_update=True)
+        elif isinstance(action, DeleteMany):
+            table.remove_many(action.positions)
+        elif isinstance(action, Compact):
+            table.compact()
+
+    def open_wal(self, path: str | Path, durability: cst.Durability = cst.Durability.COMMIT, interval_ms: float = 10) -> int:
+        """
+        Replay write-ahead log and log every following commit to it. Schema(dtypes, tables, indexes, constraints) is not
+        logged: create it or ``load`` snapshot before opening log. Operations outside of transaction are logged as
+        transactions of their own
+        :param path: log file path(created if not exists)
+        :param durability: ``cst.Durability``: fsync on every commit, at most every ``interval_ms`` or never
+        :param interval_ms: max delay of fsync for ``cst.Durability.INTERVAL``
+        :return: number of replayed transactions
+        :raise RuntimeError: log is already open or transaction in progress
+        """
+        if self._wal is not None:
+            raise RuntimeError("Write-ahead log is already open")
+        if self._transaction is not None:
+            raise RuntimeError("Cannot open write-ahead log during transaction")
+        replayed = 0
+        for _, records in WriteAheadLog.read(path, after_seq=self._snapshot_seq):
+            for record in records:
+                self.redo_action(from_record(record, lambda name: self._tables[name].dtype))
+            replayed += 1
+        self._wal = WriteAheadLog(path, durability, interval_ms)
+        self._wal.last_seq = max(self._wal.last_seq, self._snapshot_seq)
+        return replayed
+
+    def checkpoint(self, path: str | Path) -> None:
+        """
+        Save snapshot and truncate write-ahead log(snapshot stores sequence number of last logged transaction,
+        so log records are not replayed twice if log was not truncated). Log is truncated only after snapshot is synced
+        :param path: snapshot file path
+        :raise RuntimeError: write-ahead log is not open or transaction in progress
+        """
+        if self._wal is None:
+            raise RuntimeError("Write-ahead log is not open")
+        with self._all_read_locked():
+            self.save(path)
+            self._wal.truncate()
+
+    def close(self) -> None:
+        """Sync and close write-ahead log, stop workers of parallel scans"""
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        if self._scanner is not None:
+            self._scanner.close()
 
     @contextmanager
     def transaction(self):
@@ -79,6 +356,47 @@ class DatabaseSession:
             self.rollback()
             raise
 
+    def snapshot(self) -> Snapshot:
+        """
+        Consistent read-only view of committed data: reads of snapshot take no table locks, so they don't block writers and
+        don't wait for transactions. Versions of tables are built on first read(rows are copied, changes committed after
+        snapshot are undone, indexes are built on demand) and shared by snapshots. Usage: ``with session.snapshot() as snap: snap.select(...)``
+        :return: ``Snapshot``(close it to let old versions be dropped)
+        """
+        return Snapshot(self._versions, self._tables)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Save dtypes, tables(rows, constraints, index definitions) to binary snapshot(see ``src.database.snapshot``)
+        :param path: snapshot file path(replaced atomically)
+        :raise RuntimeError: transaction in progress(snapshot would contain uncommitted changes)
+        """
+        if self._transaction is not None:
+            raise RuntimeError("Cannot save database during transaction")
+        with self._all_read_locked():
+            info = {"wal_seq": self._wal.last_seq if self._wal is not None else self._snapshot_seq}
+            snapshot.save_snapshot(path, dict(self._dtypes), dict(self._tables), info)
+
+    @classmethod
+    def load(cls, path: str | Path, **kwargs) -> "DatabaseSession":
+        """
+        Load database from snapshot written by ``save``. Columns are read from memory-mapped file, indexes are bulk-built,
+        constraints are not re-checked. Load only trusted files(values of non-primitive fields are pickled).
+        ``open_wal`` replays only transactions logged after the snapshot
+        :param path: snapshot file path
+        :param kwargs: arguments of ``DatabaseSession``(e. g. ``cache_size``)
+        :return: new session
+        :raise ValueError: file is not a snapshot
+        """
+        session = cls(**kwargs)
+        dtypes, tables, info = snapshot.load_snapshot(path)
+        session._snapshot_seq = info.get("wal_seq", 0)
+        for name, dtype in dtypes.items():
+            session._dtypes[name] = dtype
+        for name, table in tables.items():
+            session._add_table(name, table)
+        return session
+
     def create_dtype(self, name: str, dtype: DataclassInstance, if_not_exist: bool = False) -> None:
         """
         Creates dtype to use in database tables
@@ -102,32 +420,54 @@ class DatabaseSession:
         ]
         for table_name in tables_to_drop:
             del self._tables[table_name]
+            self._versions.drop(table_name)
         del self._dtypes[name]
 
-    def create_table(self, name: str, dtype_name: str, constraints: DictConstraints, if_not_exist: bool = False):
+    def create_table(self, name: str, dtype_name: str, constraints: DictConstraints, if_not_exist: bool = False, stable_ids: bool = False, columnar: bool = False):
         """
         Creates table to store dataclasses
         :param name: name of table
         :param dtype_name: name of ``dtype``(dataclass)
         :param constraints: constraints to fields(e. g. ``UNIQUE: ({'id'}, [])``)
         :param if_not_exist: skip if table already exists
+        :param stable_ids: rows keep their ids on delete(deleted rows leave a tombstone until ``compact``)
+        :param columnar: store rows by columns(``ColumnarCollection``): vectorized scans, rows are built on access
         :raise KeyError: table already exists(if_not_exist set to ``False``)
         """
         if name in self._tables and if_not_exist:
             return
         dtype = self._dtypes[dtype_name]
-        collection = Collection(dtype)
+        collection_cls = ColumnarCollection if columnar else Collection
+        collection = collection_cls(dtype, stable_ids=stable_ids)
         table = Table(collection, constraints)
         table.create()
+        self._add_table(name, table)
+
+    def _add_table(self, name: str, table: Table) -> None:
+        if self._concurrent:
+            table.lock = RWLock()
+        table.scanner = self._scanner
         self._tables[name] = table
 
+    def table_dtype(self, table_name: str) -> DataclassInstance:
+        """
+        :param table_name: table name
+        :return: dtype(dataclass) of rows of table
+        :raise KeyError: table not exists
+        """
+        return self._tables[table_name].dtype
+
     def drop_table(self, name: str):
         """
         Drops table
         :param name: name of table
         :raises KeyError: table not exists
         """
-        self._tables.pop(name)
+        with self._write_locked(name):
+            table = self._tables.pop(name)
+        self._versions.drop(name)
+        if self._scanner is not None:
+            self._scanner.forget(table.collection)
 
     def insert(self, table_name: str, row):
         """
@@ -137,93 +477,278 @@ class DatabaseSession:
         :raise ConstraintFailed: some of constraints failed
         """
         table = self._tables[table_name]
-        table.append(row)
-        pos = len(table) - 1
-        if self._transaction is not None:
-            op = Insert(table_name, pos)
-            self._transaction.append(op)
+        with self._write_locked(table_name):
+            pos = table.append(row)
+            self._log([Insert(table_name, pos, row)])
+
+    def insert_many(self, table_name: str, rows: list) -> None:
+        """
+        Inserts rows into table at once: constraints are checked for the whole batch(nothing is inserted if some of them
+        fail), indexes are updated in bulk, batch is logged as one operation
+        :param table_name: table name
+        :param rows: list of dtype of the table objects
+        :raise ConstraintFailed: some of constraints failed(duplicates within ``rows`` too)
+        """
+        table = self._tables[table_name]
+        rows = list(rows)
+        if not rows:
+            return
+        with self._write_locked(table_name):
+            positions = table.append_many(rows)
+            self._log([InsertMany(table_name, positions.start, rows)])
 
     def select(self, table_name: str, **filters) -> set[int]:
         """
         :param table_name: table name
         :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``; e. g. ``query(name__eq = 'Steve', age__gt = 18)``.
         ``query(name = 'Steve')`` == ``query(name__eq = 'Steve')``
-        :return: set of indexes
+        :return: set of indexes(row ids for tables with stable ids)
         """
         table = self._tables[table_name]
-        return table.query(**filters)
+        cache = self._cache
+        key = query_key(table_name, filters) if cache is not None else None
+        with self._read_locked(table):
+            if cache is None or key is None:
+                return table.query(**filters)
+            version = table.version
+            cached = cache.get(key, valid=lambda entry: entry[0] == version)
+            if cached is not None:
+                return set(cached[1])
+            result = table.query(**filters)
+            cache.put(key, (version, frozenset(result)))
+            return result
 
-    def select_rows(self, table_name: str, **filters) -> ImmutableCollection:
+    def prepare(self, table_name: str, **filter_template) -> PreparedQuery:
+        """
+        Compile query once: filters are parsed, indexes resolved and row check generated. Execute it with ``execute(**params)``
+        :param table_name: table name
+        :param filter_template: kwarg, passed as: ``FIELD__OPERATOR = VALUE`` or ``FIELD__OPERATOR = Param(name)``;
+        e. g. ``prepare('library', genre=Param('genre'), pages__gt=Param('min_pages'))``
+        :return: ``PreparedQuery``(bound to the table, refreshes index references when indexes are created or dropped)
+        """
+        table = self._tables[table_name]
+        return table.prepare(**filter_template)
+
+    def cache_stats(self) -> CacheStats | None:
+        """
+        :return: hit/miss/eviction counters of query cache(``None`` if cache is disabled)
+        """
+        if self._cache is None:
+            return None
+        return self._cache.stats()
+
+    def plan_cache_stats(self) -> CacheStats | None:
+        """
+        :return: hit/miss/eviction counters of text query plan cache(``None`` if cache is disabled)
+        """
+        if self._plans is None:
+            return None
+        return self._plans.stats()
+
+    def parse(self, query: str) -> QueryPlan | None:
+        """
+        Parse text query. Plans are cached by query text, so repeated queries are not tokenized and parsed again
+        :param query: text query(see ``QueryParser``)
+        :return: plan of query(``None`` for empty query)
+        :raise SyntaxError: query is malformed
+        """
+        if self._plans is None:
+            return QueryParser.parse(query)
+        plan = self._plans.get(query)
+        if plan is None:
+            plan = QueryParser.parse(query)
+            if plan is not None:
+                self._plans.put(query, plan)
+        return plan
+
+    def execute(self, query: str):
+        """
+        Execute text query, e. g. ``execute("SELECT FROM library WHERE genre = Horror AND year >= 2000")``
+        :param query: text query(see ``QueryParser``)
+        :return: result of ``execute_plan``
+        :raise SyntaxError: query is malformed
+        :raise ValueError: value can't be converted to type of field
+        """
+        plan = self.parse(query)
+        if plan is None:
+            return None
+        return self.execute_plan(plan)
+
+    def execute_plan(self, plan: QueryPlan):
+        """
+        Execute query plan. Text values are converted to field types of table dtype. Rows of INSERT are converted first
+        and inserted at once(nothing is inserted if some of them fail)
+        :param plan: ``QueryPlan``
+        :return: ``CollectionView`` of records for SELECT(iterator of records if ``order_by``, ``limit`` or ``offset`` is set),
+        ``None`` for other queries
+        :raise ValueError: value can't be converted to type of field
+        """
+        kwargs = plan.kwargs
+        if plan.operation == QueryType.CREATE:
+            if not plan.table:
+                self.create_dtype(kwargs["name"], kwargs["dtype"])
+            else:
+                self.create_table(plan.table, kwargs["dtype_name"], DictConstraints({}),
+                                  stable_ids=kwargs["stable_ids"], columnar=kwargs["columnar"])
+            return None
+
+        dtype = self.table_dtype(plan.table)
+        match plan.operation:
+            case QueryType.SELECT:
+                filters = typed_values(dtype, kwargs["filters"])
+                if kwargs["order_by"] is None and kwargs["limit"] is None and not kwargs["offset"]:
+                    return self.select_rows(plan.table, **filters)
+                return self.iter_rows(plan.table, kwargs["order_by"], kwargs["limit"], kwargs["offset"], **filters)
+            case QueryType.INSERT:
+                fields = kwargs["fields"] or list(field_types(dtype))
+                rows = []
+                for values in kwargs["rows"]:
+                    if len(values) != len(fields):
+                        raise ValueError(f"Expected {len(fields)} values, got {len(values)}")
+                    rows.append(dtype(**typed_values(dtype, dict(zip(fields, values)))))
+                self.insert_many(plan.table, rows)
+            case QueryType.UPDATE:
+                self.update(plan.table, typed_values(dtype, kwargs["values"]), **typed_values(dtype, kwargs["filters"]))
+            case QueryType.DELETE:
+                self.delete(plan.table, **typed_values(dtype, kwargs["filters"]))
+        return None
+
+    def select_rows(self, table_name: str, **filters) -> CollectionView:
         """
         :param table_name: table name
         :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``; e. g. ``query(name__eq = 'Steve', age__gt = 18)``.
         ``query(name = 'Steve') == query(name__eq = 'Steve')``
-        :return: ``ImmutableCollection`` of records
+        :return: lazy read-only ``CollectionView`` of records(ordered by position). Rows are read from the table on access,
+        use ``materialize`` to copy them
         """
         table = self._tables[table_name]
-        positions = self.select(table_name, **filters)
-        collection = Collection(table.dtype)
-        for i in positions:
-            collection.append(table[i])
-        return ImmutableCollection(collection)
+        with self._read_locked(table):
+            view = CollectionView(table, self.select(table_name, **filters))
+            if table.lock is not None:
+                # positions may point to other rows after lock is released
+                return CollectionView(view.materialize(), list(range(len(view))))
+        return view
 
 
+    def iter_rows(self, table_name: str, order_by: str | None = None, limit: int | None = None, offset: int = 0, **filters) -> Iterator:
+        """
+        Cursor over matching records. Rows are produced lazily, so only the requested page is computed when ``order_by`` field has
+        range index(otherwise top ``offset + limit`` rows are kept in bounded heap). Table must not be changed while iterating
+        :param table_name: table name
+        :param order_by: field to order by(``'-field'`` for descending order); insertion order if not set
+        :param limit: max number of records
+        :param offset: number of records to skip
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``; e. g. ``query(name__eq = 'Steve', age__gt = 18)``.
+        :return: iterator of records
+        """
+        table = self._tables[table_name]
+        if table.lock is None:
+            return (table[pos] for pos in table.iter_query(order_by, limit, offset, **filters))
+        with self._read_locked(table):
+            return iter([table[pos] for pos in table.iter_query(order_by, limit, offset, **filters)])
+
+    def select_fields(self, table_name: str, fields: tuple[str, ...], columns: bool = False, **filters) -> list[tuple] | dict[str, list]:
+        """
+        Projection of matching rows: values of ``fields`` without building records, read from covering index if there
+        is one(see ``Table.select_fields``)
+        :param table_name: table name
+        :param fields: fields to select, e.g. ``('isbn', 'year')``
+        :param columns: return ``{field: values}`` instead of tuples
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``
+        :return: tuples of values(ordered by position) or ``{field: values}``
+        """
+        table = self._tables[table_name]
+        with self._read_locked(table):
+            return table.select_fields(fields, columns, **filters)
+
+    def aggregate(self, table_name: str, group_by: str | list[str] | None = None, aggs: dict | None = None, **filters) -> dict:
+        """
+        Aggregate matching rows without building them(see ``Table.aggregate``)
+        :param table_name: table name
+        :param group_by: field or fields to group by
+        :param aggs: ``{name: (func, field)}``, func is one of ``count``, ``sum``, ``min``, ``max``, ``avg``; e. g.
+        ``aggregate('library', 'author', {'books': 'count', 'pages': ('avg', 'pages')}, year__gt=2000)``
+        :param filters: kwarg, passed as: ``FIELD__OPERATOR = VALUE``
+        :return: ``{name: value}`` without grouping, ``{key: {name: value}}`` otherwise(key is tuple for several fields)
+        """
+        table = self._tables[table_name]
+        with self._read_locked(table):
+            return table.aggregate(group_by, aggs, **filters)
+
     def update(self, table_name: str, values: dict, **filters,) -> None:
         """
+        Update matching rows at once: constraints are checked for the whole batch(nothing is updated if some of them
+        fail), indexes of updated fields are changed in bulk, update is logged as one operation
         :param table_name: table name
         :param values: dict with keys 'name' and 'value'(e. g. {'name': 'New Updated Fresh Name'})
         :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. query(name__eq = 'Steve', age__gt = 18).
         query(name = 'Steve') == query(name__eq = 'Steve')
         :raise ConstraintFailed: some of constraints failed
         """
-
         table = self._tables[table_name]
-        positions = list(self.select(table_name, **filters))
-
-        for pos in positions:
-            old_row = table[pos]
-            table.update_at(pos, values)
-            if self._transaction is not None:
-                self._transaction.append(Update(table_name, pos, old_row))
-
+        with self._write_locked(table_name):
+            positions = sorted(self.select(table_name, **filters))
+            if not positions:
+                return
+            values = dict(values)
+            old_values = table.update_many(positions, values)
+            self._log([UpdateMany(table_name, positions, values, old_values)])
 
     def delete(self, table_name: str, **filters) -> None:
         """
+        Delete matching rows at once(indexes are updated in bulk, delete is logged as one operation)
         :param table_name: table name
         :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. query(name__eq = 'Steve', age__gt = 18).
         query(name = 'Steve') == query(name__eq = 'Steve')
         """
         table = self._tables[table_name]
-        query_res = self.select(table_name, **filters)
-        sort = sorted(query_res, reverse=True)
-        for res in sort:
-            del_val = table[res]
-            op = Delete(table_name, res, del_val)
-            table.remove_by_index(res, auto_update=False)
-            if self._transaction is not None:
-                self._transaction.append(op)
+        with self._write_locked(table_name):
+            positions = sorted(self.select(table_name, **filters))
+            if not positions:
+                return
+            rows = table.remove_many(positions)
+            self._log([DeleteMany(table_name, positions, rows)])
 
-        table.rebuild_indexes()
+    def compact(self, table_name: str) -> dict[int, int]:
+        """
+        Reclaims slots of deleted rows of table with stable ids
+        :param table_name: table name
+        :return: mapping ``{old_id: new_id}`` of every live row(empty if nothing was reclaimed)
+        :raise RuntimeError: transaction in progress(its log refers to current row ids)
+        """
+        if self._transaction is not None:
+            raise RuntimeError("Cannot compact table during transaction")
+        table = self._tables[table_name]
+        with self._write_locked(table_name):
+            mapping = self._versions.compact(table_name, table)
+            if mapping and self._scanner is not None:
+                self._scanner.forget(table.collection)
+            if mapping and self._wal is not None:
+                self._wal.append([to_record(Compact(table_name))])
+        return mapping
 
-    def create_idx(self, table_name: str, idx_type: str, field: str):
+    def create_idx(self, table_name: str, idx_type: str, field: str | tuple[str, ...], include: tuple[str, ...] = ()):
         """
         Creates index for table
         :param table_name: name of table
         :param idx_type: type of index(e.g. base, range etc.)
-        :param field: field to create index on
+        :param field: field to create index on(tuple of fields for ``composite`` index, e.g. ``('author', 'year')``)
+        :param include: fields to store in index for ``select_fields``(covering index, see ``Table.create_index``)
         """
         table = self._tables[table_name]
-        table.create_index(idx_type, field)
+        with self._write_locked(table_name):
+            table.create_index(idx_type, field, include)
 
-    def drop_idx(self, table_name: str, field: str):
+    def drop_idx(self, table_name: str, field: str | tuple[str, ...]):
         """
         Drops index for table
         :param table_name: table name
-        :param field: field to drop index on
+        :param field: field to drop index on(tuple of fields of composite index)
         :return:
         """
         table = self._tables[table_name]
-        table.drop_index(field)
+        with self._write_locked(table_name):
+            table.drop_index(field)
 
     def create_constraint(self, table_name: str, constraint: cst.Constraint, fields: set[str], args: list | None = None) -> None:
         """
@@ -234,7 +759,8 @@ class DatabaseSession:
         :param args: extra arguments to create constraint with
         """
         table = self._tables[table_name]
-        table.create_constraint(constraint, fields, args)
+        with self._write_locked(table_name):
+            table.create_constraint(constraint, fields, args)
 
     def drop_constraint(self, table_name: str, constraint: cst.Constraint, fields: set[str]):
         """
@@ -244,4 +770,5 @@ class DatabaseSession:
         :param fields: set of fields to drop constraint on
         """
         table = self._tables[table_name]
-        table.drop_constraint(constraint, fields)
\ No newline at end of file
+        with self._write_locked(table_name):
+            table.drop_constraint(constraint, fields)
\ No newline at end of file
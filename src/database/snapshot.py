@@ -0,0 +1,327 @@
+import dataclasses
+import importlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import typing
+from array import array
+from itertools import compress
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable
+
+import src.constants as cst
+from src.database.parser import FIELD_TYPES, field_types
+from src.orm.collection import Collection
+from src.orm.columnar import ColumnarCollection, EncodedValues
+from src.orm.table import DictConstraints, Table
+from src.orm.utils import paused_gc
+
+MAGIC = b"LIBSNAP\x00"
+FORMAT_VERSION = 1
+CHUNK_ROWS = 1 << 16
+"""Rows per column chunk"""
+
+_ALIGN = 8
+_TRAILER = struct.Struct("<QQ8s")
+_TYPE_NAMES = {type_: name for name, type_ in FIELD_TYPES.items()}
+_TYPECODES = {"int64": "q", "float64": "d"}
+_PLACEHOLDERS = {"int64": 0, "float64": 0.0, "bool": False, "dict": "", "pickle": None}
+"""Values written for dead slots"""
+
+
+def _native(data: array | memoryview) -> array | memoryview:
+    """Byte order of snapshot is little-endian"""
+    if sys.byteorder != "little":
+        data = array(data.typecode if isinstance(data, array) else data.format, data.tolist())
+        data.byteswap()
+    return data
+
+
+class _Writer:
+    """
+    Writes aligned chunks of data, returns their references(``[offset, size]``)
+    """
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self.offset = 0
+
+    def write(self, data) -> list[int]:
+        view = memoryview(data).cast("B")
+        offset = self.offset
+        self._file.write(view)
+        size = view.nbytes
+        padding = -size % _ALIGN
+        self._file.write(b"\x00" * padding)
+        self.offset += size + padding
+        return [offset, size]
+
+    def write_array(self, data: array | memoryview) -> list[int]:
+        return self.write(_native(data))
+
+
+def _detect_kind(values: Iterable) -> str:
+    """
+    :param values: values of live slots
+    :return: storage kind of column
+    """
+    types = set(map(type, values))
+    if types == {int}:
+        if -2 ** 63 <= min(values) and max(values) < 2 ** 63:
+            return "int64"
+    elif types == {float}:
+        return "float64"
+    elif types == {bool}:
+        return "bool"
+    elif types == {str}:
+        return "dict"
+    return "pickle"
+
+
+def _chunks(values, alive: bytes | None, placeholder) -> Iterable[list]:
+    for start in range(0, len(values), CHUNK_ROWS):
+        chunk = values[start:start + CHUNK_ROWS]
+        if alive is not None:
+            flags = alive[start:start + CHUNK_ROWS]
+            chunk = [value if flag else placeholder for value, flag in zip(chunk, flags)]
+        yield chunk
+
+
+def _write_dictionary(writer: _Writer, dictionary: list) -> dict[str, Any]:
+    if all(type(value) is str for value in dictionary):
+        encoded = [value.encode("utf-8", "surrogatepass") for value in dictionary]
+        offsets = array("q", [0])
+        total = 0
+        for value in encoded:
+            total += len(value)
+            offsets.append(total)
+        return {"encoding": "utf8", "offsets": writer.write_array(offsets), "data": writer.write(b"".join(encoded))}
+    return {"encoding": "pickle", "data": writer.write(pickle.dumps(dictionary, pickle.HIGHEST_PROTOCOL))}
+
+
+def _write_column(writer: _Writer, values, alive: bytes | None) -> dict[str, Any]:
+    """
+    :param writer: snapshot writer
+    :param values: values of column by slots(see ``Collection.columns``)
+    :param alive: flags of live slots(``None`` if all slots are live)
+    :return: metadata of column
+    """
+    if isinstance(values, array) and values.typecode in ("q", "d"):
+        view = memoryview(values)
+        chunks = [writer.write_array(view[start:start + CHUNK_ROWS]) for start in range(0, len(view), CHUNK_ROWS)]
+        return {"kind": "int64" if values.typecode == "q" else "float64", "chunks": chunks}
+    if isinstance(values, EncodedValues):
+        view = memoryview(values.codes)
+        chunks = [writer.write_array(view[start:start + CHUNK_ROWS]) for start in range(0, len(view), CHUNK_ROWS)]
+        return {"kind": "dict", "chunks": chunks, "dictionary": _write_dictionary(writer, values.dictionary)}
+
+    kind = _detect_kind(values if alive is None else list(compress(values, alive)))
+    placeholder = _PLACEHOLDERS[kind]
+    chunks = []
+    dictionary: dict = {}
+    for chunk in _chunks(values, alive, placeholder):
+        match kind:
+            case "int64" | "float64":
+                chunks.append(writer.write_array(array(_TYPECODES[kind], chunk)))
+            case "bool":
+                chunks.append(writer.write(bytes(chunk)))
+            case "dict":
+                codes = array("q", [dictionary.setdefault(value, len(dictionary)) for value in chunk])
+                chunks.append(writer.write_array(codes))
+            case _:
+                chunks.append(writer.write(pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL)))
+    meta = {"kind": kind, "chunks": chunks}
+    if kind == "dict":
+        meta["dictionary"] = _write_dictionary(writer, list(dictionary))
+    return meta
+
+
+def _dtype_meta(name: str, dtype: type) -> dict[str, Any]:
+    return {
+        "name": name,
+        "module": dtype.__module__,
+        "qualname": dtype.__qualname__,
+        "fields": [[field, _TYPE_NAMES.get(type_, "any")] for field, type_ in field_types(dtype).items()],
+    }
+
+
+def _table_meta(writer: _Writer, name: str, dtype_name: str, table: Table) -> dict[str, Any]:
+    collection = table.collection
+    alive = collection.alive_flags()
+    return {
+        "name": name,
+        "dtype": dtype_name,
+        "stable_ids": table.stable_ids,
+        "columnar": isinstance(collection, ColumnarCollection),
+        "slots": collection.slots,
+        "alive": None if alive is None else writer.write(alive),
+        "constraints": [
+            [constraint.value, sorted(fields), args or []] for constraint, (fields, args) in table.constraints.items()
+        ],
+        "indexes": {field: index_type for field, index_type in table.index_types.items() if isinstance(field, str)},
+        "composite_indexes": [
+            [list(fields), index_type] for fields, index_type in table.index_types.items() if not isinstance(fields, str)
+        ],
+        "columns": {field: _write_column(writer, values, alive) for field, values in collection.columns().items()},
+    }
+
+
+def save_snapshot(path: str | Path, dtypes: dict[str, type], tables: dict[str, Table], info: dict[str, Any] | None = None) -> None:
+    """
+    Write binary snapshot: column chunks(typed little-endian arrays aligned to 8 bytes, so they can be memory-mapped),
+    followed by JSON metadata(dtypes, tables, constraints, index definitions) and fixed-size trailer. File is written
+    to temporary file, synced and renamed, then directory is synced
+    :param path: file path
+    :param dtypes: dtypes by name
+    :param tables: tables by name
+    :param info: extra JSON-serializable data(e.g. position in write-ahead log)
+    :raise KeyError: dtype of table is not in ``dtypes``
+    """
+    names = {dtype: name for name, dtype in dtypes.items()}
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        writer = _Writer(file)
+        writer.offset = len(MAGIC)
+        meta = {
+            "version": FORMAT_VERSION,
+            "info": info or {},
+            "dtypes": [_dtype_meta(name, dtype) for name, dtype in dtypes.items()],
+            "tables": [
+                _table_meta(writer, name, names[table.dtype], table) for name, table in tables.items()
+            ],
+        }
+        footer = writer.write(json.dumps(meta).encode("utf-8"))
+        file.write(_TRAILER.pack(footer[0], footer[1], MAGIC))
+        file.flush()
+        os.fsync(file.fileno())
+    tmp_path.replace(path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path) -> None:
+    """
+    Sync directory entry(so replaced file survives crash). Not supported on Windows
+    """
+    if sys.platform == "win32":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _resolve_dtype(meta: dict[str, Any]) -> type:
+    """
+    Import dtype by its module and name, dataclass with the same fields is made if it can't be imported
+    """
+    names = [field for field, _ in meta["fields"]]
+    try:
+        dtype = importlib.import_module(meta["module"])
+        for attr in meta["qualname"].split("."):
+            dtype = getattr(dtype, attr)
+        if dataclasses.is_dataclass(dtype) and list(field_types(dtype)) == names:
+            return dtype
+    except (ImportError, AttributeError):
+        pass
+    fields = [(field, FIELD_TYPES.get(type_name, typing.Any)) for field, type_name in meta["fields"]]
+    return dataclasses.make_dataclass(meta["qualname"].rsplit(".", 1)[-1], fields)
+
+
+class _Reader:
+    def __init__(self, buffer: mmap.mmap):
+        self._view = memoryview(buffer)
+
+    def view(self, ref: list[int]) -> memoryview:
+        offset, size = ref
+        return self._view[offset:offset + size]
+
+    def array(self, typecode: str, ref: list[int], into: array | None = None) -> array:
+        data = array(typecode) if into is None else into
+        if sys.byteorder == "little":
+            data.frombytes(self.view(ref))
+        else:
+            chunk = array(typecode, self.view(ref).tobytes())
+            chunk.byteswap()
+            data.extend(chunk)
+        return data
+
+    def dictionary(self, meta: dict[str, Any]) -> list:
+        if meta["encoding"] == "pickle":
+            return pickle.loads(self.view(meta["data"]))
+        offsets = self.array("q", meta["offsets"])
+        data = self.view(meta["data"]).tobytes()
+        return [data[start:stop].decode("utf-8", "surrogatepass") for start, stop in zip(offsets, offsets[1:])]
+
+    def column(self, meta: dict[str, Any]):
+        """
+        :return: values of column: ``array`` for numeric kinds, ``EncodedValues`` for dictionary kind, ``list`` for others
+        """
+        kind = meta["kind"]
+        if kind in _TYPECODES or kind == "dict":
+            data = array(_TYPECODES.get(kind, "q"))
+            for ref in meta["chunks"]:
+                self.array(data.typecode, ref, data)
+            return EncodedValues(data, self.dictionary(meta["dictionary"])) if kind == "dict" else data
+        values = []
+        for ref in meta["chunks"]:
+            if kind == "bool":
+                values.extend(map(bool, self.view(ref)))
+            else:
+                values.extend(pickle.loads(self.view(ref)))
+        return values
+
+    def release(self) -> None:
+        self._view.release()
+
+
+def _load_table(reader: _Reader, meta: dict[str, Any], dtype: type) -> Table:
+    collection_cls = ColumnarCollection if meta["columnar"] else Collection
+    collection = collection_cls(dtype, stable_ids=meta["stable_ids"])
+    alive = None if meta["alive"] is None else reader.view(meta["alive"]).tobytes()
+    collection.load_columns({field: reader.column(column) for field, column in meta["columns"].items()}, alive)
+    constraints = DictConstraints({
+        cst.Constraint(constraint): (set(fields), list(args)) for constraint, fields, args in meta["constraints"]
+    })
+    table = Table(collection, constraints)
+    table.created = True
+    for field, index_type in meta["indexes"].items():
+        table.create_index(index_type, field)
+    for fields, index_type in meta.get("composite_indexes", []):
+        table.create_index(index_type, tuple(fields))
+    return table
+
+
+def load_snapshot(path: str | Path) -> tuple[dict[str, type], dict[str, Table], dict[str, Any]]:
+    """
+    Read snapshot written by ``save_snapshot``. File is memory-mapped, column chunks are copied into column arrays
+    without per-row decoding(row objects are built only for tables that aren't columnar), indexes are bulk-built.
+    Snapshot may contain pickled values: load only trusted files
+    :param path: file path
+    :return: dtypes by name, tables by name and extra data passed to ``save_snapshot``
+    :raise ValueError: file is not a snapshot or has unsupported version
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        if len(buffer) < len(MAGIC) + _TRAILER.size or buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        offset, size, magic = _TRAILER.unpack_from(buffer, len(buffer) - _TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is truncated")
+        reader = _Reader(buffer)
+        try:
+            meta = json.loads(reader.view([offset, size]).tobytes())
+            if meta.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {meta.get('version')}")
+            dtypes = {dtype_meta["name"]: _resolve_dtype(dtype_meta) for dtype_meta in meta["dtypes"]}
+            with paused_gc():
+                tables = {
+                    table_meta["name"]: _load_table(reader, table_meta, dtypes[table_meta["dtype"]])
+                    for table_meta in meta["tables"]
+                }
+        finally:
+            reader.release()
+    return dtypes, tables, meta["info"]
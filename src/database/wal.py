@@ -0,0 +1,201 @@
+import os
+import pickle
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+import src.constants as cst
+from src.database.log_operations import LogRecord
+
+_HEADER = struct.Struct("<II")
+"""Frame header: payload length, crc32 of payload"""
+
+
+def _frames(path: Path) -> Iterator[tuple[int, bytes]]:
+    """
+    :param path: log file path
+    :return: iterator of ``(end offset, payload)`` of valid frames; stops at the first torn or corrupted frame
+    """
+    if not path.exists():
+        return
+    with open(path, "rb") as file:
+        offset = 0
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            size, crc = _HEADER.unpack(header)
+            payload = file.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return
+            offset += _HEADER.size + size
+            yield offset, payload
+
+
+class WriteAheadLog:
+    """
+    Append-only log of committed transactions. Every transaction is one frame(``length``, ``crc32``, pickled
+    ``(seq, records)``), a torn frame at the end(crash during write) is cut off on open.
+
+    Commits are grouped: records are appended to a buffer, one write and fsync covers every commit buffered so far.
+    With ``Durability.COMMIT`` commit returns after its records are synced(concurrent commits wait for the same fsync),
+    with ``Durability.INTERVAL`` background thread syncs buffer every ``interval_ms``, with ``Durability.NONE`` records
+    are written to OS without fsync.
+    :param path: log file path
+    :param durability: ``cst.Durability`` level
+    :param interval_ms: max delay of fsync for ``Durability.INTERVAL``
+    """
+    def __init__(self, path: str | Path, durability: cst.Durability = cst.Durability.COMMIT, interval_ms: float = 10):
+        self.path = Path(path)
+        self.durability = cst.Durability(durability)
+        self.interval_ms = interval_ms
+        end = 0
+        self.last_seq = 0
+        for end, payload in _frames(self.path):
+            self.last_seq = pickle.loads(payload)[0]
+        self._file = open(self.path, "ab")
+        if self._file.tell() != end:
+            self._file.truncate(end)
+            self._file.seek(end)
+        self._cond = threading.Condition()
+        self._buffer = bytearray()
+        self._appended = 0
+        self._synced = 0
+        self._syncing = False
+        self._error: BaseException | None = None
+        self._closed = False
+        self._flusher = None
+        if self.durability == cst.Durability.INTERVAL:
+            self._flusher = threading.Thread(target=self._run_flusher, name="wal-flusher", daemon=True)
+            self._flusher.start()
+
+    @staticmethod
+    def read(path: str | Path, after_seq: int = 0) -> Iterator[tuple[int, list[LogRecord]]]:
+        """
+        Read committed transactions
+        :param path: log file path
+        :param after_seq: skip transactions with ``seq <= after_seq``(e.g. already saved in snapshot)
+        :return: iterator of ``(seq, records)``
+        """
+        for _, payload in _frames(Path(path)):
+            seq, records = pickle.loads(payload)
+            if seq > after_seq:
+                yield seq, records
+
+    def append(self, records: list[LogRecord]) -> int:
+        """
+        Log committed transaction. Returns when records are as durable as ``durability`` requires
+        :param records: redo records of transaction
+        :return: sequence number of transaction
+        :raise RuntimeError: log is closed or previous write failed
+        """
+        with self._cond:
+            self._check()
+            self.last_seq += 1
+            seq = self.last_seq
+            payload = pickle.dumps((seq, records), pickle.HIGHEST_PROTOCOL)
+            self._buffer += _HEADER.pack(len(payload), zlib.crc32(payload))
+            self._buffer += payload
+            self._appended += 1
+            match self.durability:
+                case cst.Durability.COMMIT:
+                    self._wait_synced(self._appended)
+                case cst.Durability.NONE:
+                    self._wait_synced(self._appended, fsync=False)
+        return seq
+
+    def sync(self) -> None:
+        """Write and fsync all buffered records"""
+        with self._cond:
+            self._check()
+            self._sync_all()
+
+    def truncate(self, last_seq: int | None = None) -> None:
+        """
+        Drop all records(e.g. after checkpoint). Sequence numbers continue
+        :param last_seq: sequence number to continue from(current one by default)
+        """
+        with self._cond:
+            self._check()
+            self._sync_all()
+            while self._syncing:
+                self._cond.wait()
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+            if last_seq is not None:
+                self.last_seq = max(self.last_seq, last_seq)
+
+    def close(self) -> None:
+        """Sync buffered records and close log"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._cond:
+            try:
+                if self._error is None:
+                    self._sync_all()
+            finally:
+                self._file.close()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Write-ahead log failed") from self._error
+        if self._closed:
+            raise RuntimeError("Write-ahead log is closed")
+
+    def _sync_all(self) -> None:
+        self._wait_synced(self._appended)
+        if self.durability == cst.Durability.NONE:
+            os.fsync(self._file.fileno())
+
+    def _wait_synced(self, target: int, fsync: bool = True) -> None:
+        """
+        Make records up to ``target`` written(and synced): write them or wait for running write(lock must be held)
+        """
+        while self._synced < target:
+            if self._error is not None:
+                raise RuntimeError("Write-ahead log failed") from self._error
+            if self._syncing:
+                self._cond.wait()
+            else:
+                self._write(fsync)
+
+    def _write(self, fsync: bool) -> None:
+        """
+        Write buffer to file. Lock is released during IO, so commits keep buffering and get grouped into next write
+        """
+        data, self._buffer = self._buffer, bytearray()
+        target = self._appended
+        self._syncing = True
+        self._cond.release()
+        try:
+            if data:
+                self._file.write(data)
+                self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+        except BaseException as e:
+            self._error = e
+            raise
+        finally:
+            self._cond.acquire()
+            self._syncing = False
+            self._cond.notify_all()
+        self._synced = target
+
+    def _run_flusher(self) -> None:
+        with self._cond:
+            while not self._closed:
+                self._cond.wait(self.interval_ms / 1000)
+                if self._synced < self._appended and not self._syncing and self._error is None:
+                    try:
+                        self._write(fsync=True)
+                    except OSError:
+                        return
@@ -0,0 +1,271 @@
+"""
+Aggregation of matching rows(COUNT/SUM/MIN/MAX/AVG with GROUP BY) without building rows. Queries with at most one
+predicate on indexed field, grouped by that field(or not grouped), are answered from the index: COUNT from sizes of
+buckets, MIN/MAX from the first and the last key of ordered index, SUM/AVG of the indexed field from keys and sizes of
+buckets. Otherwise values of fields are read at matching positions(vectorized with numpy for columnar tables)
+"""
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from src.orm.collection import Collection
+from src.orm.columnar import np
+from src.orm.index.abstract import AbstractIndex, Field
+from src.orm.planner import Predicate
+
+FUNCTIONS = ("count", "sum", "min", "max", "avg")
+
+
+@dataclass
+class Aggregate:
+    """
+    Aggregate ``func(field)`` named ``name`` in result. ``field`` is ``None`` for count of rows. NULL(``None``) values are
+    skipped; aggregates of no values are ``None``(``0`` for count)
+    """
+    name: str
+    func: str
+    field: str | None = None
+
+
+def parse_aggregates(aggs: dict[str, str | tuple[str, str | None]]) -> list[Aggregate]:
+    """
+    :param aggs: ``{name: (func, field)}``, ``{name: 'count'}`` for count of rows; e. g.
+    ``{'books': 'count', 'avg_pages': ('avg', 'pages')}``
+    :return: list of aggregates
+    :raise ValueError: unknown function or function of rows other than count
+    """
+    aggregates = []
+    for name, spec in aggs.items():
+        func, field = (spec, None) if isinstance(spec, str) else spec
+        if field == "*":
+            field = None
+        if func not in FUNCTIONS:
+            raise ValueError(f"Unknown aggregate function {func!r}")
+        if field is None and func != "count":
+            raise ValueError(f"Aggregate function {func!r} requires field")
+        aggregates.append(Aggregate(name, func, field))
+    return aggregates
+
+
+def _reduce(func: str, values: list) -> Any:
+    """
+    :return: aggregate of values(``None`` values are skipped)
+    """
+    if None in values:
+        values = [value for value in values if value is not None]
+    if func == "count":
+        return len(values)
+    if not values:
+        return None
+    match func:
+        case "sum":
+            return sum(values)
+        case "min":
+            return min(values)
+        case "max":
+            return max(values)
+    return sum(values) / len(values)
+
+
+def _aggregate_group(rows: Collection, positions: list[int], aggregates: list[Aggregate]) -> dict[str, Any]:
+    values: dict[str, list] = {}
+    result = {}
+    for agg in aggregates:
+        if agg.field is None:
+            result[agg.name] = len(positions)
+            continue
+        field_values = values.get(agg.field)
+        if field_values is None:
+            field_values = values[agg.field] = rows.take(positions, agg.field)
+        result[agg.name] = _reduce(agg.func, field_values)
+    return result
+
+
+def _aggregate_numpy(rows: Collection, positions: list[int], group_fields: list[str], aggregates: list[Aggregate]):
+    """
+    Vectorized aggregation: positions are grouped by ``np.unique`` of values(codes for dictionary-encoded fields), groups
+    are reduced with ``reduceat``
+    :return: result or ``None`` if some fields are not in typed arrays(aggregated fields must be numeric)
+    """
+    if np is None or not positions:
+        return None
+    ids = np.array(positions, dtype=np.int64)
+    columns = {}
+    for field in {*group_fields, *(agg.field for agg in aggregates if agg.field is not None)}:
+        column = rows.array_at(ids, field)
+        if column is None:
+            return None
+        columns[field] = column
+    if any(agg.field is not None and columns[agg.field][1] is not None for agg in aggregates):
+        return None
+
+    size = len(positions)
+    if group_fields:
+        combined = np.zeros(size, dtype=np.int64)
+        groups = 1
+        for field in group_fields:
+            unique, inverse = np.unique(columns[field][0], return_inverse=True)
+            groups *= len(unique)
+            if groups >= 2 ** 62:
+                return None
+            combined = combined * len(unique) + inverse
+        _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        counts = np.bincount(inverse)
+        keys = []
+        for field in group_fields:
+            values, dictionary = columns[field]
+            field_keys = values[first].tolist()
+            keys.append([dictionary[code] for code in field_keys] if dictionary is not None else field_keys)
+        keys = keys[0] if len(group_fields) == 1 else list(zip(*keys))
+    else:
+        order = None
+        counts = np.array([size])
+        keys = [None]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    results: list[dict[str, Any]] = [{} for _ in keys]
+    for agg in aggregates:
+        reduced: np.ndarray
+        if agg.func == "count":
+            reduced = counts
+        else:
+            assert agg.field is not None
+            values = columns[agg.field][0]
+            if order is not None:
+                values = values[order]
+            match agg.func:
+                case "sum":
+                    reduced = np.add.reduceat(values, starts)
+                case "min":
+                    reduced = np.minimum.reduceat(values, starts)
+                case "max":
+                    reduced = np.maximum.reduceat(values, starts)
+                case _:
+                    reduced = np.add.reduceat(values, starts) / counts
+        for result, value in zip(results, reduced.tolist()):
+            result[agg.name] = value
+    if not group_fields:
+        return results[0]
+    return dict(zip(keys, results))
+
+
+def aggregate_positions(rows: Collection, positions: list[int], group_fields: list[str], aggregates: list[Aggregate]) -> dict:
+    """
+    Aggregate values of rows at positions
+    :param rows: collection of table
+    :param positions: ascending positions(ids) of matching rows
+    :param group_fields: fields to group by(key of group is tuple of values for several fields)
+    :param aggregates: aggregates to compute
+    :return: ``{name: value}`` without grouping, ``{key: {name: value}}`` otherwise
+    """
+    result = _aggregate_numpy(rows, positions, group_fields, aggregates)
+    if result is not None:
+        return result
+    if not group_fields:
+        return _aggregate_group(rows, positions, aggregates)
+    keys: Iterable
+    if len(group_fields) == 1:
+        keys = rows.take(positions, group_fields[0])
+    else:
+        keys = zip(*(rows.take(positions, field) for field in group_fields))
+    groups: dict[Any, list[int]] = {}
+    for pos, key in zip(positions, keys):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [pos]
+        else:
+            group.append(pos)
+    return {key: _aggregate_group(rows, group, aggregates) for key, group in groups.items()}
+
+
+def _of_key(func: str, key, count: int) -> Any:
+    """
+    :return: aggregate of group of ``count`` rows with value ``key`` of aggregated field
+    """
+    if func == "count":
+        return 0 if key is None else count
+    if key is None:
+        return None
+    return key * count if func == "sum" else key
+
+
+def _from_keys(idx: AbstractIndex, agg: Aggregate, keys: list, sizes: list[int], predicate: Predicate | None) -> Any:
+    """
+    :param keys: matching keys of index of aggregated field
+    :param sizes: sizes of their buckets
+    :return: aggregate of indexed field
+    """
+    if agg.func == "count":
+        return sum(size for key, size in zip(keys, sizes) if key is not None)
+    if agg.func in ("min", "max") and idx.ordered:
+        op, value = (None, None) if predicate is None else (predicate.op_func, predicate.value)
+        return next(iter(idx.matching_keys(op, value, reverse=agg.func == "max")), None)
+    present = [(key, size) for key, size in zip(keys, sizes) if key is not None]
+    if not present:
+        return None
+    match agg.func:
+        case "min":
+            return min(key for key, _ in present)
+        case "max":
+            return max(key for key, _ in present)
+    total = sum(key * size for key, size in present)
+    return total if agg.func == "sum" else total / sum(size for _, size in present)
+
+
+def index_aggregate(indexes: dict[Field, AbstractIndex], size: int, group_fields: list[str], aggregates: list[Aggregate],
+                    predicates: list[Predicate]) -> dict | None:
+    """
+    Answer aggregation from index of field ``F`` without reading rows: query has no predicates or one predicate on ``F``,
+    rows are grouped by ``F`` or not grouped, aggregates are counts of rows or aggregates of ``F``(without predicates and
+    grouping every aggregated field may use its own index)
+    :param indexes: indexes of table by field name
+    :param size: number of rows in table
+    :return: result(see ``aggregate_positions``) or ``None`` if query can't be answered from indexes
+    """
+    if len(predicates) > 1 or len(group_fields) > 1:
+        return None
+    predicate = predicates[0] if predicates else None
+    field: str | None
+    if group_fields:
+        field = group_fields[0]
+        if predicate is not None and predicate.field != field:
+            return None
+    else:
+        field = predicate.field if predicate is not None else None
+    if any(agg.field is not None and agg.field != field for agg in aggregates) and field is not None:
+        return None
+
+    if field is None:
+        # no predicates, no grouping: count of rows and aggregates of fields over their own indexes
+        result = {}
+        for agg in aggregates:
+            if agg.field is None:
+                result[agg.name] = size
+                continue
+            idx = indexes.get(agg.field)
+            if idx is None:
+                return None
+            keys = list(idx.matching_keys()) if not (idx.ordered and agg.func in ("min", "max")) else []
+            result[agg.name] = _from_keys(idx, agg, keys, [len(idx[key]) for key in keys], None)
+        return result
+
+    idx = indexes.get(field)
+    if idx is None:
+        return None
+    try:
+        keys = list(idx.matching_keys(*((predicate.op_func, predicate.value) if predicate is not None else ())))
+    except (NotImplementedError, TypeError):
+        return None
+    sizes = [len(idx[key]) for key in keys]
+    if group_fields:
+        return {
+            key: {
+                agg.name: count if agg.field is None else _of_key(agg.func, key, count)
+                for agg in aggregates
+            }
+            for key, count in zip(keys, sizes)
+        }
+    return {
+        agg.name: sum(sizes) if agg.field is None else _from_keys(idx, agg, keys, sizes, predicate)
+        for agg in aggregates
+    }
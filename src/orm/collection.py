@@ -1,27 +1,106 @@
-from typing import TypeVar, Type, Generic, Iterator
+from copy import copy
+from dataclasses import fields, replace
+from itertools import compress
+from operator import attrgetter
+from typing import Callable, TypeVar, Type, Generic, Iterator, Iterable, Protocol, Sequence
 
 T = TypeVar('T')
 
+_TOMBSTONE = object()
+
+def _keep_flags(size: int, indexes: list[int]) -> bytearray:
+    """
+    :return: ``1`` for every slot except ``indexes``
+    """
+    flags = bytearray(b'\x01') * size
+    for index in indexes:
+        flags[index] = 0
+    return flags
+
+
+def _merged(existing: Sequence, new: Iterable, indexes: list[int]) -> Sequence:
+    """
+    :param existing: ``list`` or ``array`` of values
+    :param new: values to insert
+    :param indexes: ascending indexes inserted values get
+    :return: values of ``existing`` with ``new`` inserted(same type as ``existing``). Runs between inserted values
+    are copied by slices
+    """
+    result = existing[:0]
+    start = 0
+    for shift, (index, value) in enumerate(zip(indexes, new)):
+        result.extend(existing[start:index - shift])
+        result.append(value)
+        start = index - shift
+    result.extend(existing[start:])
+    return result
+
+
+def _updater(dtype: type, names: list[str]) -> Callable[[T, Sequence], T]:
+    """
+    :param dtype: dataclass
+    :param names: fields to change
+    :return: function making copy of item with new values of ``names`` fields(as ``dataclasses.replace``, but values of
+    all fields are read at once and passed to constructor positionally when dataclass allows it)
+    """
+    all_fields = fields(dtype)
+    positional = all(field.init and not field.kw_only for field in all_fields)
+    if len(all_fields) < 2 or not positional or len(all_fields) != len(dtype.__dataclass_fields__):
+        return lambda item, new: replace(item, **dict(zip(names, new)))
+    order = [field.name for field in all_fields]
+    getter = attrgetter(*order)
+    slots = [order.index(name) for name in names]
+
+    def update(item: T, new: Sequence) -> T:
+        args = list(getter(item))
+        for slot, value in zip(slots, new):
+            args[slot] = value
+        return dtype(*args)
+
+    return update
+
+
 class Collection(Generic[T]):
-    def __init__(self, dtype: Type[T]):
+    """
+    List-like collection of ``dtype`` objects
+    :param dtype: type of stored items
+    :param stable_ids: keep row ids stable: removed items leave a tombstone instead of shifting later items
+    """
+    def __init__(self, dtype: Type[T], stable_ids: bool = False):
         if not isinstance(dtype, type):
             raise TypeError("`dtype` must be a class (type)")
         self._dtype = dtype
         self._items = []
+        self._stable_ids = stable_ids
+        self._tombstones = 0
 
     @property
     def dtype(self) -> Type[T]:
         return self._dtype
 
-    def __len__(self) -> int:
+    @property
+    def stable_ids(self) -> bool:
+        return self._stable_ids
+
+    @property
+    def slots(self) -> int:
+        """Number of slots(live items and tombstones). Next appended item gets this id"""
         return len(self._items)
 
+    def __len__(self) -> int:
+        return len(self._items) - self._tombstones
+
     def __getitem__(self, index: int) -> T:
-        return self._items[index]
+        item = self._items[index]
+        if item is _TOMBSTONE:
+            raise IndexError(f"Row {index} is deleted")
+        return item
 
     def __setitem__(self, index: int, value: T):
         if not isinstance(value, self._dtype):
             raise TypeError(f"`value` must be an instance of {self._dtype.__name__}")
+        if self._items[index] is _TOMBSTONE:
+            raise IndexError(f"Row {index} is deleted")
         self._items[index] = value
 
     def append(self, item: T) -> None:
@@ -29,18 +108,283 @@ class Collection(Generic[T]):
             raise TypeError(f"`item` must be an instance of {self._dtype.__name__}")
         self._items.append(item)
 
+    def extend(self, items: Iterable[T]) -> None:
+        """
+        Append items at once(types are checked before any item is added)
+        :param items: items to append
+        """
+        items = list(items)
+        dtype = self._dtype
+        if not all(isinstance(item, dtype) for item in items):
+            raise TypeError(f"`items` must be instances of {dtype.__name__}")
+        self._items.extend(items)
+
     def remove(self, item: T) -> None:
         if not isinstance(item, self._dtype):
             raise TypeError(f"`item` must be an instance of {self._dtype.__name__}")
-        self._items.remove(item)
+        if self._stable_ids:
+            self.pop(self._items.index(item))
+        else:
+            self._items.remove(item)
 
     def insert(self, item: T, index: int) -> None:
         if not isinstance(item, self._dtype):
             raise TypeError(f"`item` must be an instance of {self._dtype.__name__}")
-        self._items.insert(index, item)
+        if self._stable_ids:
+            self.restore(index, item)
+        else:
+            self._items.insert(index, item)
 
     def pop(self, index: int = -1) -> T:
-        return self._items.pop(index)
+        if not self._stable_ids:
+            return self._items.pop(index)
+        item = self[index]
+        self._items[index] = _TOMBSTONE
+        self._tombstones += 1
+        return item
+
+    def pop_many(self, indexes: list[int]) -> list[T]:
+        """
+        Remove items at once(one pass over collection instead of shifting later items for every removed one)
+        :param indexes: ascending ids of live items
+        :return: removed items
+        """
+        removed = [self[index] for index in indexes]
+        if self._stable_ids:
+            for index in indexes:
+                self._items[index] = _TOMBSTONE
+            self._tombstones += len(indexes)
+        else:
+            self._items = list(compress(self._items, _keep_flags(len(self._items), indexes)))
+        return removed
+
+    def insert_many(self, items: list[T], indexes: list[int]) -> None:
+        """
+        Put items at once on given ids(e.g. on rollback of ``pop_many``): tombstoned slots are restored for collection
+        with stable ids, otherwise later items are shifted
+        :param items: items to insert
+        :param indexes: ascending ids items will have
+        """
+        dtype = self._dtype
+        if not all(isinstance(item, dtype) for item in items):
+            raise TypeError(f"`items` must be instances of {dtype.__name__}")
+        if self._stable_ids:
+            for index, item in zip(indexes, items):
+                self.restore(index, item)
+        else:
+            self._items = _merged(self._items, items, indexes)
+
+    def set_fields(self, indexes: list[int], values: dict[str, list]) -> dict[str, list]:
+        """
+        Set fields of items at once(items are replaced by updated copies)
+        :param indexes: ids of live items
+        :param values: ``{field: new values}``, one value for every id
+        :return: ``{field: old values}``
+        """
+        items = [self[index] for index in indexes]
+        names = list(values)
+        old = {name: [getattr(item, name) for item in items] for name in names}
+        update = _updater(self._dtype, names)
+        for index, item, *new in zip(indexes, items, *values.values()):
+            self._items[index] = update(item, new)
+        return old
+
+    def restore(self, index: int, item: T) -> None:
+        """
+        Put item back into tombstoned slot(collection with stable ids only)
+        :param index: id of the slot
+        :param item: item to restore
+        """
+        if not isinstance(item, self._dtype):
+            raise TypeError(f"`item` must be an instance of {self._dtype.__name__}")
+        if self._items[index] is not _TOMBSTONE:
+            raise IndexError(f"Row {index} is not deleted")
+        self._items[index] = item
+        self._tombstones -= 1
+
+    def truncate(self, slots: int) -> None:
+        """
+        Drop trailing tombstones down to ``slots`` slots(e.g. after rollback of inserts into collection with stable ids),
+        so the next appended item gets the id the rolled back item had
+        :param slots: min number of slots to keep
+        """
+        items = self._items
+        end = len(items)
+        while end > slots and items[end - 1] is _TOMBSTONE:
+            end -= 1
+        self._tombstones -= len(items) - end
+        del items[end:]
+
+    def last_id(self) -> int:
+        """
+        :return: id of the last live item
+        :raise IndexError: collection is empty
+        """
+        for index in range(len(self._items) - 1, -1, -1):
+            if self._items[index] is not _TOMBSTONE:
+                return index
+        raise IndexError("pop from empty collection")
+
+    def items(self) -> Iterator[tuple[int, T]]:
+        """
+        :return: iterator of ``(id, item)`` pairs of live items
+        """
+        if not self._tombstones:
+            yield from enumerate(self._items)
+            return
+        for index, item in enumerate(self._items):
+            if item is not _TOMBSTONE:
+                yield index, item
+
+    def ids(self) -> Iterator[int]:
+        """
+        :return: iterator of ids of live items
+        """
+        for index, _ in self.items():
+            yield index
+
+    def value(self, index: int, field: str):
+        """
+        :param index: id of item
+        :param field: field name
+        :return: value of field of item
+        """
+        return getattr(self[index], field)
+
+    def field_items(self, field: str) -> Iterator[tuple[int, object]]:
+        """
+        :param field: field name
+        :return: iterator of ``(id, value of field)`` pairs of live items
+        """
+        for index, item in self.items():
+            yield index, getattr(item, field)
+
+    def take(self, ids: list[int], field: str) -> list:
+        """
+        :param ids: ids of live items
+        :param field: field name
+        :return: values of field of items
+        """
+        items = self._items
+        return [getattr(items[index], field) for index in ids]
+
+    def array_at(self, ids, field: str):
+        """
+        Values of field as numpy array(for vectorized aggregation)
+        :param ids: numpy array of ids of live items
+        :param field: field name
+        :return: ``(values, dictionary)``(``values`` are codes of ``dictionary`` for dictionary-encoded fields, ``dictionary``
+        is ``None`` otherwise) or ``None`` if field is not stored in typed array(or numpy is not installed)
+        """
+        return None
+
+    def scan(self, predicates: list, matcher: Callable[[T], bool] | None = None) -> set[int]:
+        """
+        Full scan with given predicates(single pass for all of them)
+        :param predicates: predicates(``field``, ``op_func``, ``value``) to check every item with
+        :param matcher: compiled check of all predicates(used instead of predicates if set)
+        :return: set of ids of matching items
+        """
+        if matcher is not None:
+            return {index for index, item in self.items() if matcher(item)}
+        res = set()
+        if len(predicates) == 1:
+            field, op_func, value = predicates[0].field, predicates[0].op_func, predicates[0].value
+            for index, item in self.items():
+                if op_func(getattr(item, field, None), value):
+                    res.add(index)
+            return res
+        for index, item in self.items():
+            if all(predicate.matches(item) for predicate in predicates):
+                res.add(index)
+        return res
+
+    def filter(self, ids: set[int], predicates: list, matcher: Callable[[T], bool] | None = None) -> set[int]:
+        """
+        Check predicates only against given ids
+        :param ids: candidate ids
+        :param predicates: predicates to check items with
+        :param matcher: compiled check of predicates(used instead of predicates if set)
+        :return: set of ids of matching items
+        """
+        items = self._items
+        if matcher is not None:
+            return {index for index in ids if matcher(items[index])}
+        return {
+            index for index in ids
+            if all(predicate.matches(items[index]) for predicate in predicates)
+        }
+
+    def array_predicates(self, predicates: list) -> tuple[list, list]:
+        """
+        Split predicates into ones that can be checked on typed arrays(``(array, op_func, value)``) and the rest. Items
+        are not stored in arrays, so all predicates are the rest
+        """
+        return [], predicates
+
+    def alive_flags(self) -> bytes | None:
+        """
+        :return: ``1``/``0`` flag of every slot(live item/tombstone), ``None`` if there are no tombstones
+        """
+        if not self._tombstones:
+            return None
+        return bytes(item is not _TOMBSTONE for item in self._items)
+
+    def columns(self) -> dict[str, Iterable]:
+        """
+        Values of ``dtype``(dataclass) fields by slots, tombstones give ``None``
+        :return: ``{field: values}``
+        """
+        items = self._items
+        return {
+            field.name: [None if item is _TOMBSTONE else getattr(item, field.name) for item in items]
+            for field in fields(self._dtype)
+        }
+
+    def load_columns(self, columns: dict[str, Sequence], alive: bytes | None = None) -> None:
+        """
+        Bulk append rows of ``dtype``(dataclass) given by columns. Rows are built without type checks
+        :param columns: ``{field: values}`` for every field, values of all fields have the same length
+        :param alive: ``1``/``0`` flag of every slot(collection with stable ids only), dead slots become tombstones
+        """
+        names = [field.name for field in fields(self._dtype)]
+        if set(columns) != set(names):
+            raise ValueError(f"Columns {sorted(columns)} don't match fields {names}")
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("Columns have different lengths")
+        rows = list(map(self._dtype, *(columns[name] for name in names)))
+        if alive is not None and not all(alive):
+            if not self._stable_ids:
+                raise ValueError("Dead slots require stable ids")
+            if len(alive) != len(rows):
+                raise ValueError("Length of `alive` doesn't match columns")
+            rows = [row if flag else _TOMBSTONE for row, flag in zip(rows, alive)]
+            self._tombstones += alive.count(0)
+        self._items.extend(rows)
+
+    def copy(self) -> "Collection[T]":
+        """
+        :return: collection with the same ids and items(items themselves are not copied)
+        """
+        clone = copy(self)
+        clone._items = list(self._items)
+        return clone
+
+    def compact(self) -> dict[int, int]:
+        """
+        Reclaims tombstoned slots. Ids of live items after the first tombstone change
+        :return: mapping ``{old_id: new_id}`` of every live item(unchanged ids included), empty if nothing was reclaimed
+        """
+        if not self._tombstones:
+            return {}
+        mapping = {}
+        items = []
+        for index, item in self.items():
+            mapping[index] = len(items)
+            items.append(item)
+        self._items = items
+        self._tombstones = 0
+        return mapping
 
     def index(self, item: T) -> int:
         if not isinstance(item, self._dtype):
@@ -51,13 +395,15 @@ class Collection(Generic[T]):
         return item in self._items
 
     def __iter__(self) -> Iterator[T]:
-        return iter(self._items)
+        if not self._tombstones:
+            return iter(self._items)
+        return (item for item in self._items if item is not _TOMBSTONE)
 
     def __eq__(self, other) -> bool:
         if isinstance(other, list):
-            return other == self._items
+            return other == list(self)
         if isinstance(other, Collection):
-            return self._items == other._items
+            return list(self) == list(other)
         return False
 
 class ImmutableCollection(Generic[T]):
@@ -81,7 +427,7 @@ class ImmutableCollection(Generic[T]):
         return item in self._collection
 
     def __str__(self) -> str:
-        return str(self._collection._items)
+        return str(list(self._collection))
 
     def __repr__(self) -> str:
         return f"ImmutableCollection({str(self)})"
@@ -91,4 +437,72 @@ class ImmutableCollection(Generic[T]):
             return other == self._collection
         if isinstance(other, ImmutableCollection):
             return self._collection == other._collection
-        return False
\ No newline at end of file
+        if isinstance(other, CollectionView):
+            return list(self) == list(other)
+        return False
+
+
+class RowSource(Protocol[T]):
+    """Anything with ``dtype`` that returns rows by id(e.g. ``Collection``, ``Table``)"""
+    @property
+    def dtype(self) -> Type[T]: ...
+
+    def __getitem__(self, index: int) -> T: ...
+
+
+class CollectionView(Generic[T]):
+    """
+    Lazy read-only view of rows of ``source`` by ids. Rows are fetched from ``source`` on access, nothing is copied
+    until ``materialize`` is called(so the view reflects later changes of the source).
+    :param source: collection or table to read rows from
+    :param ids: ids of rows in view
+    """
+    def __init__(self, source: RowSource[T], ids: Iterable[int]):
+        self._source = source
+        self._ids = ids if isinstance(ids, list) else sorted(ids)
+
+    @property
+    def dtype(self) -> Type[T]:
+        return self._source.dtype
+
+    @property
+    def ids(self) -> list[int]:
+        return self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return CollectionView(self._source, self._ids[index])
+        return self._source[self._ids[index]]
+
+    def __iter__(self) -> Iterator[T]:
+        source = self._source
+        for index in self._ids:
+            yield source[index]
+
+    def __contains__(self, item: object) -> bool:
+        return any(row == item for row in self)
+
+    def materialize(self) -> ImmutableCollection[T]:
+        """
+        Copy rows of view
+        :return: ``ImmutableCollection`` of rows
+        """
+        collection = Collection(self.dtype)
+        collection._items = list(self)
+        return ImmutableCollection(collection)
+
+    def __str__(self) -> str:
+        return str(list(self))
+
+    def __repr__(self) -> str:
+        return f"CollectionView({str(self)})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CollectionView, ImmutableCollection)):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return False
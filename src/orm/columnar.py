@@ -0,0 +1,685 @@
+import operator
+from array import array
+from copy import copy
+from dataclasses import dataclass, fields, is_dataclass
+from itertools import compress, count, repeat
+from typing import Any, Callable, Iterable, Iterator, Sequence, Type, TypeVar, get_type_hints
+
+import src.orm.operators as ops
+from src.orm.collection import Collection, _keep_flags, _merged
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, pure Python scans are used without it
+    np = None
+
+T = TypeVar('T')
+
+_NUMPY_COMPARISONS = {operator.gt, operator.ge, operator.lt, operator.le, operator.eq, operator.ne}
+
+
+def _matching(values: Iterable, op_func: Callable, value) -> Iterator[int]:
+    """
+    Pure Python vectorized scan: iteration is done by ``map``/``compress``, no per-row attribute lookups
+    :param values: column values
+    :param op_func: operator function
+    :param value: value to compare with
+    :return: iterator of matching offsets
+    """
+    if op_func is ops.in_:
+        container = set(value)
+        return compress(count(), map(container.__contains__, values))
+    if op_func is ops.between:
+        return compress(count(), map(value.__contains__, values))
+    return compress(count(), map(op_func, values, repeat(value)))
+
+
+def _numpy_mask(values, op_func: Callable, value):
+    """
+    :param values: numpy array
+    :param op_func: operator function
+    :param value: value to compare with
+    :return: boolean mask or ``None`` if operator(or value) is not supported
+    """
+    if op_func in _NUMPY_COMPARISONS:
+        return op_func(values, value)
+    if op_func is ops.in_:
+        value = list(value)
+        if not all(type(item) is int or type(item) is float for item in value):
+            # numpy converts mixed values to common type(e.g. ``[1, 'a']`` to strings), they are compared by Python
+            return None
+        return np.isin(values, value)
+    if op_func is ops.between:
+        mask = np.ones(len(values), dtype=bool)
+        if value.low is not None:
+            mask &= values >= value.low if value.low_inclusive else values > value.low
+        if value.high is not None:
+            mask &= values <= value.high if value.high_inclusive else values < value.high
+        return mask
+    return None
+
+
+@dataclass
+class EncodedValues:
+    """
+    Dictionary-encoded values: ``dictionary[code]`` for every code
+    """
+    codes: array
+    dictionary: list
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator:
+        return map(self.dictionary.__getitem__, self.codes)
+
+
+class Column:
+    """
+    Column of ``object`` values stored in a list
+    """
+    def __init__(self):
+        self._data: Any = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, index: int):
+        return self._data[index]
+
+    def __setitem__(self, index: int, value):
+        self._data[index] = value
+
+    def append(self, value) -> None:
+        self._data.append(value)
+
+    def insert(self, index: int, value) -> None:
+        self._data.insert(index, value)
+
+    def extend(self, values: Iterable) -> None:
+        self._data.extend(values)
+
+    def pop(self, index: int) -> None:
+        self._data.pop(index)
+
+    def take(self, indexes: list[int]) -> list:
+        """
+        :param indexes: slots
+        :return: values of slots
+        """
+        data = self._data
+        return [data[index] for index in indexes]
+
+    def set_many(self, indexes: list[int], values: Iterable) -> None:
+        """
+        Set values at once
+        :param indexes: slots to set
+        :param values: one value for every slot
+        """
+        data = self._data
+        for index, value in zip(indexes, values):
+            data[index] = value
+
+    def insert_many(self, values: Iterable, indexes: list[int]) -> None:
+        """
+        Insert values at once
+        :param values: values to insert
+        :param indexes: ascending slots inserted values get
+        """
+        self._data = _merged(self._data, values, indexes)
+
+    def keep(self, alive: bytearray) -> None:
+        """
+        Drop values of dead slots
+        :param alive: flags of slots to keep
+        """
+        self._data = type(self._data)(compress(self._data, alive))
+
+    def copy(self) -> "Column":
+        """
+        :return: column with copied values
+        """
+        clone = copy(self)
+        clone._data = self._data[:]
+        return clone
+
+    def values(self) -> Iterable:
+        return self._data
+
+    def mask(self, op_func: Callable, value):
+        """
+        :return: numpy boolean mask of matching slots or ``None`` if the column can't be compared vectorized
+        """
+        return None
+
+    def array_predicate(self, op_func: Callable, value) -> tuple[array, Callable, Any] | None:
+        """
+        :return: typed array of column and predicate to check its items with(``None`` if values are not stored in array)
+        """
+        return None
+
+    def match(self, op_func: Callable, value) -> Iterator[int]:
+        """
+        :return: iterator of matching slots
+        """
+        return _matching(self._data, op_func, value)
+
+
+class NumericColumn(Column):
+    """
+    Column of ``int``/``float`` values stored in typed ``array``
+    :param typecode: ``array`` typecode(``'q'`` or ``'d'``)
+    """
+    _NUMPY_TYPES = {'q': 'int64', 'd': 'float64'}
+
+    def __init__(self, typecode: str):
+        super().__init__()
+        self._data = array(typecode)
+
+    def _checked(self, value):
+        if self._data.typecode == 'q':
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise TypeError(f"Value {value!r} can't be stored in int column")
+            if not -2 ** 63 <= value < 2 ** 63:
+                raise OverflowError(f"Value {value!r} is out of int64 range")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"Value {value!r} can't be stored in float column")
+        return value
+
+    def __setitem__(self, index: int, value):
+        self._data[index] = self._checked(value)
+
+    def append(self, value) -> None:
+        self._data.append(self._checked(value))
+
+    def insert(self, index: int, value) -> None:
+        self._data.insert(index, self._checked(value))
+
+    def extend(self, values: Iterable) -> None:
+        if isinstance(values, array) and values.typecode == self._data.typecode:
+            self._data.extend(values)
+        else:
+            self._data.extend(map(self._checked, values))
+
+    def set_many(self, indexes: list[int], values: Iterable) -> None:
+        super().set_many(indexes, list(map(self._checked, values)))
+
+    def insert_many(self, values: Iterable, indexes: list[int]) -> None:
+        self._data = _merged(self._data, map(self._checked, values), indexes)
+
+    def keep(self, alive: bytearray) -> None:
+        self._data = array(self._data.typecode, compress(self._data, alive))
+
+    def mask(self, op_func: Callable, value):
+        if np is None:
+            return None
+        values = np.frombuffer(self._data, dtype=self._NUMPY_TYPES[self._data.typecode])
+        try:
+            return _numpy_mask(values, op_func, value)
+        finally:
+            del values
+
+    def array_predicate(self, op_func: Callable, value) -> tuple[array, Callable, Any] | None:
+        return self._data, op_func, value
+
+
+class DictColumn(Column):
+    """
+    Dictionary-encoded column(e.g. for ``str``): stores distinct values once and ``array`` of their codes
+    """
+    def __init__(self):
+        super().__init__()
+        self._data = array('q')
+        self._values: list = []
+        self._codes: dict[Any, int] = {}
+
+    def _encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def __getitem__(self, index: int):
+        return self._values[self._data[index]]
+
+    def __setitem__(self, index: int, value):
+        self._data[index] = self._encode(value)
+
+    def append(self, value) -> None:
+        self._data.append(self._encode(value))
+
+    def insert(self, index: int, value) -> None:
+        self._data.insert(index, self._encode(value))
+
+    def extend(self, values: Iterable) -> None:
+        if not isinstance(values, EncodedValues):
+            self._data.extend(map(self._encode, values))
+            return
+        remap = [self._encode(value) for value in values.dictionary]
+        if remap == list(range(len(remap))) and values.codes.typecode == 'q':
+            self._data.extend(values.codes)
+        else:
+            self._data.extend(map(remap.__getitem__, values.codes))
+
+    def take(self, indexes: list[int]) -> list:
+        data, values = self._data, self._values
+        return [values[data[index]] for index in indexes]
+
+    def set_many(self, indexes: list[int], values: Iterable) -> None:
+        super().set_many(indexes, map(self._encode, values))
+
+    def insert_many(self, values: Iterable, indexes: list[int]) -> None:
+        self._data = _merged(self._data, map(self._encode, values), indexes)
+
+    def encoded(self) -> EncodedValues:
+        """
+        :return: codes and dictionary of column(not copied)
+        """
+        return EncodedValues(self._data, self._values)
+
+    def keep(self, alive: bytearray) -> None:
+        self._data = array('q', compress(self._data, alive))
+
+    def copy(self) -> "DictColumn":
+        clone = DictColumn()
+        clone._data = self._data[:]
+        clone._values = list(self._values)
+        clone._codes = dict(self._codes)
+        return clone
+
+    def values(self) -> Iterable:
+        return map(self._values.__getitem__, self._data)
+
+    def _matching_codes(self, op_func: Callable, value) -> list[int]:
+        """Compare dictionary instead of every row"""
+        if op_func is operator.eq:
+            code = self._codes.get(value)
+            return [] if code is None else [code]
+        return list(_matching(self._values, op_func, value))
+
+    def mask(self, op_func: Callable, value):
+        if np is None:
+            return None
+        codes = np.frombuffer(self._data, dtype='int64')
+        try:
+            matching = self._matching_codes(op_func, value)
+            if len(matching) == 1:
+                return codes == matching[0]
+            return np.isin(codes, matching)
+        finally:
+            del codes
+
+    def match(self, op_func: Callable, value) -> Iterator[int]:
+        matching = set(self._matching_codes(op_func, value))
+        return compress(count(), map(matching.__contains__, self._data))
+
+    def array_predicate(self, op_func: Callable, value) -> tuple[array, Callable, Any] | None:
+        return self._data, ops.in_, self._matching_codes(op_func, value)
+
+
+def _column_for(annotation) -> Column:
+    if annotation is int:
+        return NumericColumn('q')
+    if annotation is float:
+        return NumericColumn('d')
+    if annotation is str:
+        return DictColumn()
+    return Column()
+
+
+class ColumnarCollection(Collection[T]):
+    """
+    Collection that stores ``dtype``(dataclass) fields in columns: typed arrays for ``int``/``float``,
+    dictionary-encoded codes for ``str``, lists for other types. Scans are vectorized(numpy if installed),
+    row objects are built only on access.
+    :param dtype: dataclass of stored items
+    :param stable_ids: keep row ids stable: removed items leave a tombstone instead of shifting later items
+    """
+    def __init__(self, dtype: Type[T], stable_ids: bool = False):
+        super().__init__(dtype, stable_ids)
+        if not is_dataclass(dtype):
+            raise TypeError("`dtype` must be a dataclass")
+        hints = get_type_hints(dtype)
+        self._fields = [field.name for field in fields(dtype)]
+        self._columns: dict[str, Column] = {name: _column_for(hints.get(name)) for name in self._fields}
+        self._alive = bytearray()
+
+    @property
+    def slots(self) -> int:
+        return len(self._alive)
+
+    def __len__(self) -> int:
+        return len(self._alive) - self._tombstones
+
+    def _check_type(self, item, name: str = "item") -> None:
+        if not isinstance(item, self._dtype):
+            raise TypeError(f"`{name}` must be an instance of {self._dtype.__name__}")
+
+    def _check_alive(self, index: int) -> None:
+        if not self._alive[index]:
+            raise IndexError(f"Row {index} is deleted")
+
+    def _build(self, index: int) -> T:
+        return self._dtype(*[self._columns[name][index] for name in self._fields])
+
+    def __getitem__(self, index: int) -> T:
+        self._check_alive(index)
+        return self._build(index)
+
+    def __setitem__(self, index: int, value: T):
+        self._check_type(value, "value")
+        self._check_alive(index)
+        for name in self._fields:
+            self._columns[name][index] = getattr(value, name)
+
+    def _store(self, item: T) -> list:
+        """Values of item by fields. Type errors are raised before any column is changed"""
+        values = [getattr(item, name) for name in self._fields]
+        for name, value in zip(self._fields, values):
+            column = self._columns[name]
+            if isinstance(column, NumericColumn):
+                column._checked(value)
+        return values
+
+    def append(self, item: T) -> None:
+        self._check_type(item)
+        for name, value in zip(self._fields, self._store(item)):
+            self._columns[name].append(value)
+        self._alive.append(1)
+
+    def extend(self, items: Iterable[T]) -> None:
+        items = list(items)
+        for item in items:
+            self._check_type(item)
+        self.load_columns({name: [getattr(item, name) for item in items] for name in self._fields})
+
+    def remove(self, item: T) -> None:
+        self.pop(self.index(item))
+
+    def insert(self, item: T, index: int) -> None:
+        self._check_type(item)
+        if self._stable_ids:
+            self.restore(index, item)
+            return
+        for name, value in zip(self._fields, self._store(item)):
+            self._columns[name].insert(index, value)
+        self._alive.insert(index, 1)
+
+    def pop(self, index: int = -1) -> T:
+        item = self[index]
+        if self._stable_ids:
+            self._alive[index] = 0
+            self._tombstones += 1
+        else:
+            for column in self._columns.values():
+                column.pop(index)
+            self._alive.pop(index)
+        return item
+
+    def _build_many(self, indexes: list[int]) -> list[T]:
+        alive = self._alive
+        for index in indexes:
+            if not alive[index]:
+                raise IndexError(f"Row {index} is deleted")
+        return list(map(self._dtype, *(self._columns[name].take(indexes) for name in self._fields)))
+
+    def pop_many(self, indexes: list[int]) -> list[T]:
+        removed = self._build_many(indexes)
+        if self._stable_ids:
+            for index in indexes:
+                self._alive[index] = 0
+            self._tombstones += len(indexes)
+        else:
+            keep = _keep_flags(len(self._alive), indexes)
+            for column in self._columns.values():
+                column.keep(keep)
+            self._alive = bytearray(b'\x01') * (len(self._alive) - len(indexes))
+        return removed
+
+    def insert_many(self, items: list[T], indexes: list[int]) -> None:
+        rows = []
+        for item in items:
+            self._check_type(item)
+            rows.append(self._store(item))
+        if self._stable_ids:
+            for index in indexes:
+                if self._alive[index]:
+                    raise IndexError(f"Row {index} is not deleted")
+            for name, values in zip(self._fields, zip(*rows)):
+                self._columns[name].set_many(indexes, values)
+            for index in indexes:
+                self._alive[index] = 1
+            self._tombstones -= len(indexes)
+        else:
+            for name, values in zip(self._fields, zip(*rows)):
+                self._columns[name].insert_many(values, indexes)
+            self._alive.extend(b'\x01' * len(items))
+
+    def set_fields(self, indexes: list[int], values: dict[str, list]) -> dict[str, list]:
+        for index in indexes:
+            self._check_alive(index)
+        columns = {name: self._columns[name] for name in values}
+        for name, column in columns.items():
+            if isinstance(column, NumericColumn):
+                for value in values[name]:
+                    column._checked(value)
+        old = {name: column.take(indexes) for name, column in columns.items()}
+        for name, column in columns.items():
+            column.set_many(indexes, values[name])
+        return old
+
+    def restore(self, index: int, item: T) -> None:
+        self._check_type(item)
+        if self._alive[index]:
+            raise IndexError(f"Row {index} is not deleted")
+        values = self._store(item)
+        for name, value in zip(self._fields, values):
+            self._columns[name][index] = value
+        self._alive[index] = 1
+        self._tombstones -= 1
+
+    def truncate(self, slots: int) -> None:
+        alive = self._alive
+        end = len(alive)
+        while end > slots and not alive[end - 1]:
+            end -= 1
+        if end == len(alive):
+            return
+        for column in self._columns.values():
+            del column._data[end:]
+        self._tombstones -= len(alive) - end
+        del alive[end:]
+
+    def last_id(self) -> int:
+        index = self._alive.rfind(1)
+        if index == -1:
+            raise IndexError("pop from empty collection")
+        return index
+
+    def ids(self) -> Iterator[int]:
+        if not self._tombstones:
+            return iter(range(len(self._alive)))
+        return compress(count(), self._alive)
+
+    def items(self) -> Iterator[tuple[int, T]]:
+        for index in self.ids():
+            yield index, self._build(index)
+
+    def value(self, index: int, field: str):
+        self._check_alive(index)
+        return self._columns[field][index]
+
+    def take(self, ids: list[int], field: str) -> list:
+        return self._columns[field].take(ids)
+
+    def array_at(self, ids, field: str):
+        column = self._columns[field]
+        if np is None or not isinstance(column, (NumericColumn, DictColumn)):
+            return None
+        dtype = 'int64' if isinstance(column, DictColumn) else NumericColumn._NUMPY_TYPES[column._data.typecode]
+        data = np.frombuffer(column._data, dtype=dtype)
+        try:
+            values = data[ids]
+        finally:
+            del data
+        return values, column._values if isinstance(column, DictColumn) else None
+
+    def field_items(self, field: str) -> Iterator[tuple[int, object]]:
+        values = self._columns[field].values()
+        if not self._tombstones:
+            return zip(count(), values)
+        return compress(zip(count(), values), self._alive)
+
+    def alive_flags(self) -> bytes | None:
+        if not self._tombstones:
+            return None
+        return bytes(self._alive)
+
+    def columns(self) -> dict[str, Iterable]:
+        """
+        Values of fields by slots(not copied): ``array`` for numeric columns, ``EncodedValues`` for dictionary-encoded ones,
+        ``list`` for others. Dead slots keep their last values
+        :return: ``{field: values}``
+        """
+        return {
+            name: column.encoded() if isinstance(column, DictColumn) else column.values()
+            for name, column in self._columns.items()
+        }
+
+    def load_columns(self, columns: dict[str, Sequence], alive: bytes | None = None) -> None:
+        if set(columns) != set(self._fields):
+            raise ValueError(f"Columns {sorted(columns)} don't match fields {self._fields}")
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Columns have different lengths")
+        size = lengths.pop() if lengths else 0
+        if alive is not None and not all(alive):
+            if not self._stable_ids:
+                raise ValueError("Dead slots require stable ids")
+            if len(alive) != size:
+                raise ValueError("Length of `alive` doesn't match columns")
+        else:
+            alive = b'\x01' * size
+        start = len(self._alive)
+        try:
+            for name in self._fields:
+                self._columns[name].extend(columns[name])
+        except (TypeError, OverflowError):
+            for column in self._columns.values():
+                del column._data[start:]
+            raise
+        self._alive.extend(alive)
+        self._tombstones += alive.count(0)
+
+    def copy(self) -> "ColumnarCollection[T]":
+        clone = copy(self)
+        clone._columns = {name: column.copy() for name, column in self._columns.items()}
+        clone._alive = bytearray(self._alive)
+        return clone
+
+    def compact(self) -> dict[int, int]:
+        if not self._tombstones:
+            return {}
+        mapping = {index: new for new, index in enumerate(self.ids())}
+        for column in self._columns.values():
+            column.keep(self._alive)
+        self._alive = bytearray(b'\x01' * len(mapping))
+        self._tombstones = 0
+        return mapping
+
+    def _scan_ids(self, predicates: list, ids: list[int] | None = None) -> list[int]:
+        """
+        :param predicates: predicates to check
+        :param ids: candidate ids(``None`` - all slots, dead ones included)
+        :return: list of matching ids
+        """
+        if ids is None and np is not None:
+            mask = None
+            rest = []
+            for predicate in predicates:
+                column = self._columns.get(predicate.field)
+                column_mask = None if column is None else column.mask(predicate.op_func, predicate.value)
+                if column_mask is None:
+                    rest.append(predicate)
+                else:
+                    mask = column_mask if mask is None else mask & column_mask
+            if mask is not None:
+                return self._scan_ids(rest, np.flatnonzero(mask).tolist())
+        for predicate in predicates:
+            column = self._columns.get(predicate.field)
+            if column is None:
+                ids = [index for index, item in self.items() if predicate.matches(item)] if ids is None else [
+                    index for index in ids if predicate.matches(self._build(index))
+                ]
+            elif ids is None:
+                ids = list(column.match(predicate.op_func, predicate.value))
+            else:
+                op_func, value = predicate.op_func, predicate.value
+                if op_func is ops.in_:
+                    value = set(value)
+                ids = [index for index in ids if op_func(column[index], value)]
+            if not ids:
+                break
+        return ids if ids is not None else list(range(len(self._alive)))
+
+    def array_predicates(self, predicates: list) -> tuple[list[tuple[array, Callable, Any]], list]:
+        """
+        Split predicates into ones that can be checked on typed arrays of columns(values of dictionary-encoded columns
+        are compared by codes) and the rest
+        :return: list of ``(array, op_func, value)``, list of other predicates
+        """
+        checks, rest = [], []
+        for predicate in predicates:
+            column = self._columns.get(predicate.field)
+            check = None if column is None else column.array_predicate(predicate.op_func, predicate.value)
+            if check is None:
+                rest.append(predicate)
+            else:
+                checks.append(check)
+        return checks, rest
+
+    def scan(self, predicates: list, matcher: Callable[[T], bool] | None = None, ids: list[int] | None = None) -> set[int]:
+        """
+        :param ids: slots matching the other predicates of query(dead ones included), see ``array_predicates``
+        """
+        ids = self._scan_ids(predicates, ids)
+        if self._tombstones:
+            alive = self._alive
+            return {index for index in ids if alive[index]}
+        return set(ids)
+
+    def filter(self, ids: set[int], predicates: list, matcher: Callable[[T], bool] | None = None) -> set[int]:
+        return set(self._scan_ids(predicates, list(ids)))
+
+    def index(self, item: T) -> int:
+        self._check_type(item)
+        predicates = [_Equals(name, getattr(item, name)) for name in self._fields]
+        for index in self._scan_ids(predicates[:1]):
+            if self._alive[index] and self._build(index) == item:
+                return index
+        raise ValueError(f"{item!r} is not in collection")
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, self._dtype):
+            return False
+        try:
+            self.index(item)
+        except ValueError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[T]:
+        return (self._build(index) for index in self.ids())
+
+
+class _Equals:
+    """Equality predicate on a field"""
+    def __init__(self, field: str, value):
+        self.field = field
+        self.op_func = operator.eq
+        self.value = value
+
+    def matches(self, row) -> bool:
+        return getattr(row, self.field, None) == self.value
@@ -18,6 +18,6 @@ class TableNotCreated(ORMException):
         super().__init__(self.message)
 
 class IndexExists(ORMException):
-    def __init__(self, field: str) -> None:
+    def __init__(self, field: str | tuple[str, ...]) -> None:
         self.message = f"Index for {field} already exists"
         super().__init__(self.message)
\ No newline at end of file
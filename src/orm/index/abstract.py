@@ -1,13 +1,52 @@
+import operator
 from abc import abstractmethod, ABC
+from typing import Iterable, Iterator
 
+import src.orm.operators as ops
 from src.orm.collection import Collection
+from src.orm.utils import paused_gc
+
+Field = str | tuple[str, ...]
+"""Indexed field or fields of composite index(indexes of table are keyed by it)"""
 
 
 class AbstractIndex(ABC):
     """
     Abstract class for indexes.
     """
-    field_name: str
+    field_name: Field
+    bitmaps: bool = False
+    """Index implements ``get_bitmap_for_query``"""
+    ordered: bool = False
+    """Index keeps values sorted(``matching_keys`` yields them in order)"""
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        """Indexed fields"""
+        field_name = self.field_name
+        return (field_name,) if isinstance(field_name, str) else field_name
+
+    def row_key(self, row):
+        """
+        :param row: row
+        :return: indexed value of row
+        """
+        return getattr(row, self.fields[0])
+
+    def row_keys(self, rows: Iterable) -> list:
+        """
+        :param rows: rows
+        :return: indexed values of rows
+        """
+        field_name = self.fields[0]
+        return [getattr(row, field_name) for row in rows]
+
+    def row_items(self, rows: Collection) -> Iterator[tuple[int, object]]:
+        """
+        :param rows: collection to index
+        :return: iterator of ``(position, indexed value)`` of live rows
+        """
+        return rows.field_items(self.fields[0])
 
     @abstractmethod
     def __setitem__(self, key, value): ...
@@ -31,6 +70,51 @@ class AbstractIndex(ABC):
         :return: set of positions
         """
 
+    def get_bitmap_for_query(self, op, value):
+        """
+        Get bitmap of positions for query(indexes with ``bitmaps`` set only).
+        :param op: operator
+        :param value: value to compare using operator
+        :return: ``Bitmap`` of positions
+        """
+        raise NotImplementedError
+
+    def matching_keys(self, op=None, value=None, reverse: bool = False) -> Iterable:
+        """
+        Indexed values matching query(every value has non-empty set of positions, see ``__getitem__``).
+        :param op: operator(``None`` - all indexed values)
+        :param value: value to compare using operator
+        :param reverse: descending order(ordered indexes only)
+        :return: iterable of distinct indexed values(in order for ordered indexes)
+        :raise NotImplementedError: operator is not supported by index
+        """
+        if op is None:
+            return iter(self)
+        if op is operator.eq:
+            return [value] if value in self else []
+        if op is ops.in_:
+            return [key for key in dict.fromkeys(value) if key in self]
+        raise NotImplementedError
+
+    def iter_ordered(self, reverse: bool = False) -> Iterator[set[int]]:
+        """
+        Iterate sets of positions in order of indexed values(ordered indexes only).
+        :param reverse: descending order
+        :return: iterator of sets of positions
+        """
+        raise NotImplementedError
+
+    def estimate_for_query(self, op, value, total: int) -> int:
+        """
+        Estimate number of positions matching query without building them.
+        :param op: operator
+        :param value: value to compare using operator
+        :param total: number of rows in the table
+        :return: estimated number of positions
+        :raise NotImplementedError: operator is not supported by index
+        """
+        raise NotImplementedError
+
     def _add_element(self, key, val: int):
         """
         Add element to index. Must implement ``setdefault`` method
@@ -46,9 +130,61 @@ class AbstractIndex(ABC):
         :param rows: rows to rebuild index with
         """
         self.clear()
-        for pos, row in enumerate(rows):
-            key = getattr(row, self.field_name)
-            self._add_element(key, pos)
+        with paused_gc():
+            groups: dict = {}
+            for pos, key in self.row_items(rows):
+                positions = groups.get(key)
+                if positions is None:
+                    groups[key] = [pos]
+                else:
+                    positions.append(pos)
+            self.bulk_load(groups)
+
+    def bulk_load(self, groups: dict):
+        """
+        Add positions to index at once(e.g. on rebuild or bulk insert).
+        :param groups: positions grouped by indexed value(``{value: [pos1, pos2]}``)
+        """
+        for key, positions in groups.items():
+            for pos in positions:
+                self._add_element(key, pos)
+
+    def bulk_remove(self, groups: dict):
+        """
+        Remove positions from index at once.
+        :param groups: positions grouped by indexed value(``{value: [pos1, pos2]}``)
+        """
+        for key, positions in groups.items():
+            if key in self:
+                bucket = self[key]
+                bucket.difference_update(positions)
+                if not bucket:
+                    del self[key]
+
+    def bulk_move(self, positions: list[int], old_keys: list, new_keys: list):
+        """
+        Move positions between indexed values at once(e.g. on bulk update).
+        :param positions: positions of changed rows
+        :param old_keys: indexed values before change(one for every position)
+        :param new_keys: indexed values after change(one for every position)
+        """
+        removed: dict = {}
+        added: dict = {}
+        for pos, old_key, new_key in zip(positions, old_keys, new_keys):
+            if old_key == new_key:
+                continue
+            bucket = removed.get(old_key)
+            if bucket is None:
+                removed[old_key] = [pos]
+            else:
+                bucket.append(pos)
+            bucket = added.get(new_key)
+            if bucket is None:
+                added[new_key] = [pos]
+            else:
+                bucket.append(pos)
+        self.bulk_remove(removed)
+        self.bulk_load(added)
 
     def on_append(self, row, pos: int):
         """
@@ -56,7 +192,7 @@ class AbstractIndex(ABC):
         :param row: row to be appended
         :param pos: position row will be on
         """
-        key = getattr(row, self.field_name)
+        key = self.row_key(row)
         self._add_element(key, pos)
 
     def on_update(self, old_row, new_row, pos: int):
@@ -66,8 +202,8 @@ class AbstractIndex(ABC):
         :param new_row: row after update
         :param pos: position row is on
         """
-        old_key = getattr(old_row, self.field_name)
-        new_key = getattr(new_row, self.field_name)
+        old_key = self.row_key(old_row)
+        new_key = self.row_key(new_row)
         if old_key == new_key:
             return
         self[old_key].discard(pos)
@@ -81,8 +217,82 @@ class AbstractIndex(ABC):
         :param row: row that is popped
         :param pos: position row is on
         """
-        key = getattr(row, self.field_name)
+        key = self.row_key(row)
         if key in self and pos in self[key]:
             self[key].discard(pos)
             if not self[key]:
-                del self[key]
\ No newline at end of file
+                del self[key]
+
+    def on_insert_at(self, row, pos: int):
+        """
+        Callback for insert element. Positions after ``pos`` are shifted by one(O(n), see ``_shift_positions``).
+        :param row: row to be inserted
+        :param pos: position row will be on
+        """
+        self._shift_positions(pos, 1)
+        self.on_append(row, pos)
+
+    def on_remove_at(self, row, pos: int):
+        """
+        Callback for remove element. Positions after ``pos`` are shifted back by one(O(n), see ``_shift_positions``).
+        :param row: row that is removed
+        :param pos: position row was on
+        """
+        self.on_pop(row, pos)
+        self._shift_positions(pos + 1, -1)
+
+    def on_restore(self, row, pos: int, current_row=None):
+        """
+        Callback for restore element(e.g. on rollback). Positions are not shifted.
+        :param row: row to be restored
+        :param pos: position row will be on
+        :param current_row: row that is replaced by restored one(``None`` if the slot was empty)
+        """
+        if current_row is None:
+            self.on_append(row, pos)
+        else:
+            self.on_update(current_row, row, pos)
+
+    def on_remove_many(self, groups: dict, mapping: list[int] | None = None):
+        """
+        Callback for remove elements at once.
+        :param groups: removed positions grouped by indexed value
+        :param mapping: new position of every old position(``None`` if positions are not shifted)
+        """
+        self.bulk_remove(groups)
+        if mapping is not None:
+            self._remap_positions(mapping)
+
+    def on_insert_many(self, groups: dict, mapping: list[int] | None = None):
+        """
+        Callback for insert elements at once(e.g. on rollback of ``on_remove_many``).
+        :param groups: inserted positions grouped by indexed value
+        :param mapping: new position of every old position(``None`` if positions are not shifted)
+        """
+        if mapping is not None:
+            self._remap_positions(mapping)
+        self.bulk_load(groups)
+
+    def _remap_positions(self, mapping: list[int]):
+        """
+        Replace every stored position ``p`` with ``mapping[p]``. Touches only stored positions, rows are not rescanned
+        :param mapping: new position of every old position
+        """
+        for positions in self.values():
+            moved = [mapping[p] for p in positions]
+            positions.clear()
+            positions.update(moved)
+
+    def _shift_positions(self, start: int, delta: int):
+        """
+        Shift positions ``>= start`` by ``delta``. Touches only stored positions, rows are not rescanned, but every stored
+        position is visited: insert/remove in the middle of positional table costs O(n) per index(tables with stable ids
+        don't shift positions)
+        :param start: first position to shift
+        :param delta: shift value
+        """
+        for positions in self.values():
+            moved = [p for p in positions if p >= start]
+            if moved:
+                positions.difference_update(moved)
+                positions.update(p + delta for p in moved)
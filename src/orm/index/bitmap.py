@@ -0,0 +1,109 @@
+from typing import Iterable, Iterator
+
+
+class Bitmap:
+    """
+    Compressed set of non-negative ints(positions). Positions are split into chunks of ``CHUNK_BITS``,
+    every non-empty chunk is stored as ``int`` bitset, empty chunks are not stored.
+    Supports ``&`` (AND), ``|`` (OR) and ``-`` (AND NOT) without building intermediate sets.
+    """
+    CHUNK_BITS = 4096
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, chunks: dict[int, int] | None = None):
+        self._chunks: dict[int, int] = chunks if chunks is not None else {}
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[int]) -> "Bitmap":
+        chunks: dict[int, int] = {}
+        for pos in positions:
+            chunk, offset = divmod(pos, cls.CHUNK_BITS)
+            chunks[chunk] = chunks.get(chunk, 0) | (1 << offset)
+        return cls(chunks)
+
+    def add(self, pos: int) -> None:
+        chunk, offset = divmod(pos, self.CHUNK_BITS)
+        self._chunks[chunk] = self._chunks.get(chunk, 0) | (1 << offset)
+
+    def discard(self, pos: int) -> None:
+        chunk, offset = divmod(pos, self.CHUNK_BITS)
+        bits = self._chunks.get(chunk, 0) & ~(1 << offset)
+        if bits:
+            self._chunks[chunk] = bits
+        else:
+            self._chunks.pop(chunk, None)
+
+    def copy(self) -> "Bitmap":
+        return Bitmap(dict(self._chunks))
+
+    def __contains__(self, pos: int) -> bool:
+        chunk, offset = divmod(pos, self.CHUNK_BITS)
+        return bool(self._chunks.get(chunk, 0) >> offset & 1)
+
+    def __len__(self) -> int:
+        return sum(bits.bit_count() for bits in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        for chunk in sorted(self._chunks):
+            base = chunk * self.CHUNK_BITS
+            bits = bin(self._chunks[chunk])[:1:-1]
+            offset = bits.find('1')
+            while offset != -1:
+                yield base + offset
+                offset = bits.find('1', offset + 1)
+
+    def to_set(self) -> set[int]:
+        return set(self)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = (self._chunks, other._chunks) if len(self._chunks) <= len(other._chunks) else (other._chunks, self._chunks)
+        chunks = {}
+        for chunk, bits in small.items():
+            common = bits & large.get(chunk, 0)
+            if common:
+                chunks[chunk] = common
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self._chunks)
+        for chunk, bits in other._chunks.items():
+            chunks[chunk] = chunks.get(chunk, 0) | bits
+        return Bitmap(chunks)
+
+    def __ior__(self, other: "Bitmap") -> "Bitmap":
+        chunks = self._chunks
+        for chunk, bits in other._chunks.items():
+            chunks[chunk] = chunks.get(chunk, 0) | bits
+        return self
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for chunk, bits in self._chunks.items():
+            rest = bits & ~other._chunks.get(chunk, 0)
+            if rest:
+                chunks[chunk] = rest
+        return Bitmap(chunks)
+
+    def __isub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = self._chunks
+        for chunk, bits in other._chunks.items():
+            rest = chunks.get(chunk, 0) & ~bits
+            if rest:
+                chunks[chunk] = rest
+            else:
+                chunks.pop(chunk, None)
+        return self
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Bitmap):
+            return self._chunks == other._chunks
+        if isinstance(other, (set, frozenset)):
+            return self.to_set() == other
+        return False
+
+    def __repr__(self) -> str:
+        return f"Bitmap({list(self)})"
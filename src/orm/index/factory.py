@@ -1,5 +1,5 @@
 import src.orm.index.index_types as i_t
-from src.orm.index.abstract import AbstractIndex
+from src.orm.index.abstract import AbstractIndex, Field
 
 
 class IndexFactory:
@@ -9,16 +9,38 @@ class IndexFactory:
     _instances = {
         "base": i_t.BaseIndex,
         "range": i_t.RangeIndex,
+        "bitmap": i_t.BitmapIndex,
+        "prefix": i_t.PrefixIndex,
+        "token": i_t.TokenIndex,
+        "composite": i_t.CompositeIndex,
     }
 
     @classmethod
-    def create(cls, index_type: str, field_name: str) -> AbstractIndex:
+    def create(cls, index_type: str, field_name: Field) -> AbstractIndex:
         """
         Factory method to create an index.
         :param index_type: type of index
-        :param field_name: field to create index on
+        :param field_name: field to create index on(tuple of fields for composite index)
         :return:
+        :raise ValueError: composite index is not created on several fields or other index is created on several fields
         """
         if index_type not in cls._instances:
             raise KeyError(f"Index name '{index_type}' not found.")
-        return cls._instances[index_type](field_name)
\ No newline at end of file
+        index_cls = cls._instances[index_type]
+        if issubclass(index_cls, i_t.CompositeIndex):
+            if not isinstance(field_name, tuple) or len(field_name) < 2:
+                raise ValueError(f"Index '{index_type}' requires tuple of at least two fields.")
+        elif not isinstance(field_name, str):
+            raise ValueError(f"Index '{index_type}' requires single field(use 'composite' index for several fields).")
+        return index_cls(field_name)
+    @classmethod
+    def type_name(cls, index: AbstractIndex) -> str:
+        """
+        Name of index type to create the same index with
+        :param index: index
+        :return: name of index type
+        """
+        for name, index_cls in cls._instances.items():
+            if type(index) is index_cls:
+                return name
+        raise KeyError(f"Index type '{type(index).__name__}' is not registered.")
@@ -1,10 +1,13 @@
 import operator
 from collections import UserDict
-from typing import Any, Iterator
+from operator import attrgetter
+from typing import Any, Iterable, Iterator
 
 from sortedcontainers import SortedDict
 
-from src.orm.index.abstract import AbstractIndex
+from src.orm.collection import Collection
+from src.orm.index.abstract import AbstractIndex, Field
+from src.orm.index.bitmap import Bitmap
 import src.orm.operators as ops
 
 class BaseIndex(UserDict[Any, set[int]], AbstractIndex):
@@ -15,9 +18,21 @@ class BaseIndex(UserDict[Any, set[int]], AbstractIndex):
         super().__init__()
         self.field_name = field_name
 
+    def bulk_load(self, groups: dict[Any, list[int]]):
+        if not self.data:
+            self.data = {key: set(positions) for key, positions in groups.items()}
+            return
+        data = self.data
+        for key, positions in groups.items():
+            existing = data.get(key)
+            if existing is None:
+                data[key] = set(positions)
+            else:
+                existing.update(positions)
+
     def get_positions_for_query(self, op, value):
         if op is operator.eq:
-            return self.get(value, set())
+            return set(self.get(value, ()))
         elif op == ops.in_:
             res = set()
             for k in value:
@@ -26,11 +41,21 @@ class BaseIndex(UserDict[Any, set[int]], AbstractIndex):
 
         raise NotImplementedError
 
+    def estimate_for_query(self, op, value, total: int) -> int:
+        if op is operator.eq:
+            return len(self.get(value, ()))
+        elif op == ops.in_:
+            return sum(len(self.get(k, ())) for k in value)
+
+        raise NotImplementedError
+
 class RangeIndex(AbstractIndex):
     """
     Uses ``SortedDict`` as its model. Recommended for numeric data or data that will usually be filtered by ``'>'``, ``'<'`` etc.
     """
-    def __init__(self, field_name: str):
+    ordered = True
+
+    def __init__(self, field_name: Field):
         self.field_name = field_name
         self._data = SortedDict()
 
@@ -49,6 +74,9 @@ class RangeIndex(AbstractIndex):
     def __delitem__(self, key):
         del self._data[key]
 
+    def values(self):
+        return self._data.values()
+
     def clear(self):
         self._data.clear()
 
@@ -58,6 +86,22 @@ class RangeIndex(AbstractIndex):
     def get(self, key, default=None):
         return self._data.get(key, default)
 
+    def bulk_load(self, groups: dict[Any, list[int]]):
+        # keys are sorted once and loaded in one batch instead of bisect-inserting them one by one
+        keys = sorted(groups)
+        if not self._data:
+            self._data = SortedDict(zip(keys, (set(groups[key]) for key in keys)))
+            return
+        data = self._data
+        new = {}
+        for key in keys:
+            existing = data.get(key)
+            if existing is None:
+                new[key] = set(groups[key])
+            else:
+                existing.update(groups[key])
+        data.update(new)
+
     def _get_slice(self, start_key: Any = None, end_key: Any = None, inclusive_start: bool = True, inclusive_end: bool = True) -> Iterator[set[int]]:
         if start_key is None and end_key is None:
             yield from self._data.values()
@@ -95,21 +139,46 @@ class RangeIndex(AbstractIndex):
             result |= positions
         return result
 
-    def find_positions_between(self, low: Any, high: Any, inclusive: bool = True) -> set[int]:
+    def find_positions_between(self, low: Any, high: Any, inclusive: bool | tuple[bool, bool] = True) -> set[int]:
+        if isinstance(inclusive, bool):
+            inclusive = (inclusive, inclusive)
         result = set()
         for positions in self._get_slice(
             start_key=low,
             end_key=high,
-            inclusive_start=inclusive,
-            inclusive_end=inclusive
+            inclusive_start=inclusive[0],
+            inclusive_end=inclusive[1]
         ):
             result |= positions
         return result
 
+    def iter_ordered(self, reverse: bool = False) -> Iterator[set[int]]:
+        for key in self._data.irange(reverse=reverse):
+            yield self._data[key]
+
+    def matching_keys(self, op=None, value=None, reverse: bool = False) -> Iterable:
+        data = self._data
+        match op:
+            case None:
+                return data.irange(reverse=reverse)
+            case operator.gt:
+                return data.irange(minimum=value, inclusive=(False, True), reverse=reverse)
+            case operator.ge:
+                return data.irange(minimum=value, reverse=reverse)
+            case operator.lt:
+                return data.irange(maximum=value, inclusive=(True, False), reverse=reverse)
+            case operator.le:
+                return data.irange(maximum=value, reverse=reverse)
+            case ops.between:
+                return data.irange(value.low, value.high, (value.low_inclusive, value.high_inclusive), reverse)
+            case ops.in_:
+                return sorted(super().matching_keys(op, value), reverse=reverse)
+        return super().matching_keys(op, value)
+
     def get_positions_for_query(self, op, value) -> set[int]:
         match op:
             case operator.eq:
-                return self.get(value, set())
+                return set(self.get(value, ()))
             case operator.gt:
                 return self.find_positions_gt(value)
             case operator.ge:
@@ -123,5 +192,344 @@ class RangeIndex(AbstractIndex):
                 for k in value:
                     res |= self.get(k, set())
                 return res
+            case ops.between:
+                return self.find_positions_between(value.low, value.high, (value.low_inclusive, value.high_inclusive))
+            case _:
+                raise NotImplementedError
+
+    def estimate_for_query(self, op, value, total: int) -> int:
+        n_keys = len(self._data)
+        if not n_keys:
+            return 0
+        match op:
+            case operator.eq:
+                return len(self.get(value, ()))
+            case ops.in_:
+                return sum(len(self.get(k, ())) for k in value)
+            case operator.gt:
+                keys = n_keys - self._data.bisect_right(value)
+            case operator.ge:
+                keys = n_keys - self._data.bisect_left(value)
+            case operator.lt:
+                keys = self._data.bisect_left(value)
+            case operator.le:
+                keys = self._data.bisect_right(value)
+            case ops.between:
+                keys = self._count_keys(value)
             case _:
-                raise NotImplementedError
\ No newline at end of file
+                raise NotImplementedError
+        return keys * total // n_keys
+
+    def _count_keys(self, bounds: ops.Bounds) -> int:
+        """
+        Count keys within bounds
+        :param bounds: range of keys
+        :return: number of keys
+        """
+        data = self._data
+        start = 0
+        if bounds.low is not None:
+            start = data.bisect_left(bounds.low) if bounds.low_inclusive else data.bisect_right(bounds.low)
+        stop = len(data)
+        if bounds.high is not None:
+            stop = data.bisect_right(bounds.high) if bounds.high_inclusive else data.bisect_left(bounds.high)
+        return max(stop - start, 0)
+
+
+def _prefix_bounds(prefix: str) -> ops.Bounds:
+    """
+    :param prefix: string prefix
+    :return: range of strings starting with ``prefix``: ``[prefix, successor)``, where successor is prefix with its last
+    character incremented
+    """
+    stem = prefix.rstrip(chr(0x10FFFF))
+    if not stem:
+        return ops.Bounds(prefix)
+    return ops.Bounds(prefix, stem[:-1] + chr(ord(stem[-1]) + 1), True, False)
+
+
+class PrefixIndex(RangeIndex):
+    """
+    ``RangeIndex`` of strings that also answers ``startswith``: strings with the same prefix are adjacent in sorted order,
+    so prefix search is a range lookup. Recommended for prefix search by title, author etc.
+    """
+    def matching_keys(self, op=None, value=None, reverse: bool = False) -> Iterable:
+        if op is ops.startswith:
+            return super().matching_keys(ops.between, _prefix_bounds(value), reverse)
+        return super().matching_keys(op, value, reverse)
+
+    def get_positions_for_query(self, op, value) -> set[int]:
+        if op is ops.startswith:
+            return super().get_positions_for_query(ops.between, _prefix_bounds(value))
+        return super().get_positions_for_query(op, value)
+
+    def estimate_for_query(self, op, value, total: int) -> int:
+        if op is ops.startswith:
+            return super().estimate_for_query(ops.between, _prefix_bounds(value), total)
+        return super().estimate_for_query(op, value, total)
+
+
+def _trigrams(value: str) -> set[str]:
+    value = value.casefold()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class TokenIndex(BaseIndex):
+    """
+    ``BaseIndex`` with inverted index of tokens: every trigram of(case-folded) indexed strings points to strings containing
+    it. Answers ``contains``, ``icontains`` and ``startswith``: strings having all trigrams of searched part are candidates,
+    candidates are checked with operator(distinct strings only, not rows). Parts shorter than 3 characters are checked
+    against all indexed strings. Recommended for substring search by title, author etc.
+    """
+    _TEXT_OPERATORS = {ops.contains, ops.icontains, ops.startswith}
+
+    def __init__(self, field_name: str):
+        super().__init__(field_name)
+        self._tokens: dict[str, set[str]] = {}
+
+    def _add_tokens(self, key):
+        if isinstance(key, str):
+            for token in _trigrams(key):
+                self._tokens.setdefault(token, set()).add(key)
+
+    def _remove_tokens(self, key):
+        if isinstance(key, str):
+            for token in _trigrams(key):
+                keys = self._tokens.get(token)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tokens[token]
+
+    def __setitem__(self, key, value):
+        if key not in self.data:
+            self._add_tokens(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._remove_tokens(key)
+
+    def clear(self):
+        super().clear()
+        self._tokens.clear()
+
+    def bulk_load(self, groups: dict[Any, list[int]]):
+        new = [key for key in groups if key not in self.data]
+        super().bulk_load(groups)
+        for key in new:
+            self._add_tokens(key)
+
+    def _candidates(self, value: str) -> Iterable:
+        """
+        :param value: searched part
+        :return: indexed values that may contain ``value``
+        """
+        tokens = _trigrams(value)
+        if not tokens:
+            return self.data.keys()
+        keys = sorted((self._tokens.get(token, ()) for token in tokens), key=len)
+        return keys[0].intersection(*keys[1:]) if keys[0] else ()
+
+    def matching_keys(self, op=None, value=None, reverse: bool = False) -> Iterable:
+        if op in self._TEXT_OPERATORS:
+            return [key for key in self._candidates(value) if isinstance(key, str) and op(key, value)]
+        return super().matching_keys(op, value)
+
+    def get_positions_for_query(self, op, value) -> set[int]:
+        if op in self._TEXT_OPERATORS:
+            res = set()
+            for key in self.matching_keys(op, value):
+                res |= self.data[key]
+            return res
+        return super().get_positions_for_query(op, value)
+
+    def estimate_for_query(self, op, value, total: int) -> int:
+        if op in self._TEXT_OPERATORS:
+            # candidates are not checked: estimate is an upper bound
+            return sum(len(self.data[key]) for key in self._candidates(value))
+        return super().estimate_for_query(op, value, total)
+
+
+class _Top:
+    """Value greater than any other(``prefix + (TOP,)`` is above all tuples starting with ``prefix``)"""
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return self is other
+
+    def __gt__(self, other):
+        return self is not other
+
+    def __ge__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return self is other
+
+    __hash__ = object.__hash__
+
+
+TOP = _Top()
+
+
+class CompositeIndex(RangeIndex):
+    """
+    ``RangeIndex`` of several fields keyed by tuples of their values(``{(author, year): {pos1, pos2}}``). Tuples sharing
+    values of leading fields are adjacent in sorted order, so equality on leading fields plus range on the next field is
+    one range lookup(see ``lookup_bounds``). Recommended for frequent queries like ``author=..., year__ge=...``
+    """
+    def __init__(self, field_name: tuple[str, ...]):
+        super().__init__(field_name)
+        self._key = attrgetter(*field_name)
+
+    def row_key(self, row):
+        return self._key(row)
+
+    def row_keys(self, rows: Iterable) -> list:
+        return list(map(self._key, rows))
+
+    def row_items(self, rows: Collection) -> Iterator[tuple[int, object]]:
+        for items in zip(*(rows.field_items(field) for field in self.fields)):
+            yield items[0][0], tuple(value for _, value in items)
+
+    @staticmethod
+    def lookup_bounds(prefix: tuple, bounds: ops.Bounds | None = None) -> ops.Bounds:
+        """
+        :param prefix: values of leading fields
+        :param bounds: range of the next field(``None`` - any value)
+        :return: range of tuple keys(to query with ``ops.between``)
+        """
+        if bounds is None:
+            return ops.Bounds(prefix, prefix + (TOP,), True, False)
+        if bounds.low is None:
+            low = prefix
+        else:
+            low = prefix + ((bounds.low,) if bounds.low_inclusive else (bounds.low, TOP))
+        if bounds.high is None:
+            high = prefix + (TOP,)
+        else:
+            high = prefix + ((bounds.high, TOP) if bounds.high_inclusive else (bounds.high,))
+        return ops.Bounds(low, high, True, False)
+
+
+class BitmapIndex(AbstractIndex):
+    """
+    Uses ``{value: Bitmap}`` model. Recommended for low-cardinality fields(e.g. genre): compact and
+    several bitmap-indexed filters are combined with bitwise AND.
+    """
+    bitmaps = True
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self._data: dict[Any, Bitmap] = {}
+        self._all = Bitmap()
+
+    def __getitem__(self, item) -> Bitmap:
+        return self._data[item]
+
+    def __setitem__(self, key, value: Bitmap):
+        self._data[key] = value
+
+    def __contains__(self, item):
+        return item in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def values(self):
+        return self._data.values()
+
+    def clear(self):
+        self._data.clear()
+        self._all = Bitmap()
+
+    def _add_element(self, key, val: int):
+        self._data.setdefault(key, Bitmap()).add(val)
+        self._all.add(val)
+
+    def bulk_load(self, groups: dict[Any, list[int]]):
+        for key, positions in groups.items():
+            bitmap = Bitmap.from_positions(positions)
+            existing = self._data.get(key)
+            if existing is None:
+                self._data[key] = bitmap
+            else:
+                existing |= bitmap
+            self._all |= bitmap
+
+    def bulk_remove(self, groups: dict[Any, list[int]]):
+        removed = Bitmap()
+        for key, positions in groups.items():
+            bitmap = Bitmap.from_positions(positions)
+            existing = self._data.get(key)
+            if existing is not None:
+                existing -= bitmap
+                if not existing:
+                    del self._data[key]
+            removed |= bitmap
+        self._all -= removed
+
+    def on_pop(self, row, pos: int):
+        super().on_pop(row, pos)
+        self._all.discard(pos)
+
+    def _remap_positions(self, mapping: list[int]):
+        self._all = Bitmap()
+        for key, bitmap in self._data.items():
+            remapped = Bitmap.from_positions(mapping[p] for p in bitmap)
+            self._data[key] = remapped
+            self._all |= remapped
+
+    def _shift_positions(self, start: int, delta: int):
+        def shifted(bitmap: Bitmap) -> Bitmap:
+            return Bitmap.from_positions(p + delta if p >= start else p for p in bitmap)
+
+        for key, bitmap in self._data.items():
+            self._data[key] = shifted(bitmap)
+        self._all = shifted(self._all)
+
+    def get_bitmap_for_query(self, op, value) -> Bitmap:
+        """
+        Get bitmap of positions for query. Returned bitmap must not be modified.
+        :param op: operator
+        :param value: value to compare using operator
+        :return: bitmap of positions
+        """
+        if op is operator.eq:
+            return self._data.get(value, Bitmap())
+        elif op is operator.ne:
+            return self._all - self._data.get(value, Bitmap())
+        elif op == ops.in_:
+            res = Bitmap()
+            for k in value:
+                if k in self._data:
+                    res = res | self._data[k]
+            return res
+
+        raise NotImplementedError
+
+    def get_positions_for_query(self, op, value) -> set[int]:
+        return self.get_bitmap_for_query(op, value).to_set()
+
+    def matching_keys(self, op=None, value=None, reverse: bool = False) -> Iterable:
+        if op is operator.ne:
+            return [key for key in self._data if key != value]
+        return super().matching_keys(op, value)
+
+    def estimate_for_query(self, op, value, total: int) -> int:
+        if op is operator.eq:
+            return len(self._data.get(value, ()))
+        elif op is operator.ne:
+            return total - len(self._data.get(value, ()))
+        elif op == ops.in_:
+            return sum(len(self._data.get(k, ())) for k in value)
+
+        raise NotImplementedError
@@ -0,0 +1,97 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Reader-writer lock: many readers or one writer at a time. Waiting writers block new readers, so a stream of reads
+    doesn't starve writes. Both locks are reentrant, thread holding write lock may also read(upgrade of read lock to
+    write lock is not supported)
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers: dict[int, int] = {}
+        self._writer: int | None = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self, timeout: float | None = None) -> None:
+        """
+        :param timeout: max seconds to wait(``None`` - wait forever)
+        :raise TimeoutError: lock was not acquired in time
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                if not self._cond.wait_for(lambda: self._writer is None and not self._waiting_writers, timeout):
+                    raise TimeoutError("Timed out waiting for read lock")
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        """
+        :raise RuntimeError: read lock is not held by current thread
+        """
+        me = threading.get_ident()
+        with self._cond:
+            count = self._readers.get(me)
+            if count is None:
+                raise RuntimeError("Read lock is not held by current thread")
+            if count > 1:
+                self._readers[me] = count - 1
+            else:
+                del self._readers[me]
+                self._cond.notify_all()
+
+    def acquire_write(self, timeout: float | None = None) -> None:
+        """
+        :param timeout: max seconds to wait(``None`` - wait forever)
+        :raise TimeoutError: lock was not acquired in time
+        :raise RuntimeError: current thread holds read lock
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writes += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Read lock can't be upgraded to write lock")
+            self._waiting_writers += 1
+            try:
+                acquired = self._cond.wait_for(lambda: self._writer is None and not self._readers, timeout)
+            finally:
+                self._waiting_writers -= 1
+            if not acquired:
+                self._cond.notify_all()
+                raise TimeoutError("Timed out waiting for write lock")
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self) -> None:
+        """
+        :raise RuntimeError: write lock is not held by current thread
+        """
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Write lock is not held by current thread")
+            self._writes -= 1
+            if not self._writes:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self, timeout: float | None = None):
+        """Hold read lock inside ``with`` block"""
+        self.acquire_read(timeout)
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self, timeout: float | None = None):
+        """Hold write lock inside ``with`` block"""
+        self.acquire_write(timeout)
+        try:
+            yield self
+        finally:
+            self.release_write()
@@ -1,2 +1,42 @@
+from dataclasses import dataclass
+from typing import Any
+
+
 def in_(value, container):
-    return value in container
\ No newline at end of file
+    return value in container
+
+
+def startswith(value, prefix):
+    return value is not None and value.startswith(prefix)
+
+
+def contains(value, part):
+    return value is not None and part in value
+
+
+def icontains(value, part):
+    return value is not None and part.casefold() in value.casefold()
+
+
+@dataclass(frozen=True)
+class Bounds:
+    """
+    Range of values. ``None`` bound means unbounded side
+    """
+    low: Any = None
+    high: Any = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+
+    def __contains__(self, value) -> bool:
+        if self.low is not None:
+            if value < self.low or (value == self.low and not self.low_inclusive):
+                return False
+        if self.high is not None:
+            if value > self.high or (value == self.high and not self.high_inclusive):
+                return False
+        return True
+
+
+def between(value, bounds: Bounds):
+    return value in bounds
@@ -0,0 +1,217 @@
+"""
+Process-parallel full scans of columnar collections. Typed arrays of columns(numbers, codes of dictionary-encoded
+values) are copied to ``multiprocessing.shared_memory`` once per version of table, worker processes check predicates
+on their chunk of slots reading arrays from shared memory(only predicates and matching slots are pickled)
+"""
+import os
+import threading
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable
+
+import src.orm.operators as ops
+from src.orm.collection import Collection
+from src.orm.columnar import ColumnarCollection, _matching, _numpy_mask, np
+
+_NUMPY_TYPES = {'q': 'int64', 'd': 'float64'}
+
+_Check = tuple[str, str, int, Callable, Any]
+"""Predicate of worker: ``(segment name, typecode, length, op_func, value)``"""
+
+
+def _scan_chunk(checks: list[_Check], start: int, stop: int) -> array:
+    """
+    Worker: check predicates on slots ``start``...``stop - 1``
+    :param checks: predicates on arrays in shared memory
+    :return: matching slots
+    """
+    segments = [SharedMemory(name) for name, *_ in checks]
+    try:
+        if np is not None:
+            return _scan_numpy(checks, segments, start, stop)
+        return _scan_python(checks, segments, start, stop)
+    finally:
+        for shm in segments:
+            shm.close()
+
+
+def _scan_numpy(checks: list[_Check], segments: list[SharedMemory], start: int, stop: int) -> array:
+    mask = None
+    for (_, typecode, length, op_func, value), shm in zip(checks, segments):
+        values = np.frombuffer(shm.buf, dtype=_NUMPY_TYPES[typecode], count=length)[start:stop]
+        check = _numpy_mask(values, op_func, value)
+        if check is None:
+            check = np.zeros(len(values), dtype=bool)
+            check[list(_matching(values.tolist(), op_func, value))] = True
+        del values
+        mask = check if mask is None else mask & check
+    slots = array('q')
+    slots.frombytes((np.flatnonzero(mask) + start).astype(np.int64).tobytes())
+    return slots
+
+
+def _scan_python(checks: list[_Check], segments: list[SharedMemory], start: int, stop: int) -> array:
+    offsets = None
+    for (_, typecode, length, op_func, value), shm in zip(checks, segments):
+        view = shm.buf[:length * array(typecode).itemsize].cast(typecode)
+        try:
+            chunk = view[start:stop]
+            if offsets is None:
+                offsets = list(_matching(chunk, op_func, value))
+            else:
+                if op_func is ops.in_:
+                    value = set(value)
+                offsets = [offset for offset in offsets if op_func(chunk[offset], value)]
+            chunk.release()
+        finally:
+            view.release()
+        if not offsets:
+            break
+    return array('q', (start + offset for offset in offsets))
+
+
+class _Segment:
+    """
+    Copy of typed array in shared memory. Segment dropped from cache is freed when the last scan using it is done
+    """
+    def __init__(self, data: array):
+        self.typecode = data.typecode
+        self.length = len(data)
+        size = self.length * data.itemsize
+        self.shm = SharedMemory(create=True, size=max(size, 1))
+        self.shm.buf[:size] = memoryview(data).cast('B')
+        self.users = 0
+        self.dropped = False
+
+    def release(self) -> None:
+        self.dropped = True
+        if not self.users:
+            self.shm.close()
+            self.shm.unlink()
+
+    def done(self) -> None:
+        """Scan using segment is done"""
+        self.users -= 1
+        if self.dropped:
+            self.release()
+
+
+def _release(shared: dict[int, _Segment]) -> None:
+    for segment in shared.values():
+        segment.release()
+
+
+def _release_key(segments: dict, key: int) -> None:
+    """Release shared copies of collection(called when collection is garbage-collected)"""
+    cached = segments.pop(key, None)
+    if cached is not None:
+        _release(cached[1])
+
+
+def _release_all(segments: dict) -> None:
+    while segments:
+        _, (_, shared, finalizer) = segments.popitem()
+        finalizer.detach()
+        _release(shared)
+
+
+class ParallelScanner:
+    """
+    Executor of full scans of columnar collections in worker processes: slots are split into ``workers`` chunks, results
+    of chunks are merged in order. Predicates on columns that are not typed arrays are checked afterwards in current
+    process. Scans of row collections and scans below ``threshold`` slots are not parallel(worker round trip costs more).
+    Shared copies of columns are refreshed when table version changes. Call ``close`` to stop workers
+    :param workers: number of worker processes(number of CPUs by default)
+    :param threshold: min number of slots to scan in parallel
+    """
+    def __init__(self, workers: int | None = None, threshold: int = 1_000_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self._executor: ProcessPoolExecutor | None = None
+        self._segments: dict[int, tuple[int, dict[int, _Segment], weakref.finalize]] = {}
+        """
+        Shared copies of arrays by collection: ``{id(collection): (version, {id(array): segment}, finalizer)}``. Copies
+        are released by finalizer when collection is garbage-collected
+        """
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _release_all, self._segments)
+
+    def _shared(self, collection: Collection, data: array, version: int) -> _Segment:
+        """
+        :return: shared copy of array of collection as of table version(copies of older versions are released)
+        """
+        key = id(collection)
+        cached = self._segments.get(key)
+        if cached is None:
+            finalizer = weakref.finalize(collection, _release_key, self._segments, key)
+            cached = self._segments[key] = (version, {}, finalizer)
+        elif cached[0] != version:
+            _release(cached[1])
+            cached = self._segments[key] = (version, {}, cached[2])
+        segment = cached[1].get(id(data))
+        if segment is None:
+            segment = cached[1][id(data)] = _Segment(data)
+        return segment
+
+    def scan(self, collection: Collection, predicates: list, version: int) -> set[int] | None:
+        """
+        :param collection: collection of table
+        :param predicates: predicates to check
+        :param version: version of table(shared copies of older versions are replaced)
+        :return: set of ids of matching items, ``None`` if scan can't be parallel(no predicates on typed arrays)
+        """
+        slots = collection.slots
+        if slots < self.threshold or not isinstance(collection, ColumnarCollection):
+            # rows of row collections are not stored in typed arrays
+            return None
+        checks, rest = collection.array_predicates(predicates)
+        if not checks:
+            return None
+        segments = []
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+            shared: list[_Check] = []
+            for data, op_func, value in checks:
+                segment = self._shared(collection, data, version)
+                segment.users += 1
+                segments.append(segment)
+                shared.append((segment.shm.name, segment.typecode, segment.length, op_func, value))
+            step = -(-slots // self.workers)
+            futures = [
+                self._executor.submit(_scan_chunk, shared, start, min(start + step, slots))
+                for start in range(0, slots, step)
+            ]
+        # results are waited for without lock, so scans of other threads run concurrently
+        try:
+            parts = [future.result() for future in futures]
+        finally:
+            with self._lock:
+                for segment in segments:
+                    segment.done()
+        ids = []
+        for part in parts:
+            ids.extend(part.tolist())
+        return collection.scan(rest, ids=ids)
+
+    def forget(self, collection: Collection) -> None:
+        """
+        Free shared copies of collection(e.g. when its table is dropped)
+        :param collection: collection of table
+        """
+        with self._lock:
+            cached = self._segments.pop(id(collection), None)
+            if cached is not None:
+                cached[2].detach()
+                _release(cached[1])
+
+    def close(self) -> None:
+        """Stop workers and free shared memory"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            _release_all(self._segments)
@@ -0,0 +1,221 @@
+from dataclasses import dataclass, replace
+from typing import Any, Callable
+
+import src.constants as cst
+import src.orm.operators as ops
+from src.orm.index.abstract import AbstractIndex, Field
+from src.orm.index.index_types import CompositeIndex
+
+_LOWER_BOUND_OPS = {"gt": False, "ge": True}
+_UPPER_BOUND_OPS = {"lt": False, "le": True}
+_RANGE_OPS = {*_LOWER_BOUND_OPS, *_UPPER_BOUND_OPS, "between"}
+
+
+@dataclass
+class Predicate:
+    """
+    Single query filter: ``field op value``
+    """
+    field: str
+    op: str
+    op_func: Callable
+    value: Any
+
+    def matches(self, row) -> bool:
+        return self.op_func(getattr(row, self.field, None), self.value)
+
+
+@dataclass
+class CompositePredicate:
+    """
+    Predicates on leading fields of composite index(equalities and range on the last one) answered by one lookup:
+    ``field`` is tuple of index fields, ``value`` is range of tuple keys
+    """
+    field: tuple[str, ...]
+    op: str
+    op_func: Callable
+    value: Any
+    predicates: list[Predicate]
+
+    def matches(self, row) -> bool:
+        return all(predicate.matches(row) for predicate in self.predicates)
+
+
+@dataclass
+class PlanStep:
+    """
+    Step of query plan
+    :param predicate: predicate to apply
+    :param index: index to answer predicate with(``None`` if predicate must be checked row by row)
+    :param estimate: estimated number of matching positions
+    """
+    predicate: Predicate | CompositePredicate
+    index: AbstractIndex | None
+    estimate: int
+
+
+@dataclass
+class CompositeStep(PlanStep):
+    """
+    Step of query plan answered by composite index
+    """
+    predicate: CompositePredicate
+    index: AbstractIndex
+
+
+def parse_filter(filter_: str) -> tuple[str, str]:
+    """
+    Split filter kwarg into field and operator
+    :param filter_: ``FIELD__OPERATOR`` or ``FIELD``(``eq`` is assumed)
+    :return: tuple of field and operator name
+    """
+    if "__" in filter_:
+        field, op = filter_.rsplit('__', 1)
+        if op in cst.OPERATORS:
+            return field, op
+    return filter_, "eq"
+
+
+def parse_filters(filters: dict[str, Any]) -> list[Predicate]:
+    """
+    :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE
+    :return: list of predicates
+    """
+    predicates = []
+    for filter_, value in filters.items():
+        field, op = parse_filter(filter_)
+        predicates.append(Predicate(field, op, cst.OPERATORS[op], value))
+    return merge_ranges(predicates)
+
+
+def _tighten(bounds: ops.Bounds, op: str, value) -> ops.Bounds:
+    """
+    Narrow bounds with one more range predicate
+    :param bounds: current bounds
+    :param op: ``gt``, ``ge``, ``lt`` or ``le``
+    :param value: value of predicate
+    :return: new bounds
+    """
+    if op in _LOWER_BOUND_OPS:
+        inclusive = _LOWER_BOUND_OPS[op]
+        if bounds.low is None or value > bounds.low or (value == bounds.low and not inclusive):
+            return replace(bounds, low=value, low_inclusive=inclusive)
+    else:
+        inclusive = _UPPER_BOUND_OPS[op]
+        if bounds.high is None or value < bounds.high or (value == bounds.high and not inclusive):
+            return replace(bounds, high=value, high_inclusive=inclusive)
+    return bounds
+
+
+def merge_ranges(predicates: list[Predicate]) -> list[Predicate]:
+    """
+    Merge several range predicates(``gt``, ``ge``, ``lt``, ``le``) on the same field into one ``between`` predicate
+    :param predicates: predicates of query
+    :return: predicates with range predicates merged(order of first occurrence is kept)
+    """
+    def is_range(predicate: Predicate) -> bool:
+        return predicate.op in _LOWER_BOUND_OPS or predicate.op in _UPPER_BOUND_OPS
+
+    groups: dict[str, list[Predicate]] = {}
+    for predicate in predicates:
+        if is_range(predicate):
+            groups.setdefault(predicate.field, []).append(predicate)
+    if all(len(group) == 1 for group in groups.values()):
+        return predicates
+
+    merged = []
+    for predicate in predicates:
+        if not is_range(predicate) or len(groups[predicate.field]) == 1:
+            merged.append(predicate)
+            continue
+        group = groups[predicate.field]
+        if predicate is not group[0]:
+            continue
+        bounds = ops.Bounds()
+        for range_predicate in group:
+            bounds = _tighten(bounds, range_predicate.op, range_predicate.value)
+        merged.append(Predicate(predicate.field, "between", ops.between, bounds))
+    return merged
+
+
+class QueryPlanner:
+    """
+    Orders query predicates by estimated selectivity
+    """
+    @staticmethod
+    def plan(predicates: list[Predicate], indexes: dict[Field, AbstractIndex], total: int) -> list[PlanStep]:
+        """
+        Build query plan: indexed predicates go first(most selective first), predicates without usable index go last
+        :param predicates: predicates of query
+        :param indexes: indexes of the table by field name
+        :param total: number of rows in the table
+        :return: ordered list of plan steps
+        """
+        indexed: list[PlanStep] = []
+        residual: list[PlanStep] = []
+        composite = QueryPlanner.composite_step(predicates, indexes, total)
+        if composite is not None:
+            indexed.append(composite)
+            covered = composite.predicate.predicates
+            predicates = [predicate for predicate in predicates if not any(predicate is item for item in covered)]
+        for predicate in predicates:
+            idx = indexes.get(predicate.field, None)
+            if idx is not None:
+                try:
+                    estimate = idx.estimate_for_query(predicate.op_func, predicate.value, total)
+                except NotImplementedError:
+                    pass
+                else:
+                    indexed.append(PlanStep(predicate, idx, estimate))
+                    continue
+            residual.append(PlanStep(predicate, None, total))
+        indexed.sort(key=lambda step: step.estimate)
+        return indexed + residual
+
+    @staticmethod
+    def composite_step(predicates: list[Predicate], indexes: dict[Field, AbstractIndex], total: int) -> CompositeStep | None:
+        """
+        Find composite index answering the most predicates: equalities on its leading fields and optionally range(or
+        equality) on the next field. Index is used if it covers several predicates or predicate without own index
+        :param predicates: predicates of query
+        :param indexes: indexes of the table(composite ones are keyed by tuples of fields)
+        :param total: number of rows in the table
+        :return: plan step with ``CompositePredicate`` or ``None``
+        """
+        by_field: dict[str, list[Predicate]] = {}
+        for predicate in predicates:
+            by_field.setdefault(predicate.field, []).append(predicate)
+        best: CompositeStep | None = None
+        for key, idx in indexes.items():
+            if not isinstance(idx, CompositeIndex) or idx.fields[0] not in by_field:
+                continue
+            key = idx.fields
+            prefix: tuple = ()
+            covered: list[Predicate] = []
+            bounds = None
+            for name in key:
+                candidates = by_field.get(name, ())
+                equal = next((predicate for predicate in candidates if predicate.op == "eq"), None)
+                if equal is not None:
+                    prefix += (equal.value,)
+                    covered.append(equal)
+                    continue
+                ranged = next((predicate for predicate in candidates if predicate.op in _RANGE_OPS), None)
+                if ranged is not None:
+                    bounds = ranged.value if ranged.op == "between" else _tighten(ops.Bounds(), ranged.op, ranged.value)
+                    covered.append(ranged)
+                break
+            if len(covered) == 1 and covered[0].field in indexes:
+                continue
+            if len(prefix) == len(key):
+                lookup = ops.Bounds(prefix, prefix)
+            else:
+                lookup = idx.lookup_bounds(prefix, bounds)
+            try:
+                estimate = idx.estimate_for_query(ops.between, lookup, total)
+            except TypeError:
+                # values can't be compared with indexed ones
+                continue
+            if best is None or (len(covered), -estimate) > (len(best.predicate.predicates), -best.estimate):
+                best = CompositeStep(CompositePredicate(key, "between", ops.between, lookup, covered), idx, estimate)
+        return best
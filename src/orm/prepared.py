@@ -0,0 +1,132 @@
+import keyword
+import operator
+from dataclasses import dataclass, fields, is_dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+import src.constants as cst
+import src.orm.operators as ops
+from src.orm.index.abstract import AbstractIndex, Field
+from src.orm.planner import Predicate, QueryPlanner, merge_ranges, parse_filter
+
+if TYPE_CHECKING:
+    from src.orm.table import Table
+
+_INLINE_OPERATORS: dict[Callable, str] = {
+    operator.gt: "{attr} > {value}",
+    operator.ge: "{attr} >= {value}",
+    operator.lt: "{attr} < {value}",
+    operator.le: "{attr} <= {value}",
+    operator.eq: "{attr} == {value}",
+    operator.ne: "{attr} != {value}",
+    ops.in_: "{attr} in {value}",
+}
+
+
+@dataclass(frozen=True)
+class Param:
+    """
+    Placeholder of prepared query value
+    :param name: name of parameter to pass to ``PreparedQuery.execute``
+    """
+    name: str
+
+
+def compile_matcher(dtype: type, filters: list[tuple[str, Callable]]) -> Callable[..., Callable[[Any], bool]]:
+    """
+    Generate factory of row check for filters. Fields of dataclass are read as attributes, standard operators are inlined
+    :param dtype: row type
+    :param filters: list of ``(field, operator function)``
+    :return: factory that takes filter values and returns ``check(row) -> bool``
+    """
+    known = {field.name for field in fields(dtype)} if is_dataclass(dtype) else set()
+    namespace: dict[str, Any] = {}
+    conditions = []
+    for n, (field, op_func) in enumerate(filters):
+        if field in known and field.isidentifier() and not keyword.iskeyword(field):
+            attr = f"row.{field}"
+        else:
+            attr = f"getattr(row, {field!r}, None)"
+        template = _INLINE_OPERATORS.get(op_func)
+        if template is None:
+            namespace[f"op{n}"] = op_func
+            conditions.append(f"op{n}({attr}, v{n})")
+        else:
+            conditions.append("(" + template.format(attr=attr, value=f"v{n}") + ")")
+    args = ", ".join(f"v{n}" for n in range(len(filters)))
+    source = (
+        f"def factory({args}):\n"
+        f"    def check(row):\n"
+        f"        return {' and '.join(conditions) or 'True'}\n"
+        f"    return check\n"
+    )
+    exec(compile(source, "<prepared query>", "exec"), namespace)
+    return namespace["factory"]
+
+
+class PreparedQuery:
+    """
+    Query compiled once and executed many times with different values. Filters are parsed, indexes are resolved and
+    row check is generated on prepare; index references are refreshed when indexes of table are created or dropped.
+    :param table: table to query
+    :param template: filters, passed as: FIELD__OPERATOR = VALUE or ``Param``; e. g. ``genre=Param('genre'), pages__gt=100``
+    """
+    def __init__(self, table: "Table", **template):
+        self._table = table
+        self._filters: list[tuple[str, str, Callable]] = []
+        self._values: list[Any] = []
+        for filter_, value in template.items():
+            field, op = parse_filter(filter_)
+            self._filters.append((field, op, cst.OPERATORS[op]))
+            self._values.append(value)
+        self.params = {value.name for value in self._values if isinstance(value, Param)}
+        range_fields = [field for field, op, _ in self._filters if op in ("gt", "ge", "lt", "le")]
+        self._merge = len(range_fields) != len(set(range_fields))
+        self._matcher_factory = compile_matcher(table.dtype, [(field, op_func) for field, _, op_func in self._filters])
+        self._schema_version: int | None = None
+        self._indexes: dict[Field, AbstractIndex] = {}
+        self._resolve_indexes()
+
+    def _resolve_indexes(self) -> None:
+        table = self._table
+        fields = {field for field, _, _ in self._filters}
+        self._indexes = {
+            key: idx for key, idx in table._indexes.items() if (key if isinstance(key, str) else key[0]) in fields
+        }
+        self._schema_version = table.schema_version
+
+    def _bind(self, params: dict[str, Any]) -> list[Any]:
+        missing = self.params - params.keys()
+        if missing:
+            raise TypeError(f"Missing query parameters: {', '.join(sorted(missing))}")
+        unknown = params.keys() - self.params
+        if unknown:
+            raise TypeError(f"Unknown query parameters: {', '.join(sorted(unknown))}")
+        values = []
+        for value in self._values:
+            if isinstance(value, Param):
+                value = params[value.name]
+            values.append(value)
+        return values
+
+    def execute(self, **params) -> set[int]:
+        """
+        :param params: values of ``Param`` placeholders
+        :return: set of positions
+        :raise TypeError: missing or unknown parameters
+        """
+        table = self._table
+        if table.lock is not None:
+            with table.lock.read():
+                return self._execute(params)
+        return self._execute(params)
+
+    def _execute(self, params: dict[str, Any]) -> set[int]:
+        table = self._table
+        if self._schema_version != table.schema_version:
+            self._resolve_indexes()
+        values = self._bind(params)
+        predicates = [Predicate(field, op, op_func, value) for (field, op, op_func), value in zip(self._filters, values)]
+        if self._merge:
+            predicates = merge_ranges(predicates)
+        steps = QueryPlanner.plan(predicates, self._indexes, len(table))
+        return table._execute_plan(steps, self._matcher_factory(*values))
@@ -1,13 +1,23 @@
+import heapq
 from collections import UserDict
-from dataclasses import replace
+from dataclasses import fields, replace
+from operator import itemgetter
 from functools import wraps
-from typing import TypeVar, Generic, Type, Callable
+from itertools import count, islice
+from typing import Callable, Iterable, TypeVar, Generic, Type
 from typing import Iterator
+from src.orm.aggregate import aggregate_positions, index_aggregate, parse_aggregates
 from src.orm.index.factory import IndexFactory
 from src.orm.collection import Collection
-from src.orm.index.abstract import AbstractIndex
+from src.orm.index.abstract import AbstractIndex, Field
+from src.orm.planner import CompositePredicate, Predicate, PlanStep, QueryPlanner, parse_filters
+from src.orm.locks import RWLock
+from src.orm.parallel import ParallelScanner
+from src.orm.prepared import PreparedQuery
+from src.orm.utils import paused_gc
 import src.constants as cst
 import src.orm.exceptions as exc
+import src.orm.operators as ops
 from typing import get_type_hints
 
 T = TypeVar('T')
@@ -36,17 +46,83 @@ def is_created(func):
         return func(*args, **kwargs)
     return wrapper
 
+_versions = count(1)
+
+def changes_table(func):
+    """
+    Marks method that changes rows or indexes of table: table gets new unique ``version`` after the call
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        self = args[0]
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.version = next(_versions)
+    return wrapper
+
+def _grouped(positions: Iterable[int], keys: Iterable) -> dict:
+    """
+    :param positions: positions of rows
+    :param keys: indexed value of every row
+    :return: positions grouped by value(``{value: [pos1, pos2]}``)
+    """
+    groups: dict = {}
+    for pos, key in zip(positions, keys):
+        bucket = groups.get(key)
+        if bucket is None:
+            groups[key] = [pos]
+        else:
+            bucket.append(pos)
+    return groups
+
+def _shift_mapping(size: int, removed: list[int]) -> list[int]:
+    """
+    :param size: number of positions before removal
+    :param removed: ascending removed positions
+    :return: new position of every old position(``-1`` for removed ones)
+    """
+    mapping = []
+    start = 0
+    for shift, pos in enumerate(removed):
+        mapping.extend(range(start - shift, pos - shift))
+        mapping.append(-1)
+        start = pos + 1
+    mapping.extend(range(start - len(removed), size - len(removed)))
+    return mapping
+
+def _insert_mapping(size: int, inserted: list[int]) -> list[int]:
+    """
+    :param size: number of positions before insertion
+    :param inserted: ascending positions of inserted rows(after insertion)
+    :return: new position of every old position
+    """
+    mapping = []
+    start = 0
+    for pos in inserted:
+        mapping.extend(range(start, pos))
+        start = pos + 1
+    mapping.extend(range(start, size + len(inserted)))
+    return mapping
+
 class Table(Generic[T]):
     """
-    Table class
+    Table class. ``version`` changes on every change of rows or indexes, ``schema_version`` - on every change of the set of
+    indexes(versions are unique across tables). ``lock`` is reader-writer lock of table shared by threads(set by concurrent
+    session, ``None`` otherwise); methods of table don't take it themselves. Full scans of large columnar tables are run by
+    ``scanner`` in worker processes if it is set
     :param collection: collection to init table with
     :param constraints: constraints to use
     """
     def __init__(self, collection: Collection[T], constraints: DictConstraints):
-        self._indexes: dict[str, AbstractIndex] = {}
+        self._indexes: dict[Field, AbstractIndex] = {}
         self._rows = collection
         self.constraints = constraints
         self.created = False
+        self.lock: RWLock | None = None
+        self.scanner: ParallelScanner | None = None
+        self.version = next(_versions)
+        self.schema_version = self.version
 
     def create(self):
         """
@@ -64,29 +140,62 @@ class Table(Generic[T]):
     def dtype(self) -> Type[T]:
         return self._rows.dtype
 
-    def create_index(self, index_type: str, field_name: str) -> None:
+    @property
+    def collection(self) -> Collection[T]:
+        """Collection rows are stored in. Must not be changed directly"""
+        return self._rows
+
+    @property
+    def index_types(self) -> dict[Field, str]:
+        """Indexed fields(tuples of fields for composite indexes) and names of their index types"""
+        return {field: IndexFactory.type_name(idx) for field, idx in self._indexes.items()}
+
+    @property
+    def stable_ids(self) -> bool:
+        """Rows keep their ids on delete(deleted rows leave a tombstone until ``compact``)"""
+        return self._rows.stable_ids
+
+    @changes_table
+    def create_index(self, index_type: str, field_name: str | Iterable[str], include: Iterable[str] = ()) -> None:
         """
-        Creates index
+        Creates index. Dict of indexes is replaced, so queries of read-only table running in other threads don't see it
+        changing
         :param index_type: type of index
-        :param field_name: field to create index on
+        :param field_name: field to create index on(fields for composite index, e.g. ``('author', 'year')``)
+        :param include: fields to store in index too(covering index: ``select_fields`` of indexed and included fields is
+        answered from index keys). Included fields are appended to key of composite index(``range`` and ``composite`` only)
         :return:
+        :raise ValueError: fields can't be included in index of this type
         """
+        if not isinstance(field_name, str):
+            field_name = tuple(field_name)
+        if include:
+            if index_type not in ("range", "composite"):
+                raise ValueError(f"Index '{index_type}' can't include fields(use 'range' or 'composite' index).")
+            key_fields = (field_name,) if isinstance(field_name, str) else field_name
+            field_name = key_fields + tuple(field for field in dict.fromkeys(include) if field not in key_fields)
+            index_type = "composite"
         if field_name not in self._indexes:
             idx = IndexFactory.create(index_type, field_name)
             idx.rebuild(self._rows)
-            self._indexes[field_name] = idx
+            self._indexes = {**self._indexes, field_name: idx}
+            self.schema_version = next(_versions)
         else:
             raise exc.IndexExists(field_name)
 
-    def drop_index(self, field_name: str):
+    @changes_table
+    def drop_index(self, field_name: str | Iterable[str]):
         """
         Drops index
-        :param field_name: field to drop index on
+        :param field_name: field to drop index on(fields of composite index)
         :return:
         """
+        if not isinstance(field_name, str):
+            field_name = tuple(field_name)
         if field_name not in self._indexes:
             return
         self._indexes.pop(field_name)
+        self.schema_version = next(_versions)
 
     def create_constraint(self, constraint: cst.Constraint, fields: set[str], args: list | None = None) -> None:
         """
@@ -127,11 +236,12 @@ class Table(Generic[T]):
 
 
     @is_created
-    def append(self, item: T) -> None:
+    @changes_table
+    def append(self, item: T) -> int:
         """
         Append item to table
         :param item: row of ``table dtype`` type
-        :return:
+        :return: position(row id) of appended row
         """
         if not isinstance(item, self.dtype):
             raise TypeError(f"Item '{item}' is not a valid type(expected {self.dtype})")
@@ -140,23 +250,57 @@ class Table(Generic[T]):
             key = getattr(item, field)
             if key in self._indexes[field]:
                 raise exc.ConstraintFailed(cst.Constraint.UNIQUE, field, key)
-        pos = len(self._rows)
+        pos = self._rows.slots
         self._rows.append(item)
         for idx in self._indexes.values():
             idx.on_append(item, pos)
+        return pos
 
     @is_created
+    @changes_table
+    def append_many(self, items: list[T]) -> range:
+        """
+        Append rows at once: types and UNIQUE constraints(duplicates within ``items`` too) are checked for the whole batch
+        before any row is added, indexes get positions of new rows grouped by value
+        :param items: rows of ``table dtype`` type
+        :return: positions(row ids) of appended rows
+        :raise ConstraintFailed: some of constraints failed(nothing is appended)
+        """
+        dtype = self.dtype
+        for item in items:
+            if not isinstance(item, dtype):
+                raise TypeError(f"Item '{item}' is not a valid type(expected {dtype})")
+        uq_csrt = self.constraints.get(cst.Constraint.UNIQUE, (set(), []))
+        for field in uq_csrt[0]:
+            idx = self._indexes[field]
+            seen = set()
+            for item in items:
+                key = getattr(item, field)
+                if key in seen or key in idx:
+                    raise exc.ConstraintFailed(cst.Constraint.UNIQUE, field, key)
+                seen.add(key)
+        start = self._rows.slots
+        positions = range(start, start + len(items))
+        self._rows.extend(items)
+        with paused_gc():
+            for idx in self._indexes.values():
+                idx.bulk_load(_grouped(positions, idx.row_keys(items)))
+        return positions
+
+    @is_created
+    @changes_table
     def pop(self) -> T:
         """
         Pop item from table
         :return item: row of ``table dtype`` type
         """
-        item = self._rows.pop()
-        pos = len(self._rows)
+        pos = self._rows.last_id()
+        item = self._rows.pop(pos)
         for idx in self._indexes.values():
             idx.on_pop(item, pos)
         return item
 
+    @changes_table
     def rebuild_indexes(self):
         """
         Rebuild indexes
@@ -172,10 +316,10 @@ class Table(Generic[T]):
         :param item: item to remove from table(only first encountered)
         :return:
         """
-        self._rows.remove(item)
-        self.rebuild_indexes()
+        self.remove_by_index(self._rows.index(item))
 
     @is_created
+    @changes_table
     def update_at(self, pos: int, updates: dict) -> None:
         """
         Update row on position ``pos``
@@ -197,33 +341,204 @@ class Table(Generic[T]):
         for idx in self._indexes.values():
             idx.on_update(old_row, new_row, pos)
 
-    def _full_scan(self, field: str, op_func: Callable, value):
+    @is_created
+    @changes_table
+    def restore_at(self, pos: int, row: T, auto_update: bool = True) -> None:
         """
-        Full scan table with given filter
-        :param field: field to scan table with
-        :param op_func: operator function
-        :param value: value to compare with
-        :return:
+        Put old version of row back on position ``pos``(e.g. on rollback). Constraints are not checked
+        :param pos: position to restore row on
+        :param row: row to restore
+        :param auto_update: update indexes
+        """
+        current_row = self._rows[pos]
+        self._rows[pos] = row
+        if auto_update:
+            for idx in self._indexes.values():
+                idx.on_restore(row, pos, current_row)
+
+    @is_created
+    @changes_table
+    def update_many(self, positions: list[int], updates: dict) -> dict[str, list]:
+        """
+        Update rows at once: constraints are checked for the whole batch before any row is changed, only indexes of
+        updated fields are changed(positions are moved between values in groups)
+        :param positions: positions to update rows on
+        :param updates: dict of updates(e.g. {'name': 'New name'})
+        :return: ``{field: old values}`` of updated fields in order of ``positions``(see ``restore_fields``)
+        :raise ConstraintFailed: some of constraints failed(nothing is updated)
+        """
+        positions = list(positions)
+        unknown = updates.keys() - {field.name for field in fields(self.dtype)}
+        if unknown:
+            raise TypeError(f"{self.dtype.__name__} has no fields {sorted(unknown)}")
+        uq_csrt = self.constraints.get(cst.Constraint.UNIQUE, (set(), []))
+        for field in uq_csrt[0] & updates.keys():
+            key = updates[field]
+            # every updated row gets the same value
+            if len(positions) > 1 or (
+                positions and self._rows.value(positions[0], field) != key and key in self._indexes[field]
+            ):
+                raise exc.ConstraintFailed(cst.Constraint.UNIQUE, field, key)
+        return self._set_fields(positions, {field: [value] * len(positions) for field, value in updates.items()})
+
+    @is_created
+    @changes_table
+    def restore_fields(self, positions: list[int], values: dict[str, list], auto_update: bool = True) -> None:
+        """
+        Put old values of fields back(e.g. on rollback of ``update_many``). Constraints are not checked
+        :param positions: positions of rows
+        :param values: ``{field: values}`` in order of ``positions``
+        :param auto_update: update indexes
+        """
+        self._set_fields(positions, values, auto_update)
+
+    def _set_fields(self, positions: list[int], values: dict[str, list], auto_update: bool = True) -> dict[str, list]:
+        """
+        :param positions: positions of rows
+        :param values: ``{field: new values}`` in order of ``positions``
+        :param auto_update: update indexes
+        :return: ``{field: old values}``
         """
-        res = set()
-        for n, row in enumerate(self._rows, start=0):
-            attr = getattr(row, field, None)
-            if op_func(attr, value):
-                res.add(n)
-        return res
+        old_values = self._rows.set_fields(positions, values)
+        if not auto_update:
+            return old_values
+        with paused_gc():
+            for field, new in values.items():
+                idx = self._indexes.get(field)
+                if idx is not None:
+                    idx.bulk_move(positions, old_values[field], new)
+            for key, idx in self._indexes.items():
+                if isinstance(key, tuple) and not values.keys().isdisjoint(key):
+                    current = {field: self._rows.take(positions, field) for field in key if field not in values}
+                    old = [old_values[field] if field in values else current[field] for field in key]
+                    new = [values[field] if field in values else current[field] for field in key]
+                    idx.bulk_move(positions, list(zip(*old)), list(zip(*new)))
+        return old_values
 
     @is_created
+    @changes_table
+    def remove_many(self, positions: list[int], auto_update: bool = True) -> list[T]:
+        """
+        Remove rows at once: collection is rebuilt in one pass, indexes drop positions grouped by value and shift
+        remaining positions once(positions stay for tables with stable ids)
+        :param positions: ascending positions(row ids) of rows to remove
+        :param auto_update: update indexes(tables with stable ids always drop the row ids from indexes)
+        :return: removed rows(see ``restore_many``)
+        """
+        size = self._rows.slots
+        rows = self._rows.pop_many(positions)
+        if not (auto_update or self.stable_ids):
+            return rows
+        mapping = None
+        if not self.stable_ids and positions and positions[0] != size - len(positions):
+            # no positions after removed ones if the last rows are removed: nothing to shift
+            mapping = _shift_mapping(size, positions)
+        with paused_gc():
+            for idx in self._indexes.values():
+                idx.on_remove_many(_grouped(positions, idx.row_keys(rows)), mapping)
+        return rows
+
+    @is_created
+    @changes_table
+    def restore_many(self, positions: list[int], rows: list[T], auto_update: bool = True) -> None:
+        """
+        Put removed rows back on their positions(e.g. on rollback of ``remove_many``). Constraints are not checked
+        :param positions: ascending positions(row ids) rows had
+        :param rows: rows to restore
+        :param auto_update: update indexes(tables with stable ids always add the row ids to indexes)
+        """
+        mapping = None
+        if not self.stable_ids and positions and positions[0] != self._rows.slots:
+            mapping = _insert_mapping(self._rows.slots, positions)
+        self._rows.insert_many(rows, positions)
+        if not (auto_update or self.stable_ids):
+            return
+        with paused_gc():
+            for idx in self._indexes.values():
+                idx.on_insert_many(_grouped(positions, idx.row_keys(rows)), mapping)
+
+    def _full_scan(self, predicates: list[Predicate | CompositePredicate], matcher: Callable[[T], bool] | None = None) -> set[int]:
+        """
+        Full scan table with given filters(single pass for all of them)
+        :param predicates: predicates to check every row with
+        :param matcher: compiled check of all predicates
+        :return: set of matching positions
+        """
+        if self.scanner is not None:
+            positions = self.scanner.scan(self._rows, predicates, self.version)
+            if positions is not None:
+                return positions
+        return self._rows.scan(predicates, matcher)
+
+    def _filter_positions(self, positions: set[int], predicates: list[Predicate | CompositePredicate], matcher: Callable[[T], bool] | None = None) -> set[int]:
+        """
+        Check predicates only against given positions
+        :param positions: candidate positions
+        :param predicates: predicates to check rows with
+        :param matcher: compiled check of all predicates of query
+        :return: set of matching positions
+        """
+        return self._rows.filter(positions, predicates, matcher)
+
+    def _execute_plan(self, steps: list[PlanStep], matcher: Callable[[T], bool] | None = None) -> set[int]:
+        """
+        Execute query plan: most selective indexed step gives candidates, other steps are checked against candidates only.
+        Bitmap-indexed steps are combined with bitwise AND before candidates are built
+        :param steps: plan steps(see ``QueryPlanner.plan``)
+        :param matcher: compiled check of all predicates(see ``PreparedQuery``)
+        :return: set of matching positions
+        """
+        if not steps:
+            return set(self._rows.ids())
+        first = steps[0]
+        if first.index is None:
+            return self._full_scan([step.predicate for step in steps], matcher)
+        if not first.estimate:
+            return set()
+        rest = steps[1:]
+        if first.index.bitmaps:
+            bitmap = first.index.get_bitmap_for_query(first.predicate.op_func, first.predicate.value)
+            rest = []
+            for step in steps[1:]:
+                if step.index is not None and step.index.bitmaps:
+                    bitmap = bitmap & step.index.get_bitmap_for_query(step.predicate.op_func, step.predicate.value)
+                else:
+                    rest.append(step)
+            candidates = bitmap.to_set()
+        else:
+            candidates = first.index.get_positions_for_query(first.predicate.op_func, first.predicate.value)
+        residual = []
+        for step in rest:
+            if not candidates:
+                return candidates
+            if step.index is not None and step.index.bitmaps:
+                bitmap = step.index.get_bitmap_for_query(step.predicate.op_func, step.predicate.value)
+                candidates = {pos for pos in candidates if pos in bitmap}
+            elif step.index is not None and step.estimate < len(candidates):
+                candidates &= step.index.get_positions_for_query(step.predicate.op_func, step.predicate.value)
+            else:
+                residual.append(step.predicate)
+        if residual and candidates:
+            candidates = self._filter_positions(candidates, residual, matcher)
+        return candidates
+
+    @is_created
+    @changes_table
     def insert(self, item: T, index: int, auto_update: bool = True) -> None:
         """
         Insert item into table
         :param item: row to insert
-        :param index: position to insert item in
-        :param auto_update: auto rebuild indexes
+        :param index: position to insert item in(id of a tombstoned row for tables with stable ids)
+        :param auto_update: update indexes(positions of later rows are shifted: O(n) per index for positional tables)
         :return:
         """
-        self._rows.insert(index, item)
-        if auto_update:
-            self.rebuild_indexes()
+        self._rows.insert(item, index)
+        if self.stable_ids:
+            for idx in self._indexes.values():
+                idx.on_restore(item, index)
+        elif auto_update:
+            for idx in self._indexes.values():
+                idx.on_insert_at(item, index)
 
     @is_created
     def query(self, **filters) -> set[int]:
@@ -231,50 +546,219 @@ class Table(Generic[T]):
         :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. query(name__eq = 'Steve', age__gt = 18).
         :return set of indexes
         """
-        #hints = get_type_hints(self.dtype)
-        result: set[int] = set()
-        if not filters:
-            return set(range(len(self._rows)))
-        for filter_, value in filters.items():
+        predicates = parse_filters(filters)
+        steps = QueryPlanner.plan(predicates, self._indexes, len(self._rows))
+        return self._execute_plan(steps)
 
+    @is_created
+    def aggregate(self, group_by: str | Iterable[str] | None = None, aggs: dict | None = None, **filters) -> dict:
+        """
+        Aggregate matching rows without building them. Counts and aggregates of indexed field filtered or grouped by that
+        field are computed from its index(see ``index_aggregate``), values are read at matching positions otherwise
+        :param group_by: field or fields to group by
+        :param aggs: ``{name: (func, field)}``, func is one of ``count``, ``sum``, ``min``, ``max``, ``avg``; ``{name: 'count'}``
+        for count of rows; ``{'count': 'count'}`` if not set
+        :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. aggregate('author', {'pages': ('sum', 'pages')}, year__gt = 2000).
+        :return: ``{name: value}`` without grouping, ``{key: {name: value}}`` otherwise(key is tuple for several fields)
+        :raise ValueError: unknown aggregate function
+        :raise TypeError: unknown field
+        """
+        group_fields = [group_by] if isinstance(group_by, str) else list(group_by or ())
+        aggregates = parse_aggregates(aggs or {"count": "count"})
+        self._check_fields([*group_fields, *(agg.field for agg in aggregates if agg.field is not None)])
+        predicates = parse_filters(filters)
+        result = index_aggregate(self._indexes, len(self._rows), group_fields, aggregates, predicates)
+        if result is not None:
+            return result
+        steps = QueryPlanner.plan(predicates, self._indexes, len(self._rows))
+        return aggregate_positions(self._rows, sorted(self._execute_plan(steps)), group_fields, aggregates)
 
-            if "__" in filter_:
-                field, op = filter_.rsplit('__', 1)
-                if op not in cst.OPERATORS:
-                    field, op = filter_, "eq"
-            else:
-                field, op = filter_, "eq"
-
-            op_func = cst.OPERATORS[op]
-            idx = self._indexes.get(field, None)
-            if idx:
-                try:
-                    res = idx.get_positions_for_query(op_func, value)
-                except NotImplementedError:
-                   res = self._full_scan(field, op_func, value)
+    @is_created
+    def select_fields(self, fields: Iterable[str], columns: bool = False, **filters) -> list[tuple] | dict[str, list]:
+        """
+        Values of fields of matching rows without building rows. If composite(covering) index has all requested and filtered
+        fields and its leading field is filtered(or there are no filters), result is read from its keys: filters on leading
+        fields give range of keys, other filters are checked on keys. Otherwise values are read from collection at matching
+        positions(from columns of columnar tables)
+        :param fields: fields to select
+        :param columns: return ``{field: values}`` instead of tuples
+        :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. select_fields(('isbn', 'year'), year__gt = 2000).
+        :return: tuples of values of fields(ordered by position) or ``{field: values}``
+        :raise TypeError: unknown field
+        """
+        fields = tuple(fields)
+        self._check_fields(fields)
+        predicates = parse_filters(filters)
+        items = self._covered_items(fields, predicates)
+        if items is not None:
+            items.sort(key=itemgetter(0))
+            values = [value for _, value in items]
+            if columns:
+                return {field: [value[n] for value in values] for n, field in enumerate(fields)}
+            return values
+        steps = QueryPlanner.plan(predicates, self._indexes, len(self._rows))
+        positions = sorted(self._execute_plan(steps))
+        taken = {field: self._rows.take(positions, field) for field in dict.fromkeys(fields)}
+        if columns:
+            return {field: list(taken[field]) for field in fields}
+        return list(zip(*(taken[field] for field in fields))) if fields else [() for _ in positions]
+
+    def _check_fields(self, names: Iterable[str]) -> None:
+        """
+        :param names: field names
+        :raise TypeError: some of fields are not fields of ``dtype``
+        """
+        unknown = set(names) - {field.name for field in fields(self.dtype)}
+        if unknown:
+            raise TypeError(f"{self.dtype.__name__} has no fields {sorted(unknown)}")
+
+    def _covered_items(self, fields: tuple[str, ...], predicates: list[Predicate]) -> list[tuple[int, tuple]] | None:
+        """
+        :param fields: fields to select
+        :param predicates: predicates of query
+        :return: ``(position, values of fields)`` of matching rows read from keys of covering index or ``None`` if no index
+        covers fields and predicates
+        """
+        for key, idx in self._indexes.items():
+            if isinstance(key, str) or not set(fields).issubset(key) or any(p.field not in key for p in predicates):
+                continue
+            step = QueryPlanner.composite_step(predicates, {key: idx}, len(self._rows))
+            if step is None and predicates:
+                # leading field of index isn't filtered: all keys would be checked
+                continue
+            if step is None:
+                keys = idx.matching_keys()
+                residual = predicates
             else:
-                res = self._full_scan(field, op_func, value)
+                keys = idx.matching_keys(ops.between, step.predicate.value)
+                residual = [p for p in predicates if not any(p is covered for covered in step.predicate.predicates)]
+            checks = [(key.index(p.field), p.op_func, p.value) for p in residual]
+            offsets = [key.index(field) for field in fields]
+            items: list[tuple[int, tuple]] = []
+            for values in keys:
+                if all(op_func(values[n], value) for n, op_func, value in checks):
+                    projected = tuple(values[n] for n in offsets)
+                    items.extend((pos, projected) for pos in idx[values])
+            return items
+        return None
 
+    @is_created
+    def prepare(self, **template) -> PreparedQuery:
+        """
+        Compile query once to execute it many times with different values
+        :param template: filters, passed as: FIELD__OPERATOR = VALUE or ``Param``; e. g. prepare(name = Param('name'), age__gt = 18).
+        :return: ``PreparedQuery``
+        """
+        return PreparedQuery(self, **template)
 
-            if not res:
-                return res
-            if not result:
-                result = res
+    @is_created
+    def iter_query(self, order_by: str | None = None, limit: int | None = None, offset: int = 0, **filters) -> Iterator[int]:
+        """
+        Stream positions of matching rows. With ``order_by`` on a field with ordered(range) index rows are produced by walking
+        the index, otherwise top ``offset + limit`` rows are selected with bounded heap. Stops as soon as ``limit`` rows are produced
+        :param order_by: field to order by(``'-field'`` for descending order); positions order if not set
+        :param limit: max number of positions
+        :param offset: number of positions to skip
+        :param filters: kwarg, passed as: FIELD__OPERATOR = VALUE; e. g. iter_query(name__eq = 'Steve', age__gt = 18).
+        :return: iterator of positions
+        """
+        stop = None if limit is None else offset + limit
+        predicates = parse_filters(filters)
+        steps = QueryPlanner.plan(predicates, self._indexes, len(self._rows))
+        return islice(self._iter_plan(steps, order_by, stop), offset, stop)
+
+    def _iter_plan(self, steps: list[PlanStep], order_by: str | None, stop: int | None) -> Iterator[int]:
+        """
+        :param steps: plan steps(see ``QueryPlanner.plan``)
+        :param order_by: field to order by(``'-field'`` for descending order)
+        :param stop: number of positions needed(``None`` - all)
+        :return: iterator of positions
+        """
+        reverse = bool(order_by) and order_by.startswith('-')
+        field = order_by[1:] if reverse else order_by
+        total = len(self._rows)
+        expected = steps[0].estimate if steps and steps[0].index is not None else total
+        # walking rows in order visits about ``stop * total / expected`` rows, building candidates costs ``expected``
+        walk = not steps or (stop is not None and expected * expected >= stop * total)
+        positions = None
+        if walk and field is None:
+            positions = self._rows.ids()
+        elif walk and field in self._indexes:
+            try:
+                buckets = self._indexes[field].iter_ordered(reverse)
+            except NotImplementedError:
+                pass
             else:
-                result &= res
-        return result
+                positions = (pos for bucket in buckets for pos in sorted(bucket))
+
+        if positions is not None:
+            predicates = [step.predicate for step in steps]
+            rows = self._rows
+            for pos in positions:
+                if not predicates:
+                    yield pos
+                else:
+                    row = rows[pos]
+                    if all(predicate.matches(row) for predicate in predicates):
+                        yield pos
+            return
+
+        candidates = sorted(self._execute_plan(steps))
+        if field is None:
+            yield from candidates
+            return
+        rows = self._rows
+
+        def key(pos: int):
+            return rows.value(pos, field)
+
+        if stop is None:
+            yield from sorted(candidates, key=key, reverse=reverse)
+        elif reverse:
+            yield from heapq.nlargest(stop, candidates, key=key)
+        else:
+            yield from heapq.nsmallest(stop, candidates, key=key)
 
     @is_created
+    @changes_table
     def remove_by_index(self, index: int, auto_update: bool = True) -> None:
         """
         Remove item from table
-        :param index: position to remove item from
-        :param auto_update: auto rebuild indexes
+        :param index: position to remove item from(row id for tables with stable ids)
+        :param auto_update: update indexes(tables with stable ids always drop the row id from indexes, positional tables
+        shift positions of later rows: O(n) per index unless the last row is removed)
         :return:
         """
-        self._rows.pop(index)
-        if auto_update:
+        item = self._rows.pop(index)
+        if self.stable_ids or (auto_update and index == len(self._rows)):
+            # no positions after the last row: nothing to shift
+            for idx in self._indexes.values():
+                idx.on_pop(item, index)
+        elif auto_update:
+            for idx in self._indexes.values():
+                idx.on_remove_at(item, index)
+
+    @is_created
+    @changes_table
+    def truncate(self, slots: int) -> None:
+        """
+        Drop trailing slots of removed rows down to ``slots``(tables with stable ids), e.g. on rollback of inserts: rolled
+        back rows are not logged, so the next row must get the same id on write-ahead log replay
+        :param slots: min number of slots to keep
+        """
+        self._rows.truncate(slots)
+
+    @is_created
+    @changes_table
+    def compact(self) -> dict[int, int]:
+        """
+        Reclaims slots of deleted rows(tables with stable ids). Row ids of live rows change
+        :return: mapping ``{old_id: new_id}`` of every live row(empty if nothing was reclaimed)
+        """
+        mapping = self._rows.compact()
+        if mapping:
             self.rebuild_indexes()
+        return mapping
 
 
     def __len__(self) -> int:
@@ -0,0 +1,17 @@
+import gc
+from contextlib import contextmanager
+
+
+@contextmanager
+def paused_gc():
+    """
+    Disable cyclic garbage collector while bulk-building containers(e.g. millions of index sets): these objects
+    don't form cycles, but their allocation triggers repeated full collections
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
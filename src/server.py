@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+
+import src.constants as cst
+from src.database.async_session import AsyncDatabaseSession
+from src.database.server import DatabaseServer
+from src.database.session import DatabaseSession
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """
+    Запускает сервер базы данных и обслуживает клиентов до остановки процесса
+    :param args: аргументы командной строки
+    """
+    if args.snapshot:
+        session = DatabaseSession.load(args.snapshot, concurrent=True)
+    else:
+        session = DatabaseSession(concurrent=True)
+    if args.wal:
+        session.open_wal(args.wal)
+    db = AsyncDatabaseSession(session, batch_size=args.batch_size)
+    try:
+        async with DatabaseServer(db, args.host, args.port, args.unix) as server:
+            print(f"Listening on {server.address}", flush=True)
+            await server.serve_forever()
+    finally:
+        await db.close()
+
+
+def main() -> None:
+    """
+    Точка входа сервера: одна сессия базы данных для всех процессов-клиентов(см. ``DatabaseClient``)
+    :return: Данная функция ничего не возвращает
+    """
+    parser = argparse.ArgumentParser(description="Сервер базы данных")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7890, help="0 - любой свободный порт")
+    parser.add_argument("--unix", help="путь Unix-сокета(вместо TCP)")
+    parser.add_argument("--snapshot", help="загрузить базу из снимка")
+    parser.add_argument("--wal", help="журнал упреждающей записи")
+    parser.add_argument("--batch-size", type=int, default=1000, help="макс. число строк в пакете вставки")
+    args = parser.parse_args()
+    logging.basicConfig(format=cst.LOG_FORMAT, level=logging.INFO)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
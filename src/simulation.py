@@ -95,7 +95,7 @@ class LibrarySimulation:
         self.history.append(event_log)
 
     def _get_random_book(self) -> Book | None:
-        books = list(self.session.select_rows("library"))
+        books = self.session.select_rows("library")
         if not books:
             self.logger.error("No books found")
             return None
@@ -237,7 +237,7 @@ class LibrarySimulation:
                 case cst.EventType.UPDATE_BOOK:
                     self._process_update_book()
 
-        results = self.session.select_rows("library")
+        results = self.session.select_rows("library").materialize()
         self.drop_database()
         return SimulationResults(
             result=results,
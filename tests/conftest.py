@@ -4,19 +4,40 @@ from src.book import Book
 from src.database.session import DatabaseSession
 from src.orm.table import DictConstraints
 
+
+def book(n: int, titles: int | None = None, years: int | None = None, pages: int | None = None) -> Book:
+    """
+    Book number ``n``(``n`` is isbn). ``titles``, ``years`` and ``pages`` bound numbers of distinct values of fields
+    """
+    return Book(
+        f"Title {n if titles is None else n % titles}",
+        f"Author {n % 3}",
+        2000 + (n if years is None else n % years),
+        f"Genre {n % 2}",
+        n,
+        100 + (n if pages is None else n % pages),
+    )
+
+
 @pytest.fixture
 def session():
     session = DatabaseSession()
     yield session
     session.drop_dtype("BOOK")
 
-@pytest.fixture
-def db_library(session):
+@pytest.fixture(
+    params=[(False, False), (True, False), (False, True), (True, True)],
+    ids=["positional", "stable_ids", "columnar", "columnar_stable_ids"],
+)
+def db_library(session, request):
+    stable_ids, columnar = request.param
     session.create_dtype("BOOK", Book)
     session.create_table(
         "library",
         "BOOK",
-        constraints = DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])})
+        constraints = DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}),
+        stable_ids = stable_ids,
+        columnar = columnar,
     )
     session.create_idx("library", "base", "genre")
     session.create_idx("library", "base", "author")
@@ -34,4 +55,25 @@ def db_library_initial_data(db_library):
     for book in initial_data:
         db_library.insert("library", book)
 
-    yield db_library
\ No newline at end of file
+    yield db_library
+
+
+@pytest.fixture
+def library_data() -> dict:
+    """
+    Data of ``db_library_many``, override in test module to vary it: ``rows`` books with isbns ``1000 + n``, years
+    ``first_year + (n * 7) % years`` and pages ``100 + (n * 11) % 40``; books with isbns ``deleted`` are deleted then
+    """
+    return {"rows": 40, "first_year": 2000, "years": 20, "deleted": []}
+
+
+@pytest.fixture
+def db_library_many(db_library, library_data):
+    rows, first_year, years = library_data["rows"], library_data["first_year"], library_data["years"]
+    db_library.insert_many("library", [
+        Book(f"Title {n}", f"Author {n % 3}", first_year + (n * 7) % years, f"Genre {n % 2}", 1000 + n, 100 + (n * 11) % 40)
+        for n in range(rows)
+    ])
+    if library_data["deleted"]:
+        db_library.delete("library", isbn__in=library_data["deleted"])
+    yield db_library
@@ -0,0 +1,157 @@
+import pytest
+
+import src.orm.aggregate as aggregate_module
+from src.book import Book
+from src.orm.aggregate import Aggregate, parse_aggregates
+from src.orm.table import DictConstraints
+
+AGGS = {
+    "books": "count",
+    "pages": ("sum", "pages"),
+    "min_year": ("min", "year"),
+    "max_year": ("max", "year"),
+    "avg_pages": ("avg", "pages"),
+}
+
+
+@pytest.fixture
+def library_data():
+    return {"rows": 40, "first_year": 1990, "years": 25, "deleted": [1003, 1017]}
+
+
+def _expected(session, group_by, aggs, **filters):
+    rows = list(session.select_rows("library", **filters))
+    aggregates = parse_aggregates(aggs)
+
+    def reduce(group):
+        result = {}
+        for agg in aggregates:
+            values = [1] * len(group) if agg.field is None else [getattr(row, agg.field) for row in group]
+            result[agg.name] = {
+                "count": len, "sum": sum, "min": min, "max": max, "avg": lambda items: sum(items) / len(items),
+            }[agg.func](values) if values or agg.func == "count" else None
+        return result
+
+    if not group_by:
+        return reduce(rows)
+    fields = [group_by] if isinstance(group_by, str) else group_by
+    groups = {}
+    for row in rows:
+        key = tuple(getattr(row, field) for field in fields)
+        groups.setdefault(key if len(fields) > 1 else key[0], []).append(row)
+    return {key: reduce(group) for key, group in groups.items()}
+
+
+@pytest.mark.parametrize("group_by", [None, "author", "year", "pages", ["author", "genre"]])
+@pytest.mark.parametrize("filters", [{}, {"genre": "Genre 1"}, {"year__ge": 2000, "year__lt": 2010}, {"author": "Author 2", "pages__gt": 120},
+                                     {"author__in": ["Author 0", "Author 2"]}, {"isbn": 1}])
+def test_aggregate_matches_rows(db_library_many, group_by, filters):
+    result = db_library_many.aggregate("library", group_by, AGGS, **filters)
+    expected = _expected(db_library_many, group_by, AGGS, **filters)
+    if not group_by:
+        assert result == pytest.approx(expected)
+        return
+    assert result.keys() == expected.keys()
+    for key, values in expected.items():
+        assert result[key] == pytest.approx(values)
+
+
+def test_aggregate_defaults_to_count(db_library_initial_data):
+    assert db_library_initial_data.aggregate("library") == {"count": 3}
+    assert db_library_initial_data.aggregate("library", "author") == {"Author 1": {"count": 1}, "Author 2": {"count": 2}}
+    assert db_library_initial_data.aggregate("library", aggs={"n": ("count", "*")}, year__gt=2020) == {"n": 0}
+
+
+def test_aggregate_of_no_rows(db_library_initial_data):
+    assert db_library_initial_data.aggregate("library", aggs=AGGS, pages__gt=1000) == {
+        "books": 0, "pages": None, "min_year": None, "max_year": None, "avg_pages": None,
+    }
+    assert db_library_initial_data.aggregate("library", "genre", AGGS, pages__gt=1000) == {}
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, {"books": 38, "min_year": 1990, "max_year": 2014}),
+    ({"year__gt": 2000, "year__le": 2005}, {"books": 7, "min_year": 2001, "max_year": 2005}),
+    ({"year__in": [1990, 2014, 3000]}, {"books": 4, "min_year": 1990, "max_year": 2014}),
+    ({"year": 3000}, {"books": 0, "min_year": None, "max_year": None}),
+])
+def test_aggregate_is_answered_from_range_index(db_library_many, monkeypatch, filters, expected):
+    years = [row.year for row in db_library_many.select_rows("library", **filters)]
+    table = db_library_many._tables["library"]
+    monkeypatch.setattr(table, "_execute_plan", lambda *args: pytest.fail("rows are not expected to be read"))
+    aggs = {"books": "count", "min_year": ("min", "year"), "max_year": ("max", "year")}
+    assert db_library_many.aggregate("library", aggs=aggs, **filters) == expected
+    total = db_library_many.aggregate("library", aggs={"years": ("sum", "year"), "avg": ("avg", "year")}, **filters)
+    assert total == {"years": sum(years) if years else None, "avg": pytest.approx(sum(years) / len(years)) if years else None}
+
+
+def test_grouped_count_is_answered_from_index(db_library_many, monkeypatch):
+    expected = _expected(db_library_many, "genre", {"count": "count"})
+    table = db_library_many._tables["library"]
+    monkeypatch.setattr(table, "_execute_plan", lambda *args: pytest.fail("rows are not expected to be read"))
+    assert db_library_many.aggregate("library", "genre") == expected
+    assert db_library_many.aggregate("library", "genre", genre="Genre 1") == {"Genre 1": expected["Genre 1"]}
+    by_year = db_library_many.aggregate("library", "year", {"n": "count", "years": ("sum", "year")}, year__ge=2010)
+    assert list(by_year) == list(range(2010, 2015))
+    assert all(group["years"] == year * group["n"] for year, group in by_year.items())
+
+
+def test_bitmap_index_pushdown(db_library_many, monkeypatch):
+    db_library_many.drop_idx("library", "genre")
+    db_library_many.create_idx("library", "bitmap", "genre")
+    expected = _expected(db_library_many, None, {"count": "count"}, genre__ne="Genre 0")
+    table = db_library_many._tables["library"]
+    monkeypatch.setattr(table, "_execute_plan", lambda *args: pytest.fail("rows are not expected to be read"))
+    assert db_library_many.aggregate("library", genre__ne="Genre 0") == expected
+
+
+def test_aggregate_without_numpy(db_library_many, monkeypatch):
+    expected = db_library_many.aggregate("library", ["author", "genre"], AGGS, pages__ge=110)
+    monkeypatch.setattr(aggregate_module, "np", None)
+    result = db_library_many.aggregate("library", ["author", "genre"], AGGS, pages__ge=110)
+    assert result.keys() == expected.keys()
+    for key, values in expected.items():
+        assert result[key] == pytest.approx(values)
+
+
+def test_aggregate_skips_none(session):
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({}))
+    session.insert_many("library", [
+        Book("A", "Author", 2000, "Genre", 1, None), Book("B", "Author", 2001, "Genre", 2, 10), Book("C", None, 2002, "Genre", 3, 30),
+    ])
+    assert session.aggregate("library", aggs={"n": "count", "pages": ("count", "pages"), "avg": ("avg", "pages")}) == {
+        "n": 3, "pages": 2, "avg": 20,
+    }
+    assert session.aggregate("library", "author", {"max": ("max", "pages")}) == {"Author": {"max": 10}, None: {"max": 30}}
+    session.create_idx("library", "base", "author")
+    assert session.aggregate("library", "author", {"n": "count", "authors": ("count", "author")}) == {
+        "Author": {"n": 2, "authors": 2}, None: {"n": 1, "authors": 0},
+    }
+
+
+def test_snapshot_aggregate(db_library_initial_data):
+    session = db_library_initial_data
+    with session.snapshot() as snapshot:
+        session.insert("library", Book("Title 4", "Author 1", 2020, "Genre 1", 1, 10))
+        assert snapshot.aggregate("library", "author", {"pages": ("sum", "pages")}, year__ge=2010) == {"Author 2": {"pages": 275}}
+    assert session.aggregate("library", "author", {"pages": ("sum", "pages")}, year__ge=2010) == {
+        "Author 2": {"pages": 275}, "Author 1": {"pages": 10},
+    }
+
+
+def test_parse_aggregates():
+    assert parse_aggregates({"n": "count", "m": ("count", "*"), "s": ("sum", "pages")}) == [
+        Aggregate("n", "count"), Aggregate("m", "count"), Aggregate("s", "sum", "pages"),
+    ]
+    with pytest.raises(ValueError):
+        parse_aggregates({"x": ("median", "pages")})
+    with pytest.raises(ValueError):
+        parse_aggregates({"x": "sum"})
+
+
+def test_aggregate_unknown_field(db_library_initial_data):
+    with pytest.raises(TypeError):
+        db_library_initial_data.aggregate("library", "unknown")
+    with pytest.raises(TypeError):
+        db_library_initial_data.aggregate("library", aggs={"x": ("sum", "unknown")})
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.async_session import AsyncDatabaseSession
+from src.database.session import DatabaseSession
+from src.orm.exceptions import ConstraintFailed
+from src.orm.table import DictConstraints
+from tests.conftest import book
+
+
+@pytest.fixture(params=[False, True], ids=["rows", "columnar"])
+def db(request):
+    db = AsyncDatabaseSession()
+    db.session.create_dtype("BOOK", Book)
+    db.session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), columnar=request.param)
+    db.session.create_idx("library", "range", "year")
+    return db
+
+
+def test_operations(db):
+    async def scenario():
+        await db.insert("library", book(1))
+        await db.insert_many("library", [book(n) for n in range(2, 10)])
+        await db.update("library", {"pages": 1}, author="Author 1")
+        await db.delete("library", year__ge=2008)
+        assert await db.select("library", pages=1) == {0, 3, 6}
+        assert [row.isbn for row in await db.select_rows("library", genre="Genre 0")] == [2, 4, 6]
+        assert [row.isbn async for row in db.iter_rows("library", order_by="-year", limit=3, chunk_size=2)] == [7, 6, 5]
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_inserts_are_coalesced(db, monkeypatch):
+    batches = []
+    insert_many = db.session.insert_many
+    monkeypatch.setattr(db.session, "insert_many", lambda table_name, rows: batches.append(len(rows)) or insert_many(table_name, rows))
+
+    async def scenario():
+        await asyncio.gather(*(db.insert("library", book(n)) for n in range(100)))
+        db.batch_size = 30
+        await asyncio.gather(*(db.insert("library", book(n)) for n in range(100, 200)))
+
+    asyncio.run(scenario())
+    assert batches == [100, 30, 30, 30, 10]
+    assert list(db.session.select_rows("library")) == [book(n) for n in range(200)]
+
+
+def test_failed_insert_does_not_fail_batch(db):
+    async def scenario():
+        return await asyncio.gather(*(db.insert("library", book(n % 5)) for n in range(7)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results[:5] == [None] * 5
+    assert all(isinstance(error, ConstraintFailed) for error in results[5:])
+    assert list(db.session.select_rows("library")) == [book(n) for n in range(5)]
+
+
+def test_transaction(db):
+    async def scenario():
+        async with db.transaction():
+            await db.insert("library", book(1))
+            await db.insert("library", book(2))
+        with pytest.raises(ConstraintFailed):
+            async with db.transaction():
+                await db.delete("library", isbn=1)
+                await db.insert("library", book(3))
+                await db.insert("library", book(2))
+        with pytest.raises(RuntimeError):
+            async with db.transaction():
+                async with db.transaction():
+                    pass
+        return [row.isbn for row in await db.select_rows("library")]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_queries_do_not_block_event_loop(db):
+    threads = set()
+    query = db.session._tables["library"].query
+
+    def slow_query(**filters):
+        threads.add(threading.current_thread())
+        return query(**filters)
+
+    db.session._tables["library"].query = slow_query
+
+    async def scenario():
+        await db.insert_many("library", [book(n) for n in range(10)])
+        assert await db.select("library", year__lt=2003) == {0, 1, 2}
+
+    asyncio.run(scenario())
+    assert threads and threading.main_thread() not in threads
+
+
+def test_session_must_be_concurrent():
+    with pytest.raises(ValueError):
+        AsyncDatabaseSession(DatabaseSession())
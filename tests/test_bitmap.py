@@ -0,0 +1,37 @@
+from src.orm.index.bitmap import Bitmap
+
+
+def test_bitmap_operations():
+    a = Bitmap.from_positions([1, 5, 5000, 9000])
+    b = Bitmap.from_positions([5, 9000, 12000])
+    assert list(a & b) == [5, 9000]
+    assert list(a | b) == [1, 5, 5000, 9000, 12000]
+    assert list(a - b) == [1, 5000]
+    assert len(a) == 4
+    assert 5000 in a and 5001 not in a
+    a.discard(5000)
+    a.add(3)
+    assert a == {1, 3, 5, 9000}
+    assert not (a - a)
+
+
+def test_bitmap_index_query(db_library_initial_data):
+    db_library_initial_data.drop_idx("library", "genre")
+    db_library_initial_data.drop_idx("library", "author")
+    db_library_initial_data.create_idx("library", "bitmap", "genre")
+    db_library_initial_data.create_idx("library", "bitmap", "author")
+    table = db_library_initial_data._tables["library"]
+
+    def isbns(**filters):
+        return {table[pos].isbn for pos in db_library_initial_data.select("library", **filters)}
+
+    assert isbns(genre="Genre 1", author="Author 2") == {1234567890124, 1234567890125}
+    assert isbns(genre="Genre 1", author__in=["Author 1"]) == set()
+    assert isbns(genre__ne="Genre 1", author__in=["Author 1", "Author 2"]) == {1234567890123}
+    assert isbns(genre__ne="Genre 1", year__gt=2010) == set()
+    assert isbns(author="Author 2", year__ge=2015) == {1234567890124}
+
+    db_library_initial_data.delete("library", isbn=1234567890124)
+    db_library_initial_data.update("library", {"genre": "Genre 1"}, isbn=1234567890123)
+    assert isbns(genre="Genre 1") == {1234567890123, 1234567890125}
+    assert isbns(genre__ne="Genre 1") == set()
@@ -0,0 +1,74 @@
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.cache import LRUCache
+from src.database.session import DatabaseSession
+from src.orm.table import DictConstraints
+
+
+@pytest.fixture
+def cached_library():
+    session = DatabaseSession(cache_size=2)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}))
+    session.create_idx("library", "base", "genre")
+    session.insert("library", Book("Title 1", "Author 1", 2000, "Genre 1", 1, 100))
+    session.insert("library", Book("Title 2", "Author 2", 2010, "Genre 2", 2, 200))
+    yield session
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 1, 1, 2)
+
+
+def test_repeated_query_hits_cache(cached_library):
+    assert cached_library.select("library", genre="Genre 1") == {0}
+    result = cached_library.select("library", genre="Genre 1")
+    assert result == {0}
+    result.add(5)
+    assert cached_library.select("library", genre="Genre 1") == {0}
+    stats = cached_library.cache_stats()
+    assert (stats.hits, stats.misses) == (2, 1)
+
+
+def test_filters_are_normalized(cached_library):
+    cached_library.select("library", genre__in=["Genre 1"], pages__gt=50)
+    cached_library.select("library", pages__gt=50, genre__in=("Genre 1",))
+    assert cached_library.cache_stats().hits == 1
+
+
+@pytest.mark.parametrize("change", [
+    lambda s: s.insert("library", Book("Title 3", "Author 3", 2020, "Genre 1", 3, 300)),
+    lambda s: s.update("library", {"genre": "Genre 1"}, isbn=2),
+    lambda s: s.delete("library", isbn=1),
+    lambda s: s.drop_idx("library", "genre"),
+])
+def test_changes_invalidate_cache(cached_library, change):
+    cached_library.select("library", genre="Genre 1")
+    change(cached_library)
+    table = cached_library._tables["library"]
+    assert cached_library.select("library", genre="Genre 1") == table.query(genre="Genre 1")
+    assert cached_library.cache_stats().hits == 0
+
+
+def test_rollback_invalidates_cache(cached_library):
+    with pytest.raises(RuntimeError):
+        with cached_library.transaction():
+            cached_library.update("library", {"genre": "Genre 1"}, isbn=2)
+            assert cached_library.select("library", genre="Genre 1") == {0, 1}
+            raise RuntimeError
+    assert cached_library.select("library", genre="Genre 1") == {0}
+
+
+def test_unhashable_filters_bypass_cache(cached_library):
+    assert cached_library.select("library", title__in=[bytearray(b"x")]) == set()
+    assert cached_library.cache_stats().misses == 0
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from src.book import Book
+from src.orm.collection import Collection
+from src.orm.columnar import ColumnarCollection
+from src.orm.planner import parse_filters
+
+
+def _books(n):
+    rnd = random.Random(52)
+    return [
+        Book(f"Title {rnd.randint(0, 5)}", f"Author {rnd.randint(0, 3)}", rnd.randint(1990, 2020), "Genre", 1000 + i, rnd.randint(25, 550))
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("stable_ids", [False, True])
+def test_scan_matches_row_storage(stable_ids):
+    rows = Collection(Book, stable_ids=stable_ids)
+    columns = ColumnarCollection(Book, stable_ids=stable_ids)
+    for book in _books(300):
+        rows.append(book)
+        columns.append(book)
+    for index in (5, 17, 200):
+        assert rows.pop(index) == columns.pop(index)
+    assert list(rows) == list(columns)
+    queries = [
+        {"pages__gt": 300},
+        {"year__ge": 2000, "year__lt": 2011},
+        {"author": "Author 1", "pages__le": 100},
+        {"title__in": ["Title 1", "Title 4"], "year__gt": 2005},
+        {"author__gt": "Author 1"},
+        {"author": "Missing"},
+        {"year__in": [2000, "a"]},
+        {"pages__in": [100.0, None, 300]},
+    ]
+    for query in queries:
+        predicates = parse_filters(query)
+        assert rows.scan(predicates) == columns.scan(predicates)
+        candidates = set(range(0, 250, 3)) & set(rows.ids())
+        assert rows.filter(candidates, predicates) == columns.filter(candidates, predicates)
+
+
+def test_compact_and_restore():
+    columns = ColumnarCollection(Book, stable_ids=True)
+    books = _books(5)
+    for book in books:
+        columns.append(book)
+    removed = columns.pop(1)
+    columns.pop(3)
+    columns.restore(1, removed)
+    assert columns.compact() == {0: 0, 1: 1, 2: 2, 4: 3}
+    assert list(columns) == [books[0], books[1], books[2], books[4]]
+
+
+def test_copy_keeps_dictionary_encoding():
+    columns = ColumnarCollection(Book)
+    for book in _books(20):
+        columns.append(book)
+    column = columns._columns["author"]
+    clone = column.copy()
+    assert type(clone) is type(column)
+    clone.append("Author 9")
+    assert list(clone.values())[:-1] == list(column.values()) and len(column) == 20
+
+
+def test_wrong_value_type_keeps_columns_consistent():
+    columns = ColumnarCollection(Book)
+    columns.append(_books(1)[0])
+    with pytest.raises(TypeError):
+        columns.append(Book("Title", "Author", "not a year", "Genre", 1, 1))
+    assert len(columns) == 1
+    assert all(len(column) == 1 for column in columns._columns.values())
+
+
+def test_contains_and_index():
+    columns = ColumnarCollection(Book)
+    books = _books(10)
+    for book in books:
+        columns.append(book)
+    assert books[7] in columns
+    assert columns.index(books[7]) == 7
+    assert Book("x", "y", 1, "z", 2, 3) not in columns
@@ -0,0 +1,119 @@
+import pytest
+
+import src.orm.operators as ops
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.index.index_types import TOP, CompositeIndex
+from src.orm.planner import CompositePredicate, QueryPlanner, parse_filters
+
+FILTERS = [
+    {"author": "Author 1", "year__ge": 2005},
+    {"author": "Author 1", "year__gt": 2005, "year__le": 2015},
+    {"author": "Author 2", "year__lt": 2003},
+    {"author": "Author 0", "year": 2009},
+    {"author": "Author 0", "year": 2009, "genre": "Genre 0"},
+    {"author": "Author 0", "year": 2009, "genre": "Genre 1"},
+    {"author": "Author 2"},
+    {"author": "Nobody", "year__ge": 2000},
+    {"year__ge": 2010},
+    {"author": "Author 1", "pages__gt": 110, "year__le": 2010},
+]
+
+
+@pytest.fixture
+def library_data():
+    return {"rows": 60, "first_year": 2000, "years": 20, "deleted": [1004, 1031]}
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("fields", [("author", "year"), ("author", "year", "genre")])
+def test_composite_index_matches_scan(db_library_many, filters, fields):
+    expected = db_library_many.select("library", **filters)
+    db_library_many.create_idx("library", "composite", fields)
+    assert db_library_many.select("library", **filters) == expected
+    db_library_many.drop_idx("library", "author")
+    assert db_library_many.select("library", **filters) == expected
+    years = [row.year for row in db_library_many.iter_rows("library", order_by="year", limit=5, **filters)]
+    assert years == sorted(row.year for row in db_library_many.select_rows("library", **filters))[:5]
+
+
+def test_composite_lookup_is_single_step(db_library_many):
+    db_library_many.create_idx("library", "composite", ("author", "year"))
+    table = db_library_many._tables["library"]
+    steps = QueryPlanner.plan(parse_filters({"author": "Author 1", "year__ge": 2005, "pages__gt": 110}), table._indexes, len(table))
+    assert isinstance(steps[0].predicate, CompositePredicate) and steps[0].index is table._indexes[("author", "year")]
+    assert [step.predicate.field for step in steps[1:]] == ["pages"]
+    # equality on the first field alone is left to its own index
+    steps = QueryPlanner.plan(parse_filters({"author": "Author 1"}), table._indexes, len(table))
+    assert len(steps) == 1 and steps[0].index is table._indexes["author"]
+
+
+def test_composite_index_follows_changes(db_library_many):
+    db_library_many.create_idx("library", "composite", ("author", "year"))
+    session = db_library_many
+    filters = {"author": "Author 1", "year__ge": 2010}
+    session.update("library", {"year": 2019}, author="Author 2", year__lt=2005)
+    session.update("library", {"author": "Author 1"}, isbn=1002)
+    session.delete("library", author="Author 1", year=2014)
+    session.insert("library", Book("New", "Author 1", 2011, "Genre 0", 1, 1))
+    with session.transaction():
+        session.update("library", {"author": "Author 9"}, isbn=1)
+        session.delete("library", isbn=1007)
+    rows = list(session.select_rows("library", **filters))
+    table = session._tables["library"]
+    table.rebuild_indexes()
+    assert list(session.select_rows("library", **filters)) == rows
+    assert all(row.author == "Author 1" and row.year >= 2010 for row in rows)
+    assert {row.isbn for row in rows} == {
+        row.isbn for row in session.select_rows("library") if row.author == "Author 1" and row.year >= 2010
+    }
+
+
+def test_composite_index_rollback(db_library_many):
+    db_library_many.create_idx("library", "composite", ("author", "year"))
+    before = db_library_many.select("library", author="Author 0", year__le=2010)
+    with pytest.raises(RuntimeError):
+        with db_library_many.transaction():
+            db_library_many.update("library", {"year": 2000}, author="Author 0")
+            db_library_many.delete("library", author="Author 0", year=2000)
+            raise RuntimeError
+    assert db_library_many.select("library", author="Author 0", year__le=2010) == before
+
+
+def test_composite_index_in_snapshots(db_library_many, tmp_path):
+    db_library_many.create_idx("library", "composite", ("author", "year"))
+    filters = {"author": "Author 1", "year__ge": 2005}
+    expected = db_library_many.select("library", **filters)
+    with db_library_many.snapshot() as snapshot:
+        db_library_many.delete("library", author="Author 1")
+        assert snapshot.select("library", **filters) == expected
+    db_library_many.save(tmp_path / "db.snapshot")
+    loaded = DatabaseSession.load(tmp_path / "db.snapshot")
+    assert loaded._tables["library"].index_types[("author", "year")] == "composite"
+    assert loaded.select("library", **filters) == set()
+
+
+def test_lookup_bounds():
+    index = CompositeIndex(("author", "year", "genre"))
+    index.bulk_load({("A", 2000, "x"): [0], ("A", 2005, "x"): [1], ("A", 2005, "y"): [2], ("A", 2010, "x"): [3], ("B", 2005, "x"): [4]})
+
+    def lookup(prefix, **bounds):
+        return index.get_positions_for_query(ops.between, index.lookup_bounds(prefix, ops.Bounds(**bounds) if bounds else None))
+
+    assert lookup(("A",)) == {0, 1, 2, 3}
+    assert lookup(("A",), low=2005) == {1, 2, 3}
+    assert lookup(("A",), low=2005, low_inclusive=False) == {3}
+    assert lookup(("A",), high=2005) == {0, 1, 2}
+    assert lookup(("A",), high=2005, high_inclusive=False) == {0}
+    assert lookup(("A", 2005)) == {1, 2}
+    assert lookup(("C",)) == set()
+    assert TOP > ("A", 2005) and not TOP < 0 and TOP == TOP and TOP != 0
+
+
+def test_composite_index_requires_several_fields(db_library):
+    with pytest.raises(ValueError):
+        db_library.create_idx("library", "composite", "title")
+    with pytest.raises(ValueError):
+        db_library.create_idx("library", "composite", ("title",))
+    with pytest.raises(ValueError):
+        db_library.create_idx("library", "range", ("title", "year"))
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.locks import RWLock
+from src.orm.table import DictConstraints
+from tests.conftest import book
+
+
+def library(columnar: bool = False, **kwargs) -> DatabaseSession:
+    session = DatabaseSession(concurrent=True, **kwargs)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), columnar=columnar)
+    session.create_idx("library", "range", "year")
+    session.create_idx("library", "bitmap", "genre")
+    return session
+
+
+def run(*targets) -> None:
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_rw_lock():
+    lock = RWLock()
+    readers_inside = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            readers_inside.wait()
+
+    run(reader, reader)
+
+    with lock.write():
+        with lock.write(), lock.read():
+            pass
+        run(lambda: pytest.raises(TimeoutError, lock.acquire_read, 0.01))
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+        run(lambda: pytest.raises(TimeoutError, lock.acquire_write, 0.01))
+    with pytest.raises(RuntimeError):
+        lock.release_read()
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_concurrent_reads_and_writes(columnar):
+    session = library(columnar, cache_size=16)
+    session.insert_many("library", [book(n, years=20) for n in range(200)])
+
+    def writer(start: int):
+        def write():
+            for n in range(start, start + 100):
+                session.insert("library", book(n, years=20))
+                session.update("library", {"pages": 1}, isbn=n)
+                if n % 10 == 0:
+                    session.delete("library", isbn=n)
+        return write
+
+    def reader():
+        for n in range(300):
+            rows = session.select_rows("library", genre="Genre 1", year__ge=2010)
+            assert all(row.genre == "Genre 1" and row.year >= 2010 for row in rows)
+            assert all(row.year >= 2015 for row in session.iter_rows("library", order_by="year", limit=5, year__ge=2015))
+
+    run(writer(1000), writer(2000), reader, reader)
+    table = session._tables["library"]
+    assert len(table) == 200 + 2 * 90
+    assert session.select("library", pages=1) == set(table.query(pages__eq=1))
+    expected = {pos for pos, row in table.collection.items() if row.genre == "Genre 1" and row.year >= 2010}
+    assert session.select("library", genre="Genre 1", year__ge=2010) == expected
+
+
+def test_transaction_holds_write_lock():
+    session = library(lock_timeout=0.05)
+    started, committed = threading.Event(), threading.Event()
+
+    def transaction():
+        with session.transaction():
+            session.insert("library", book(1, years=20))
+            started.set()
+            committed.wait(5)
+
+    def reader():
+        started.wait(5)
+        assert session._transaction is None  # transactions are per thread
+        with pytest.raises(TimeoutError):
+            session.select("library", isbn=1)
+        committed.set()
+
+    run(transaction, reader)
+    assert session.select("library", isbn=1) == {0}
+    with session._tables["library"].lock.write(timeout=0):
+        pass
@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture
+def library_data():
+    return {"rows": 30, "first_year": 1990, "years": 25, "deleted": []}
+
+
+def _expected(session, order_by=None, reverse=False, **filters):
+    rows = list(session.select_rows("library", **filters))
+    if order_by:
+        rows.sort(key=lambda row: getattr(row, order_by), reverse=reverse)
+    return rows
+
+
+@pytest.mark.parametrize("order_by", ["year", "-year", "pages", "-pages", None])
+@pytest.mark.parametrize("filters", [{}, {"genre": "Genre 1"}, {"pages__gt": 120}, {"author": "Author 2", "year__lt": 2005}])
+def test_iter_rows_matches_sorted_select(db_library_many, order_by, filters):
+    field = order_by.lstrip("-") if order_by else None
+    expected = _expected(db_library_many, field, bool(order_by) and order_by.startswith("-"), **filters)
+    assert list(db_library_many.iter_rows("library", order_by=order_by, **filters)) == expected
+    page = list(db_library_many.iter_rows("library", order_by=order_by, limit=4, offset=3, **filters))
+    assert page == expected[3:7]
+
+
+def test_iter_rows_walks_index_without_building_candidates(db_library_many, monkeypatch):
+    table = db_library_many._tables["library"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("candidates are not expected")
+
+    monkeypatch.setattr(table, "_execute_plan", fail)
+    rows = list(db_library_many.iter_rows("library", order_by="-year", limit=3, pages__ge=100))
+    assert [row.year for row in rows] == [2014, 2013, 2012]
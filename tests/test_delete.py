@@ -1,3 +1,6 @@
+from src.book import Book
+
+
 def test_delete_single_record(db_library_initial_data):
     initial_count = len(db_library_initial_data.select_rows("library"))
     assert initial_count == 3
@@ -31,4 +34,32 @@ def test_update_non_existing_record(db_library_initial_data):
     initial_count = len(db_library_initial_data.select_rows("library"))
     db_library_initial_data.update("library", {"title": "No Change"}, isbn=9999999999999)
     final_count = len(db_library_initial_data.select_rows("library"))
-    assert final_count == initial_count
\ No newline at end of file
+    assert final_count == initial_count
+
+def test_rollback_delete(db_library_initial_data):
+    try:
+        with db_library_initial_data.transaction():
+            db_library_initial_data.delete("library", genre="Genre 1")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert len(db_library_initial_data.select_rows("library")) == 3
+    assert len(db_library_initial_data.select("library", genre="Genre 1")) == 2
+    assert len(db_library_initial_data.select("library", year__ge=2010)) == 2
+
+def test_delete_and_rollback_keep_positions(db_library):
+    books = [Book(f"Title {n}", f"Author {n % 3}", 2000 + n, f"Genre {n % 2}", n, 100) for n in range(10)]
+    db_library.insert_many("library", books)
+    db_library.create_idx("library", "bitmap", "title")
+    before = list(db_library._tables["library"].collection.items())
+    db_library.begin()
+    db_library.delete("library", author="Author 1")
+    remaining = [book for book in books if book.author != "Author 1"]
+    assert list(db_library.select_rows("library")) == remaining
+    assert list(db_library.select_rows("library", genre="Genre 0")) == [book for book in remaining if book.genre == "Genre 0"]
+    assert list(db_library.select_rows("library", year__gt=2005)) == [book for book in remaining if book.year > 2005]
+    assert list(db_library.select_rows("library", title="Title 9")) == [books[9]]
+    db_library.rollback()
+    assert list(db_library._tables["library"].collection.items()) == before
+    assert list(db_library.select_rows("library", author="Author 1")) == books[1::3]
+    assert list(db_library.select_rows("library", title="Title 4")) == [books[4]]
@@ -0,0 +1,50 @@
+import pytest
+
+from src.book import Book
+from src.orm.collection import Collection
+from src.orm.table import Table, DictConstraints
+
+
+def _snapshot(idx):
+    return {key: set(idx[key]) for key in idx}
+
+
+@pytest.fixture(params=["base", "range", "bitmap"])
+def table(request):
+    table = Table(Collection(Book), DictConstraints({}))
+    table.create()
+    table.create_index(request.param, "genre")
+    table.create_index("range", "year")
+    for n in range(6):
+        table.append(Book(f"Title {n}", "Author", 2000 + n % 3, f"Genre {n % 2}", 1000 + n, 100))
+    yield table
+
+
+def _assert_consistent(table):
+    for field, idx in table._indexes.items():
+        fresh = type(idx)(field)
+        fresh.rebuild(table._rows)
+        assert _snapshot(idx) == _snapshot(fresh)
+
+
+def test_insert_at_shifts_positions(table):
+    table.insert(Book("New", "Author", 1999, "Genre 3", 1, 100), 2)
+    assert table.query(genre="Genre 3") == {2}
+    assert table.query(year__lt=2000) == {2}
+    _assert_consistent(table)
+
+
+def test_remove_at_shifts_positions(table):
+    table.remove_by_index(1)
+    assert table.query(genre="Genre 1") == {2, 4}
+    _assert_consistent(table)
+    table.remove(table[0])
+    _assert_consistent(table)
+
+
+def test_restore_at(table):
+    old_row = table[3]
+    table.update_at(3, {"genre": "Genre 9", "year": 1900})
+    table.restore_at(3, old_row)
+    assert table.query(genre="Genre 9") == set()
+    _assert_consistent(table)
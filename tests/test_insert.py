@@ -28,3 +28,36 @@ def test_rollback_insert(db_library_initial_data):
     except ConstraintFailed:
         data = db_library_initial_data.select_rows("library")
         assert book1 not in data
+
+def test_insert_many(db_library_initial_data):
+    books = [Book(f"Title {n}", "Author 3", 1990 + n, f"Genre {n % 2}", 1234567890200 + n, 100) for n in range(5)]
+    db_library_initial_data.insert_many("library", books)
+    assert len(db_library_initial_data.select_rows("library")) == 8
+    assert list(db_library_initial_data.select_rows("library", author="Author 3")) == books
+    assert len(db_library_initial_data.select("library", genre="Genre 1")) == 4
+    assert len(db_library_initial_data.select("library", year__lt=1993)) == 3
+
+def test_insert_many_duplicates(db_library_initial_data):
+    existing = db_library_initial_data.select_rows("library")[0]
+    new = Book("Title 9", "Author 9", 1999, "Genre 9", 1234567890999, 10)
+    for batch in ([new, existing], [new, new]):
+        with pytest.raises(ConstraintFailed):
+            db_library_initial_data.insert_many("library", batch)
+        assert len(db_library_initial_data.select_rows("library")) == 3
+        assert not db_library_initial_data.select("library", author="Author 9")
+
+def test_insert_many_wrong_type(db_library):
+    with pytest.raises(TypeError):
+        db_library.insert_many("library", [Book("Title", "Author", 2000, "Genre", 1, 1), object()])
+    assert len(db_library.select_rows("library")) == 0
+
+def test_rollback_insert_many(db_library_initial_data):
+    books = [Book(f"Title {n}", "Author 3", 1990 + n, "Genre 1", 1234567890200 + n, 100) for n in range(3)]
+    db_library_initial_data.begin()
+    db_library_initial_data.insert_many("library", books)
+    db_library_initial_data.rollback()
+    assert len(db_library_initial_data.select_rows("library")) == 3
+    assert not db_library_initial_data.select("library", author="Author 3")
+    assert len(db_library_initial_data.select("library", genre="Genre 1")) == 2
+    db_library_initial_data.insert_many("library", books)
+    assert len(db_library_initial_data.select("library", author="Author 3")) == 3
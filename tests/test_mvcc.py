@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.table import DictConstraints
+from tests.conftest import book
+from tests.test_concurrency import run
+
+
+def state(source) -> tuple:
+    return (
+        list(source.select_rows("library")),
+        source.select("library", author="Author 2"),
+        source.select("library", year__ge=2005),
+        list(source.iter_rows("library", order_by="-year", limit=2)),
+    )
+
+
+def assert_no_versions(session: DatabaseSession) -> None:
+    store = session._versions
+    assert not store._readers
+    assert all(not history.committed and not history.versions for history in store._histories.values())
+
+
+def test_snapshot_isolation(db_library_initial_data):
+    session = db_library_initial_data
+    initial = state(session)
+    with session.snapshot() as snap:
+        assert state(snap) == initial
+        session.insert("library", book(1))
+        session.insert_many("library", [book(2), book(3)])
+        with session.transaction():
+            session.update("library", {"author": "Author 3"}, year__ge=2010)
+            session.delete("library", genre="Genre 0")
+        assert state(snap) == initial
+        with session.snapshot() as later:
+            changed = state(session)
+            session.delete("library", year__lt=2010)
+            assert state(later) == changed
+            assert state(snap) == initial
+    assert_no_versions(session)
+
+
+def test_uncommitted_changes_are_not_visible(db_library_initial_data):
+    session = db_library_initial_data
+    initial = state(session)
+    session.begin()
+    session.insert("library", book(1))
+    session.update("library", {"pages": 1}, author="Author 2")
+    with session.snapshot() as snap:
+        assert state(snap) == initial
+        session.delete("library", author="Author 1")
+        session.rollback()
+        assert state(snap) == initial
+        session.begin()
+        session.insert("library", book(2))
+        session.commit()
+        assert state(snap) == initial
+    with session.snapshot() as snap:
+        assert state(snap) == state(session) != initial
+    assert_no_versions(session)
+
+
+def test_snapshot_of_compacted_table():
+    session = DatabaseSession()
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), stable_ids=True)
+    session.insert_many("library", [book(n) for n in range(5)])
+    with session.snapshot() as snap:
+        session.delete("library", isbn__in=[1, 3])
+        session.compact("library")
+        session.insert("library", book(5))
+        assert list(snap.select_rows("library")) == [book(n) for n in range(5)]
+        assert snap.select("library", isbn=4) == {4}
+        assert session.select("library", isbn=4) == {2}
+
+
+def test_snapshot_does_not_wait_for_writer():
+    session = DatabaseSession(concurrent=True, lock_timeout=0.05)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({}))
+    session.insert("library", book(1))
+    locked, done = threading.Event(), threading.Event()
+
+    def writer():
+        with session.transaction():
+            session.insert("library", book(2))
+            locked.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        locked.wait(5)
+        with pytest.raises(TimeoutError):
+            session.select("library")
+        with session.snapshot() as snap:
+            assert list(snap.select_rows("library")) == [book(1)]
+    finally:
+        done.set()
+        thread.join()
+    with session.snapshot() as snap:
+        assert list(snap.select_rows("library")) == [book(1), book(2)]
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_snapshots_see_whole_transactions(columnar):
+    session = DatabaseSession(concurrent=True)
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), columnar=columnar)
+    session.insert_many("library", [Book("Title", "Author", 2000, "Genre", n, 100) for n in range(20)])
+
+    def move_pages():
+        for n in range(200):
+            with session.transaction():
+                session.update("library", {"pages": 100 - n % 7}, isbn=n % 20)
+                session.update("library", {"pages": 100 + n % 7}, isbn=(n + 1) % 20)
+                session.update("library", {"pages": 100}, isbn=(n + 1) % 20)
+                session.update("library", {"pages": 100}, isbn=n % 20)
+
+    def check_total():
+        for _ in range(200):
+            with session.snapshot() as snap:
+                assert sum(row.pages for row in snap.select_rows("library")) == 2000
+
+    run(move_pages, check_total, check_total)
+    assert_no_versions(session)
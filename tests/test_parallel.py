@@ -0,0 +1,141 @@
+import gc
+import threading
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+import src.orm.operators as ops
+from src.orm import parallel as shared_scan
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.columnar import ColumnarCollection
+from src.orm.operators import Bounds
+from src.orm.planner import parse_filters
+from src.orm.table import DictConstraints
+from tests.conftest import book
+
+
+QUERIES = [
+    {"year__ge": 2005, "year__lt": 2010},
+    {"author": "Author 1", "pages__gt": 120},
+    {"genre__in": ["Genre 0"], "title__ge": "Title 3"},
+    {"isbn__in": [1, 5, 200, 10 ** 6]},
+    {"author": "Nobody"},
+]
+
+
+@pytest.fixture(scope="module")
+def sessions():
+    parallel = DatabaseSession(scan_workers=2, scan_threshold=10)
+    serial = DatabaseSession()
+    for session in (parallel, serial):
+        session.create_dtype("BOOK", Book)
+        for stable_ids in (False, True):
+            name = f"library_{stable_ids}"
+            session.create_table(name, "BOOK", DictConstraints({}), stable_ids=stable_ids, columnar=True)
+            session.insert_many(name, [book(n, titles=7, years=20, pages=50) for n in range(500)])
+            session.delete(name, year=2003)
+        session.create_table("rows", "BOOK", DictConstraints({}))
+        session.insert_many("rows", [book(n, titles=7, years=20, pages=50) for n in range(500)])
+    yield parallel, serial
+    parallel.close()
+
+
+@pytest.mark.parametrize("stable_ids", [False, True], ids=["positional", "stable_ids"])
+@pytest.mark.parametrize("filters", QUERIES)
+def test_parallel_scan_matches_serial(sessions, stable_ids, filters):
+    parallel, serial = sessions
+    name = f"library_{stable_ids}"
+    assert parallel.select(name, **filters) == serial.select(name, **filters)
+
+
+def test_shared_columns_follow_table_version(sessions):
+    parallel, serial = sessions
+    for session in (parallel, serial):
+        assert session.select("library_False", author="Author 2", pages=149)
+        session.update("library_False", {"pages": 1}, author="Author 2")
+    assert parallel.select("library_False", pages=1) == serial.select("library_False", pages=1)
+    assert not parallel.select("library_False", author="Author 2", pages=149)
+
+
+def test_row_tables_and_small_tables_are_scanned_serially(sessions):
+    parallel, _ = sessions
+    scanner = parallel._scanner
+    assert scanner.scan(parallel._tables["rows"].collection, [], 0) is None
+    scanner.threshold = 10 ** 6
+    try:
+        assert parallel.select("library_True", year=2004) == {n for n in range(500) if n % 20 == 4}
+        assert scanner.scan(parallel._tables["library_True"].collection, [], 0) is None
+    finally:
+        scanner.threshold = 10
+
+
+def test_shared_columns_are_released(sessions):
+    parallel, _ = sessions
+    scanner = parallel._scanner
+    parallel.create_table("dropped", "BOOK", DictConstraints({}), columnar=True)
+    parallel.insert_many("dropped", [book(n, titles=7, years=20, pages=50) for n in range(100)])
+    assert parallel.select("dropped", year=2004)
+    collection = parallel._tables["dropped"].collection
+    names = [segment.shm.name for segment in scanner._segments[id(collection)][1].values()]
+    parallel.drop_table("dropped")
+    assert id(collection) not in scanner._segments
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(names[0])
+
+    collection = ColumnarCollection(Book)
+    collection.extend(book(n, titles=7, years=20, pages=50) for n in range(100))
+    assert scanner.scan(collection, parse_filters({"year": 2004}), 0)
+    key = id(collection)
+    names = [segment.shm.name for segment in scanner._segments[key][1].values()]
+    del collection
+    gc.collect()
+    assert key not in scanner._segments
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(names[0])
+
+
+def test_segment_in_use_is_freed_after_scan():
+    segment = shared_scan._Segment(array('q', [1, 2, 3]))
+    segment.users += 1
+    segment.release()  # e.g. table changed while another thread waits for workers
+    opened = SharedMemory(segment.shm.name)
+    assert opened.size >= 24
+    opened.close()
+    segment.done()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(segment.shm.name)
+
+
+def test_concurrent_scans(sessions):
+    parallel, serial = sessions
+    results = []
+    threads = [
+        threading.Thread(target=lambda filters=filters: results.append((filters, parallel.select("library_True", **filters))))
+        for filters in QUERIES * 2
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == len(threads)
+    assert all(ids == serial.select("library_True", **filters) for filters, ids in results)
+
+
+def test_chunk_scan_without_numpy(monkeypatch):
+    years = shared_scan._Segment(array('q', [2000 + n % 20 for n in range(100)]))
+    pages = shared_scan._Segment(array('d', [float(n) for n in range(100)]))
+    try:
+        checks = [
+            (years.shm.name, 'q', 100, ops.between, Bounds(2005, 2010, True, False)),
+            (pages.shm.name, 'd', 100, ops.in_, [25.0, 26.0, 45.0, 90.0]),
+        ]
+        expected = [25, 26, 45]
+        if shared_scan.np is not None:
+            assert shared_scan._scan_chunk(checks, 20, 60).tolist() == expected
+        monkeypatch.setattr(shared_scan, "np", None)
+        assert shared_scan._scan_chunk(checks, 20, 60).tolist() == expected
+    finally:
+        years.release()
+        pages.release()
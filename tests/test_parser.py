@@ -0,0 +1,115 @@
+import datetime
+
+import pytest
+
+from src.book import Book
+from src.database.parser import QueryParser, convert_value, typed_values
+from src.database.query_plan import QueryType
+from src.orm.exceptions import ConstraintFailed
+
+
+def test_parse_select():
+    plan = QueryParser.parse('select * from library where year >= 2000 AND genre in ("Sci-Fi", Horror) order by pages desc limit 5')
+    assert plan.operation == QueryType.SELECT
+    assert plan.table == "library"
+    assert plan.kwargs == {
+        "filters": {"year__ge": "2000", "genre__in": ("Sci-Fi", "Horror")},
+        "order_by": "-pages",
+        "limit": 5,
+        "offset": 0,
+    }
+
+
+def test_parse_insert_several_rows():
+    plan = QueryParser.parse('INSERT INTO library (title, pages) VALUES ("A, B", 10),(")", 20)')
+    assert plan.operation == QueryType.INSERT
+    assert plan.kwargs == {"fields": ("title", "pages"), "rows": (("A, B", "10"), (")", "20"))}
+
+
+@pytest.mark.parametrize("query", [
+    "DROP TABLE library",
+    "SELECT library",
+    "SELECT FROM library WHERE year ~ 2000",
+    "SELECT FROM library WHERE year > 2000 year < 2010",
+    "SELECT FROM library WHERE year > 2000 AND year > 2010",
+    "SELECT FROM library LIMIT -1",
+    "INSERT INTO library (title, pages) VALUES (a)",
+    "CREATE DTYPE X (a complex)",
+    "CREATE TABLE x (BOOK",
+    'SELECT FROM library WHERE title = "unterminated',
+])
+def test_parse_errors(query):
+    with pytest.raises(SyntaxError):
+        QueryParser.parse(query)
+
+
+def test_convert_value():
+    assert convert_value("10", int) == 10
+    assert convert_value("1.5", float) == 1.5
+    assert convert_value("False", bool) is False
+    assert convert_value("2020-01-02", datetime.date) == datetime.date(2020, 1, 2)
+    assert convert_value("7", int | None) == 7
+    with pytest.raises(ValueError):
+        convert_value("ten", int)
+
+
+def test_typed_values():
+    filters = {"year__in": ("2000", "2010"), "genre": "10", "unknown__gt": "5"}
+    assert typed_values(Book, filters) == {"year__in": (2000, 2010), "genre": "10", "unknown__gt": "5"}
+
+
+def test_execute_select(db_library_initial_data):
+    books = db_library_initial_data.execute("SELECT FROM library WHERE genre = 'Genre 1' AND pages > 130")
+    assert [book.title for book in books] == ["Title 2"]
+
+    books = db_library_initial_data.execute("SELECT FROM library ORDER BY year DESC LIMIT 2")
+    assert [book.year for book in books] == [2015, 2010]
+
+
+def test_execute_insert_update_delete(db_library_initial_data):
+    session = db_library_initial_data
+    session.execute('INSERT INTO library VALUES ("Title 4", "Author 3", 1999, "Genre 3", 1234567890126, 300)')
+    session.execute('INSERT INTO library (isbn, title, author, year, genre, pages) VALUES (1234567890127, T, A, 1990, "Genre 3", 50)')
+    assert [book.pages for book in session.execute("SELECT FROM library WHERE genre = 'Genre 3'")] == [300, 50]
+
+    session.execute("UPDATE library SET pages = 99, title = New WHERE isbn = 1234567890126")
+    book = session.execute("SELECT FROM library WHERE isbn = 1234567890126")[0]
+    assert (book.title, book.pages) == ("New", 99)
+
+    session.execute("DELETE FROM library WHERE year < 2000")
+    assert sorted(book.year for book in session.execute("SELECT FROM library")) == [2000, 2010, 2015]
+
+
+def test_execute_invalid_value(db_library_initial_data):
+    with pytest.raises(ValueError):
+        db_library_initial_data.execute("SELECT FROM library WHERE year > recent")
+    with pytest.raises(ValueError):
+        db_library_initial_data.execute("INSERT INTO library VALUES (a, b)")
+
+
+def test_execute_multi_row_insert_is_atomic(db_library_initial_data):
+    session = db_library_initial_data
+    before = session.select("library")
+    with pytest.raises(ConstraintFailed):
+        session.execute("INSERT INTO library VALUES (a, A, 1990, G, 1, 10), (b, A, 1990, G, 2, 10), (c, A, 1990, G, 1, 10)")
+    with pytest.raises(ValueError):
+        session.execute("INSERT INTO library VALUES (a, A, 1990, G, 5, 10), (b, A, 1990, G, x, 10)")
+    assert session.select("library") == before
+    session.execute("INSERT INTO library VALUES (a, A, 1990, G, 1, 10), (b, A, 1990, G, 2, 10)")
+    assert [book.title for book in session.execute("SELECT FROM library WHERE isbn < 3")] == ["a", "b"]
+
+
+def test_execute_create(session):
+    session.execute("CREATE DTYPE BOOK (title str, year int, available bool)")
+    session.execute("CREATE TABLE shelf (BOOK) STABLE_IDS")
+    session.execute("INSERT INTO shelf VALUES (a, 2000, true), (b, 2001, no)")
+    assert [book.title for book in session.execute("SELECT FROM shelf WHERE available = true")] == ["a"]
+
+
+def test_plan_cache(db_library_initial_data):
+    session = db_library_initial_data
+    query = "SELECT FROM library WHERE genre = 'Genre 1'"
+    assert session.parse(query) is session.parse(query)
+    assert len(session.execute(query)) == 2
+    stats = session.plan_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 1, 1)
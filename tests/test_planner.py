@@ -0,0 +1,53 @@
+from src.orm.planner import QueryPlanner, parse_filters
+
+
+def test_parse_filters():
+    predicates = parse_filters({"genre": "X", "pages__gt": 10, "title__unknown": "Y"})
+    assert [(p.field, p.op) for p in predicates] == [("genre", "eq"), ("pages", "gt"), ("title__unknown", "eq")]
+
+
+def test_plan_orders_by_selectivity(db_library_initial_data):
+    table = db_library_initial_data._tables["library"]
+    predicates = parse_filters({"pages__gt": 10, "year__ge": 2000, "genre": "Genre 2"})
+    steps = QueryPlanner.plan(predicates, table._indexes, len(table))
+    assert [step.predicate.field for step in steps] == ["genre", "year", "pages"]
+    assert steps[0].estimate == 1
+    assert steps[-1].index is None
+
+
+def test_residual_predicates_skip_full_scan(db_library_initial_data, monkeypatch):
+    table = db_library_initial_data._tables["library"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("full scan is not expected")
+
+    monkeypatch.setattr(table, "_full_scan", fail)
+    res = db_library_initial_data.select("library", pages__gt=120, genre="Genre 1")
+    assert {table[pos].isbn for pos in res} == {1234567890124, 1234567890125}
+
+
+def test_query_does_not_mutate_index(db_library_initial_data):
+    db_library_initial_data.select("library", genre="Genre 1", author="Author 2", year__gt=2010)
+    assert len(db_library_initial_data.select("library", genre="Genre 1")) == 2
+
+
+def test_merge_ranges():
+    predicates = parse_filters({"year__ge": 2000, "genre": "X", "year__lt": 2011, "year__gt": 2000, "pages__gt": 5})
+    assert [(p.field, p.op) for p in predicates] == [("year", "between"), ("genre", "eq"), ("pages", "gt")]
+    bounds = predicates[0].value
+    assert (bounds.low, bounds.low_inclusive, bounds.high, bounds.high_inclusive) == (2000, False, 2011, False)
+
+
+def test_merged_range_uses_single_index_scan(db_library_initial_data, monkeypatch):
+    table = db_library_initial_data._tables["library"]
+    idx = table._indexes["year"]
+    for name in ("find_positions_ge", "find_positions_lt"):
+        monkeypatch.setattr(idx, name, None)
+    assert len(db_library_initial_data.select("library", year__ge=2000, year__lt=2011)) == 2
+    assert len(db_library_initial_data.select("library", year__gt=2000, year__le=2010)) == 1
+    assert len(db_library_initial_data.select("library", year__gt=2015, year__lt=2000)) == 0
+
+
+def test_merged_range_without_index(db_library_initial_data):
+    assert len(db_library_initial_data.select("library", pages__ge=100, pages__lt=150)) == 2
+    assert len(db_library_initial_data.select("library", pages__gt=100, pages__le=150, genre="Genre 1")) == 2
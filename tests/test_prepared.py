@@ -0,0 +1,46 @@
+import pytest
+
+from src.orm.prepared import Param
+
+
+@pytest.mark.parametrize("params", [
+    {"genre": "Genre 1", "min_pages": 100},
+    {"genre": "Genre 2", "min_pages": 50},
+    {"genre": "Missing", "min_pages": 0},
+])
+def test_prepared_matches_select(db_library_initial_data, params):
+    query = db_library_initial_data.prepare("library", genre=Param("genre"), pages__gt=Param("min_pages"), year__le=2015)
+    expected = db_library_initial_data.select("library", genre=params["genre"], pages__gt=params["min_pages"], year__le=2015)
+    assert query.execute(**params) == expected
+
+
+def test_prepared_merged_ranges(db_library_initial_data):
+    query = db_library_initial_data.prepare("library", year__ge=Param("low"), year__lt=Param("high"), pages__ge=Param("low_pages"), pages__lt=150)
+    for low, high in ((2000, 2011), (2010, 2016), (2016, 2020)):
+        expected = db_library_initial_data.select("library", year__ge=low, year__lt=high, pages__ge=100, pages__lt=150)
+        assert query.execute(low=low, high=high, low_pages=100) == expected
+
+
+def test_prepared_follows_index_changes(db_library_initial_data):
+    query = db_library_initial_data.prepare("library", pages__le=Param("pages"))
+    assert len(query.execute(pages=125)) == 2
+    db_library_initial_data.create_idx("library", "range", "pages")
+    assert len(query.execute(pages=125)) == 2
+    assert query._indexes == {"pages": db_library_initial_data._tables["library"]._indexes["pages"]}
+    db_library_initial_data.drop_idx("library", "pages")
+    assert len(query.execute(pages=100)) == 1
+    assert query._indexes == {}
+
+
+def test_prepared_params_validation(db_library_initial_data):
+    query = db_library_initial_data.prepare("library", genre=Param("genre"))
+    with pytest.raises(TypeError):
+        query.execute()
+    with pytest.raises(TypeError):
+        query.execute(genre="Genre 1", year=2000)
+
+
+def test_prepared_unknown_field(db_library_initial_data):
+    query = db_library_initial_data.prepare("library", missing__in=Param("values"), title__ne="x")
+    assert query.execute(values=[None]) == db_library_initial_data.select("library")
+    assert query.execute(values=["y"]) == set()
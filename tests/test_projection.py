@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from src.book import Book
+from src.database.async_session import AsyncDatabaseSession
+
+FILTERS = [
+    {},
+    {"year__ge": 2010},
+    {"year": 2005, "author": "Author 1"},
+    {"year__gt": 2003, "year__lt": 2012, "isbn__in": [1001, 1010, 1020, 1033]},
+    {"author": "Author 2", "pages__gt": 120},
+    {"isbn": 1030},
+    {"year": 3000},
+]
+
+
+@pytest.fixture
+def library_data():
+    return {"rows": 40, "first_year": 2000, "years": 15, "deleted": [1005, 1021]}
+
+
+def _expected(session, fields, **filters):
+    return [tuple(getattr(row, field) for field in fields) for row in session.select_rows("library", **filters)]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("fields", [("isbn", "year"), ("year",), ("author", "isbn", "year")])
+def test_select_fields_matches_rows(db_library_many, fields, filters):
+    expected = _expected(db_library_many, fields, **filters)
+    assert db_library_many.select_fields("library", fields, **filters) == expected
+    db_library_many.create_idx("library", "range", "year", include=("isbn", "author"))
+    assert db_library_many.select_fields("library", fields, **filters) == expected
+    assert db_library_many.select_fields("library", fields, columns=True, **filters) == {
+        field: [values[n] for values in expected] for n, field in enumerate(fields)
+    }
+
+
+def test_covering_index_answers_without_rows(db_library_many, monkeypatch):
+    expected = _expected(db_library_many, ("isbn", "year"), year__ge=2005, author="Author 1")
+    years = [(year, year) for (year,) in _expected(db_library_many, ("year",))]
+    db_library_many.create_idx("library", "range", "year", include=["isbn", "author"])
+    table = db_library_many._tables["library"]
+    assert table.index_types[("year", "isbn", "author")] == "composite"
+
+    def fail(*args, **kwargs):
+        pytest.fail("rows are not expected to be read")
+
+    monkeypatch.setattr(table, "_execute_plan", fail)
+    monkeypatch.setattr(table, "__getitem__", fail)
+    monkeypatch.setattr(table.collection, "take", fail)
+    assert db_library_many.select_fields("library", ("isbn", "year"), year__ge=2005, author="Author 1") == expected
+    assert db_library_many.select_fields("library", ("year", "year")) == years
+
+
+def test_covering_index_follows_changes(db_library_many):
+    db_library_many.create_idx("library", "composite", ("author", "year"), include=("isbn",))
+    db_library_many.update("library", {"isbn": 1}, isbn=1000)
+    db_library_many.update("library", {"year": 2020}, author="Author 0", year__lt=2005)
+    db_library_many.delete("library", author="Author 0", year=2010)
+    db_library_many.insert("library", Book("New", "Author 0", 2020, "Genre 0", 2, 1))
+    expected = _expected(db_library_many, ("isbn", "year"), author="Author 0", year__ge=2010)
+    assert db_library_many.select_fields("library", ("isbn", "year"), author="Author 0", year__ge=2010) == expected
+    assert (1, 2020) in expected and (2, 2020) in expected
+
+
+def test_select_fields_in_snapshot_and_async(db_library_initial_data):
+    session = db_library_initial_data
+    with session.snapshot() as snapshot:
+        session.delete("library", author="Author 2")
+        assert snapshot.select_fields("library", ("title",), author="Author 2") == [("Title 2",), ("Title 3",)]
+    assert session.select_fields("library", ("title",), author="Author 2") == []
+
+    async def scenario():
+        db = AsyncDatabaseSession()
+        db.session.create_dtype("BOOK", Book)
+        db.session.create_table("library", "BOOK", session._tables["library"].constraints)
+        await db.insert_many("library", [Book("A", "B", 2000, "G", 1, 10)])
+        result = await db.select_fields("library", ("isbn", "pages"), columns=True)
+        await db.close()
+        return result
+
+    assert asyncio.run(scenario()) == {"isbn": [1], "pages": [10]}
+
+
+def test_select_fields_errors(db_library_initial_data):
+    with pytest.raises(TypeError):
+        db_library_initial_data.select_fields("library", ("isbn", "unknown"))
+    with pytest.raises(ValueError):
+        db_library_initial_data.create_idx("library", "base", "title", include=("isbn",))
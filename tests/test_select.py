@@ -71,4 +71,24 @@ def test_combined_filters(db_library_initial_data):
 
 def test_no_filters(db_library_initial_data):
     res = db_library_initial_data.select("library")
-    assert len(res) == 3
\ No newline at end of file
+    assert len(res) == 3
+
+def test_ne_operator(db_library_initial_data):
+    res = db_library_initial_data.select("library", genre__ne="Genre 1")
+    assert len(res) == 1
+    books = db_library_initial_data.select_rows("library", pages__ne=100)
+    assert all(b.pages != 100 for b in books)
+
+
+def test_select_rows_view(db_library_initial_data):
+    view = db_library_initial_data.select_rows("library", genre="Genre 1")
+    assert len(view) == 2
+    assert [b.isbn for b in view] == [1234567890124, 1234567890125]
+    assert view[-1].isbn == 1234567890125
+    assert [b.isbn for b in view[1:]] == [1234567890125]
+
+    copy = view.materialize()
+    db_library_initial_data.update("library", {"title": "Changed"}, genre="Genre 1")
+    assert all(b.title == "Changed" for b in view)
+    assert all(b.title != "Changed" for b in copy)
+    assert view != copy
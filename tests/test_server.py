@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import socket
+
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.async_session import AsyncDatabaseSession
+from src.database.client import DatabaseClient, RemoteError, _error
+from src.database.protocol import HEADER, _ROWS, _SIZE, Op, Rows, decode, encode, frame
+from src.database.server import DatabaseServer
+from src.orm.exceptions import ConstraintFailed
+from src.orm.table import DictConstraints
+from tests.conftest import book
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 100, -2 ** 70, 1.5, "", "строка", b"\x00\xff",
+    [], [1, 2, 3], [1, "a", None, [2.5]], (), (1, (2, 3)), {1, 2}, set(), {"a", (1, 2)}, [True, 1],
+    {"year__ge": 2000, "genre__in": ["A", "B"], "isbn__in": {1, 2}}, datetime.date(2024, 2, 29),
+    datetime.datetime(2024, 2, 29, 12, 30, 1, 5), Rows("library", [("a", 1, 2.0), ("b", None, -1.0)]), Rows("empty", []),
+])
+def test_protocol_roundtrip(value):
+    decoded = decode(encode(value))
+    assert decoded == value and type(decoded) is type(value)
+
+
+def test_protocol_rejects_malformed_payload():
+    with pytest.raises(TypeError):
+        encode(object())
+    with pytest.raises(ValueError):
+        decode(encode("text")[:-1])
+    with pytest.raises(ValueError):
+        decode(encode(1) + b"N")
+    with pytest.raises(ValueError):
+        decode(b"?")
+
+
+@pytest.mark.parametrize("payload", [
+    b"R" + encode("x")[1:] + _ROWS.pack(0, 50_000_000),
+    b"R" + encode("x")[1:] + _ROWS.pack(2, 2 ** 32 - 1) + b"N" * 4,
+    b"l" + _SIZE.pack(2 ** 32 - 1) + b"N",
+    b"t" + _SIZE.pack(2 ** 32 - 1),
+    b"S" + _SIZE.pack(1000) + b"N" * 999,
+    b"m" + _SIZE.pack(2) + b"NNN",
+    b"q" + _SIZE.pack(2 ** 32 - 1),
+])
+def test_protocol_rejects_oversized_containers(payload):
+    with pytest.raises(ValueError):
+        decode(payload)
+
+
+def make_db(columnar: bool = False) -> AsyncDatabaseSession:
+    db = AsyncDatabaseSession()
+    db.session.create_dtype("BOOK", Book)
+    db.session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), columnar=columnar)
+    return db
+
+
+def run_with_server(scenario, columnar: bool = False, **server_kwargs):
+    async def main():
+        db = make_db(columnar)
+        async with DatabaseServer(db, **server_kwargs) as server:
+            if isinstance(server.address, str):
+                client = DatabaseClient(path=server.address, pool_size=2, dtypes={"library": Book})
+            else:
+                client = DatabaseClient(*server.address, pool_size=2, dtypes={"library": Book})
+            async with client:
+                result = await scenario(client, db)
+        await db.close()
+        return result
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_client_operations(columnar):
+    async def scenario(client: DatabaseClient, db: AsyncDatabaseSession):
+        await client.ping()
+        await client.insert("library", book(1))
+        await client.insert_many("library", [book(n) for n in range(2, 10)])
+        await client.update("library", {"pages": 1}, author="Author 1")
+        await client.delete("library", year__ge=2008)
+        assert await client.select("library", pages=1) == {0, 3, 6}
+        assert await client.select_many("library", [{"isbn": 2}, {"year__lt": 2003}, {"author": "Nobody"}]) == [{1}, {0, 1}, set()]
+        assert [row.isbn for row in await client.select_rows("library", genre="Genre 0")] == [2, 4, 6]
+        assert [row.isbn for row in await client.iter_rows("library", order_by="-year", limit=3)] == [7, 6, 5]
+        assert list(db.session.select_rows("library")) == await client.select_rows("library")
+
+    run_with_server(scenario, columnar)
+
+
+def test_errors_are_raised_on_client():
+    async def scenario(client: DatabaseClient, _):
+        await client.insert("library", book(1))
+        with pytest.raises(ConstraintFailed) as error:
+            await client.insert("library", book(1))
+        assert error.value.constraint_type == cst.Constraint.UNIQUE and error.value.field == "isbn" and error.value.value == 1
+        with pytest.raises(KeyError):
+            await client.select("unknown")
+        with pytest.raises(SyntaxError):
+            await client.execute("SELECT library")
+        with pytest.raises(TypeError):
+            await client.update("library", {"unknown": 1}, isbn=1)
+        with pytest.raises(TypeError):
+            await client.select("library", year=object())
+        await client.ping()
+        assert all(connection.inflight == 0 for connection in client._pool)
+        assert isinstance(_error(("IndexExists", "Index for year already exists", ())), RemoteError)
+
+    run_with_server(scenario)
+
+
+def test_pipelined_inserts_are_coalesced(monkeypatch):
+    batches = []
+
+    async def scenario(client: DatabaseClient, db: AsyncDatabaseSession):
+        insert_many = db.session.insert_many
+        monkeypatch.setattr(db.session, "insert_many", lambda table_name, rows: batches.append(len(rows)) or insert_many(table_name, rows))
+        await asyncio.gather(*(client.insert("library", book(n)) for n in range(200)))
+        return await client.select_rows("library")
+
+    rows = run_with_server(scenario)
+    assert sorted(rows, key=lambda row: row.isbn) == [book(n) for n in range(200)]
+    assert sum(batches) == 200 and len(batches) < 200
+
+
+def test_execute_text_queries():
+    async def scenario(client: DatabaseClient, _):
+        await client.execute("CREATE DTYPE point (x int, y float)")
+        await client.execute("CREATE TABLE points (point) COLUMNAR")
+        await client.execute("INSERT INTO points VALUES (1, 2.5), (2, 3.5)")
+        assert await client.execute("SELECT FROM points WHERE x >= 2") == [(2, 3.5)]
+        assert await client.execute("SELECT FROM library") == []
+
+    run_with_server(scenario)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not supported")
+def test_unix_socket(tmp_path):
+    async def scenario(client: DatabaseClient, _):
+        await client.insert_many("library", [book(1), book(2)])
+        return await client.select("library", isbn__in=[2, 3])
+
+    assert run_with_server(scenario, path=tmp_path / "db.sock") == {1}
+
+
+def test_serve_forever_requires_start():
+    async def main():
+        db = make_db()
+        with pytest.raises(RuntimeError):
+            await DatabaseServer(db).serve_forever()
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_close_with_connected_client():
+    async def main():
+        db = make_db()
+        server = DatabaseServer(db)
+        await server.start()
+        reader, writer = await asyncio.open_connection(*server.address)
+        writer.write(frame(1, Op.PING, encode(())))
+        size, request_id, _ = HEADER.unpack(await reader.readexactly(HEADER.size))
+        assert request_id == 1 and decode(await reader.readexactly(size)) is None
+        await asyncio.wait_for(server.close(), 5)
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        writer.close()
+        await db.close()
+
+    asyncio.run(main())
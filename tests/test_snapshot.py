@@ -0,0 +1,100 @@
+import datetime
+from dataclasses import dataclass
+
+import pytest
+
+import src.constants as cst
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.exceptions import ConstraintFailed
+from src.orm.table import DictConstraints
+
+
+@dataclass
+class Event:
+    name: str
+    at: datetime.datetime
+    score: float
+    done: bool
+    tags: list
+
+
+def test_save_load(db_library_initial_data, tmp_path):
+    session = db_library_initial_data
+    session.delete("library", title="Title 2")
+    path = tmp_path / "library.snap"
+    session.save(path)
+
+    loaded = DatabaseSession.load(path)
+    source = session._tables["library"]
+    table = loaded._tables["library"]
+    assert loaded._dtypes["BOOK"] is Book
+    assert type(table.collection) is type(source.collection)
+    assert table.stable_ids == source.stable_ids
+    assert list(table.collection.items()) == list(source.collection.items())
+    assert table.index_types == source.index_types == {"isbn": "base", "genre": "base", "author": "base", "year": "range"}
+    assert loaded.select("library", year__gt=2005) == session.select("library", year__gt=2005)
+    assert loaded.select("library", author="Author 2") == session.select("library", author="Author 2")
+
+    with pytest.raises(ConstraintFailed):
+        loaded.insert("library", Book("Title 4", "Author 4", 2001, "Genre 3", 1234567890123, 10))
+    loaded.insert("library", Book("Title 4", "Author 4", 2001, "Genre 3", 1234567890124, 10))
+    assert len(loaded.select("library", genre="Genre 3")) == 1
+
+
+def test_save_load_stable_ids_tombstones(session, tmp_path):
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({}), stable_ids=True)
+    session.create_idx("library", "bitmap", "genre")
+    for n in range(5):
+        session.insert("library", Book(f"Title {n}", "Author", 2000 + n, f"Genre {n % 2}", n, 100))
+    session.delete("library", year__in=[2001, 2003])
+    path = tmp_path / "library.snap"
+    session.save(path)
+
+    loaded = DatabaseSession.load(path)
+    assert loaded.select("library", genre="Genre 0") == {0, 2, 4}
+    assert loaded.select("library", genre="Genre 1") == set()
+    assert loaded.compact("library") == {0: 0, 2: 1, 4: 2}
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_save_load_field_types(session, tmp_path, columnar):
+    session.create_dtype("BOOK", Event)
+    session.create_table("events", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"name"}, [])}), columnar=columnar)
+    events = [
+        Event("start", datetime.datetime(2020, 1, 1), 1.5, True, ["a"]),
+        Event("ünïcode", datetime.datetime(2021, 1, 1), -2.0, False, []),
+    ]
+    for event in events:
+        session.insert("events", event)
+    path = tmp_path / "events.snap"
+    session.save(path)
+
+    loaded = DatabaseSession.load(path)
+    assert list(loaded._tables["events"]) == events
+
+
+def test_save_load_dynamic_dtype(session, tmp_path):
+    session.execute("CREATE DTYPE BOOK (title str, year int)")
+    session.execute("CREATE TABLE shelf (BOOK) COLUMNAR")
+    session.execute("INSERT INTO shelf VALUES (a, 2000), (b, 2001)")
+    path = tmp_path / "shelf.snap"
+    session.save(path)
+
+    loaded = DatabaseSession.load(path)
+    assert [(book.title, book.year) for book in loaded.execute("SELECT FROM shelf WHERE year > 2000")] == [("b", 2001)]
+
+
+def test_save_during_transaction(db_library, tmp_path):
+    db_library.begin()
+    with pytest.raises(RuntimeError):
+        db_library.save(tmp_path / "library.snap")
+    db_library.rollback()
+
+
+def test_load_invalid_file(tmp_path):
+    path = tmp_path / "invalid.snap"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    with pytest.raises(ValueError):
+        DatabaseSession.load(path)
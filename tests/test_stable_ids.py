@@ -0,0 +1,59 @@
+import pytest
+import src.constants as cst
+from src.book import Book
+from src.orm.table import DictConstraints
+
+
+@pytest.fixture
+def stable_library(session):
+    session.create_dtype("BOOK", Book)
+    session.create_table(
+        "library",
+        "BOOK",
+        constraints = DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}),
+        stable_ids = True,
+    )
+    session.create_idx("library", "base", "genre")
+    session.create_idx("library", "range", "year")
+    for n in range(5):
+        session.insert("library", Book(f"Title {n}", "Author", 2000 + n, f"Genre {n % 2}", 1000 + n, 100 + n))
+    yield session
+
+
+def test_delete_keeps_ids(stable_library):
+    stable_library.delete("library", isbn=1001)
+    assert stable_library.select("library", isbn=1003) == {3}
+    assert stable_library.select("library", genre="Genre 1") == {3}
+    assert stable_library.select("library", year__ge=2000) == {0, 2, 3, 4}
+    assert stable_library.select("library") == {0, 2, 3, 4}
+
+
+def test_insert_after_delete_gets_new_id(stable_library):
+    stable_library.delete("library", isbn=1004)
+    stable_library.insert("library", Book("Title 5", "Author", 2010, "Genre 0", 1005, 100))
+    assert stable_library.select("library", isbn=1005) == {5}
+
+
+def test_rollback_delete_restores_id(stable_library):
+    with pytest.raises(RuntimeError):
+        with stable_library.transaction():
+            stable_library.delete("library", genre="Genre 0")
+            assert stable_library.select("library", genre="Genre 0") == set()
+            raise RuntimeError
+    assert stable_library.select("library", genre="Genre 0") == {0, 2, 4}
+    assert stable_library.select("library", year__le=2002) == {0, 1, 2}
+
+
+def test_compact(stable_library):
+    stable_library.delete("library", genre="Genre 1")
+    mapping = stable_library.compact("library")
+    assert mapping == {0: 0, 2: 1, 4: 2}
+    assert stable_library.select("library", isbn=1004) == {2}
+    assert stable_library.select("library", year__gt=2000) == {1, 2}
+    assert stable_library.compact("library") == {}
+
+
+def test_compact_in_transaction(stable_library):
+    with pytest.raises(RuntimeError):
+        with stable_library.transaction():
+            stable_library.compact("library")
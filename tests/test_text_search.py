@@ -0,0 +1,115 @@
+import pytest
+
+import src.orm.operators as ops
+from src.book import Book
+from src.database.parser import QueryParser
+from src.orm.index.index_types import PrefixIndex, TokenIndex, _prefix_bounds
+
+TITLES = ["The Hobbit", "Hobbit Tales", "Dune", "dune Messiah", "Ab", "Straße", "STRASSE", "The Silmarillion", "Hob"]
+
+FILTERS = [
+    {"title__startswith": "Hob"},
+    {"title__startswith": "The "},
+    {"title__startswith": ""},
+    {"title__contains": "obbit"},
+    {"title__contains": "b"},
+    {"title__contains": "une M"},
+    {"title__icontains": "DUNE"},
+    {"title__icontains": "strasse"},
+    {"title__icontains": "xyz"},
+    {"author__startswith": "Author 1"},
+    {"author__contains": "or 2"},
+    {"author__icontains": "AUTHOR"},
+    {"title__icontains": "hobbit", "author__startswith": "Author 0"},
+    {"title__contains": "i", "year__ge": 2004},
+]
+
+
+@pytest.fixture
+def db_library_titles(db_library):
+    db_library.insert_many("library", [
+        Book(title, f"Author {n % 3}", 2000 + n, f"Genre {n % 2}", n, 100 + n) for n, title in enumerate(TITLES)
+    ])
+    yield db_library
+
+
+def _expected(session, **filters):
+    return set(session.select("library", **filters))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_text_indexes_match_scan(db_library_titles, filters):
+    expected = _expected(db_library_titles, **filters)
+    db_library_titles.drop_idx("library", "author")
+    db_library_titles.create_idx("library", "prefix", "title")
+    db_library_titles.create_idx("library", "token", "author")
+    assert set(db_library_titles.select("library", **filters)) == expected
+    db_library_titles.drop_idx("library", "title")
+    db_library_titles.create_idx("library", "token", "title")
+    assert set(db_library_titles.select("library", **filters)) == expected
+
+
+def test_text_operators():
+    assert ops.startswith("Hobbit", "Hob") and not ops.startswith("The Hobbit", "Hob") and not ops.startswith(None, "")
+    assert ops.contains("The Hobbit", "Hob") and not ops.contains("The Hobbit", "hob") and not ops.contains(None, "")
+    assert ops.icontains("The Hobbit", "hOB") and ops.icontains("Straße", "STRASSE")
+    plan = QueryParser.parse('SELECT FROM library WHERE title icontains "dune" AND author startswith A')
+    assert plan.kwargs["filters"] == {"title__icontains": "dune", "author__startswith": "A"}
+
+
+@pytest.mark.parametrize("index_type, filters", [
+    ("prefix", {"title__startswith": "Hob"}),
+    ("token", {"title__contains": "obbit"}),
+    ("token", {"title__icontains": "DUNE"}),
+    ("token", {"title__startswith": "The"}),
+])
+def test_text_search_uses_index(db_library_titles, monkeypatch, index_type, filters):
+    expected = _expected(db_library_titles, **filters)
+    db_library_titles.create_idx("library", index_type, "title")
+    table = db_library_titles._tables["library"]
+    monkeypatch.setattr(table, "_full_scan", lambda *args: pytest.fail("full scan is not expected"))
+    assert db_library_titles.select("library", **filters) == expected
+
+
+def test_token_index_follows_changes(db_library_titles):
+    db_library_titles.create_idx("library", "token", "title")
+    db_library_titles.update("library", {"title": "The Two Towers"}, title="Hobbit Tales")
+    db_library_titles.delete("library", title__icontains="dune")
+    db_library_titles.insert("library", Book("Dune Sands", "Author 9", 1990, "Genre 0", 100, 10))
+    rows = db_library_titles.select_rows
+
+    assert [row.title for row in rows("library", title__contains="obbit")] == ["The Hobbit"]
+    assert [row.title for row in rows("library", title__icontains="dune")] == ["Dune Sands"]
+    assert sorted(row.title for row in rows("library", title__startswith="The T")) == ["The Two Towers"]
+    index = db_library_titles._tables["library"]._indexes["title"]
+    assert all(keys <= index.keys() for keys in index._tokens.values())
+    assert "ssi" not in index._tokens
+
+
+def test_aggregate_over_text_index(db_library_titles, monkeypatch):
+    db_library_titles.drop_idx("library", "author")
+    db_library_titles.create_idx("library", "token", "author")
+    expected = len(db_library_titles.select("library", author__contains="r 1"))
+    table = db_library_titles._tables["library"]
+    monkeypatch.setattr(table, "_execute_plan", lambda *args: pytest.fail("rows are not expected to be read"))
+    assert db_library_titles.aggregate("library", "author", author__contains="r 1") == {"Author 1": {"count": expected}}
+
+
+def test_prefix_bounds():
+    assert _prefix_bounds("ab").high == "ac" and not _prefix_bounds("ab").high_inclusive
+    assert _prefix_bounds("a" + chr(0x10FFFF)).high == "b"
+    assert _prefix_bounds("").high is None
+    index = PrefixIndex("title")
+    index.bulk_load({"a" + chr(0x10FFFF): [0], "b": [1], "a": [2], "ab": [3]})
+    assert index.get_positions_for_query(ops.startswith, "a") == {0, 2, 3}
+    assert list(index.matching_keys(ops.startswith, "a", reverse=True)) == ["a" + chr(0x10FFFF), "ab", "a"]
+
+
+def test_token_index_short_parts():
+    index = TokenIndex("title")
+    index.bulk_load({"Dune": [0, 1], "Du": [2], None: [3]})
+    assert index.get_positions_for_query(ops.contains, "Du") == {0, 1, 2}
+    assert index.estimate_for_query(ops.contains, "une", 4) == 2
+    assert index.estimate_for_query(ops.contains, "xyz", 4) == 0
+    del index["Dune"]
+    assert not index._tokens
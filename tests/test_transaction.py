@@ -0,0 +1,68 @@
+import pytest
+
+from src.database.session import DatabaseSession
+from src.orm.table import Table
+from tests.conftest import book
+
+
+def snapshot(session: DatabaseSession) -> tuple:
+    return (
+        list(session._tables["library"].collection.items()),
+        [session.select("library", author=f"Author {n}") for n in range(4)],
+        session.select("library", year__ge=2005),
+        session.select("library", genre="Genre 0"),
+    )
+
+
+def test_nested_savepoints(db_library_initial_data):
+    session = db_library_initial_data
+    initial = snapshot(session)
+    session.begin()
+    session.insert("library", book(1))
+    after_insert = snapshot(session)
+    first = session.savepoint()
+    session.delete("library", author="Author 2")
+    after_delete = snapshot(session)
+    second = session.savepoint("second")
+    session.update("library", {"author": "Author 3"}, year__ge=2000)
+    session.rollback_to(second)
+    assert snapshot(session) == after_delete
+    session.insert("library", book(2))
+    session.rollback_to(first)
+    assert snapshot(session) == after_insert
+    with pytest.raises(KeyError):
+        session.rollback_to(second)
+    session.rollback()
+    assert snapshot(session) == initial
+
+
+def test_release_savepoint(db_library_initial_data):
+    session = db_library_initial_data
+    with pytest.raises(RuntimeError):
+        session.savepoint()
+    with session.transaction():
+        name = session.savepoint()
+        session.delete("library", genre="Genre 1")
+        session.release(name)
+        with pytest.raises(KeyError):
+            session.rollback_to(name)
+    assert len(session.select_rows("library")) == 1
+
+
+def test_rollback_rebuilds_indexes_once(db_library, monkeypatch):
+    session = db_library
+    session.insert_many("library", [book(n) for n in range(30)])
+    initial = snapshot(session)
+    rebuilds = []
+    rebuild_indexes = Table.rebuild_indexes
+    monkeypatch.setattr(Table, "rebuild_indexes", lambda table: rebuilds.append(table) or rebuild_indexes(table))
+    session.begin()
+    for n in range(0, 30, 3):
+        session.delete("library", isbn=n)
+        session.update("library", {"author": "Author 3"}, isbn=n + 1)
+        session.insert("library", book(100 + n))
+    session.insert_many("library", [book(200 + n) for n in range(5)])
+    session.delete("library", genre="Genre 0")
+    session.rollback()
+    assert snapshot(session) == initial
+    assert len(rebuilds) <= 1
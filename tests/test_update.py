@@ -23,4 +23,31 @@ def test_update_multiple_fields(db_library_initial_data):
 
 def test_update_with_unique_constraint_violation(db_library_initial_data):
     with pytest.raises(ConstraintFailed):
-        db_library_initial_data.update("library", {"isbn": 1234567890123}, isbn=1234567890124)
\ No newline at end of file
+        db_library_initial_data.update("library", {"isbn": 1234567890123}, isbn=1234567890124)
+
+def test_update_many_rows(db_library_initial_data):
+    db_library_initial_data.update("library", {"author": "Author 3", "pages": 10}, author="Author 2")
+    assert not db_library_initial_data.select("library", author="Author 2")
+    updated = db_library_initial_data.select_rows("library", author="Author 3")
+    assert [book.title for book in updated] == ["Title 2", "Title 3"]
+    assert all(book.pages == 10 for book in updated)
+    assert len(db_library_initial_data.select("library", genre="Genre 1", year__ge=2010)) == 2
+
+
+def test_update_unique_field_of_many_rows(db_library_initial_data):
+    with pytest.raises(ConstraintFailed):
+        db_library_initial_data.update("library", {"isbn": 1, "title": "Same"}, genre="Genre 1")
+    assert not db_library_initial_data.select("library", isbn=1)
+    assert not db_library_initial_data.select("library", title="Same")
+
+
+def test_rollback_update(db_library_initial_data):
+    before = list(db_library_initial_data.select_rows("library"))
+    db_library_initial_data.begin()
+    db_library_initial_data.update("library", {"author": "Author 3", "year": 1990}, genre="Genre 1")
+    db_library_initial_data.update("library", {"isbn": 1}, isbn=1234567890123)
+    db_library_initial_data.rollback()
+    assert list(db_library_initial_data.select_rows("library")) == before
+    assert len(db_library_initial_data.select("library", author="Author 2")) == 2
+    assert not db_library_initial_data.select("library", year__lt=2000)
+    assert db_library_initial_data.select("library", isbn=1234567890123)
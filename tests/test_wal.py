@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+
+import pytest
+
+import src.constants as cst
+import src.database.wal as wal
+from src.book import Book
+from src.database.session import DatabaseSession
+from src.orm.table import DictConstraints
+from tests.conftest import book
+
+
+def library(stable_ids: bool = False) -> DatabaseSession:
+    session = DatabaseSession()
+    session.create_dtype("BOOK", Book)
+    session.create_table("library", "BOOK", DictConstraints({cst.Constraint.UNIQUE: ({"isbn"}, [])}), stable_ids=stable_ids)
+    session.create_idx("library", "range", "year")
+    return session
+
+
+def rows(session: DatabaseSession) -> list:
+    return list(session._tables["library"].collection.items())
+
+
+@pytest.mark.parametrize("durability", list(cst.Durability))
+@pytest.mark.parametrize("stable_ids", [False, True], ids=["positional", "stable_ids"])
+def test_replay(tmp_path, durability, stable_ids):
+    path = tmp_path / "library.wal"
+    session = library(stable_ids)
+    assert session.open_wal(path, durability, interval_ms=1) == 0
+    for n in range(3):
+        session.insert("library", book(n))
+    session.insert_many("library", [book(3), book(4)])
+    with session.transaction():
+        session.update("library", {"pages": 1}, year__ge=2003)
+        session.delete("library", author="Author 1")
+    session.begin()
+    session.insert("library", book(10))
+    session.delete("library", year=2000)
+    session.rollback()
+    session.insert("library", book(11))  # gets id of rolled back row
+    with session.transaction():
+        session.insert("library", book(12))
+        savepoint = session.savepoint()
+        session.insert_many("library", [book(13), book(14)])
+        session.rollback_to(savepoint)
+        session.insert("library", book(15))
+    session.begin()
+    session.insert("library", book(16))
+    session.rollback()
+    session.close()
+
+    restored = library(stable_ids)
+    assert restored.open_wal(path) == 7
+    assert rows(restored) == rows(session)
+    assert restored.select("library", year__gt=2001) == session.select("library", year__gt=2001)
+    restored.insert("library", book(20))
+    restored.close()
+
+    again = library(stable_ids)
+    assert again.open_wal(path) == 8
+    assert rows(again) == rows(restored)
+    again.close()
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    path = tmp_path / "library.wal"
+    session = library()
+    session.open_wal(path)
+    session.insert("library", book(1))
+    session.close()
+    with open(path, "ab") as file:
+        file.write(b"\x10\x00\x00\x00garbage")
+
+    restored = library()
+    assert restored.open_wal(path) == 1
+    restored.insert("library", book(2))
+    restored.close()
+    again = library()
+    assert again.open_wal(path) == 2
+    again.close()
+
+
+def test_checkpoint(tmp_path):
+    path, snapshot_path = tmp_path / "library.wal", tmp_path / "library.snap"
+    session = library(stable_ids=True)
+    session.open_wal(path)
+    for n in range(3):
+        session.insert("library", book(n))
+    session.delete("library", isbn=1)
+    session.compact("library")
+    session.checkpoint(snapshot_path)
+    session.insert("library", book(3))
+    session.save(snapshot_path)  # crash before log is truncated: logged transactions are already in snapshot
+    session.insert("library", book(4))
+    session.close()
+
+    restored = DatabaseSession.load(snapshot_path)
+    assert restored.open_wal(path) == 1
+    assert rows(restored) == rows(session) == [(0, book(0)), (1, book(2)), (2, book(3)), (3, book(4))]
+    restored.close()
+
+
+def test_commit_failure_rolls_back(tmp_path):
+    session = library()
+    session.open_wal(tmp_path / "library.wal")
+    session._wal.close()
+    session.begin()
+    session.insert("library", book(1))
+    with pytest.raises(RuntimeError):
+        session.commit()
+    assert rows(session) == []
+    assert session._transaction is None
+
+
+@pytest.mark.parametrize("stable_ids", [False, True], ids=["positional", "stable_ids"])
+def test_autocommit_failure_is_undone(tmp_path, stable_ids):
+    session = library(stable_ids)
+    session.insert_many("library", [book(0), book(1)])
+    session.open_wal(tmp_path / "library.wal")
+    expected = rows(session)
+    with session.snapshot() as snapshot:
+        session._wal.close()
+        for change in (
+            lambda: session.insert("library", book(2)),
+            lambda: session.insert_many("library", [book(3), book(4)]),
+            lambda: session.update("library", {"pages": 1}, isbn=0),
+            lambda: session.delete("library", isbn=1),
+        ):
+            with pytest.raises(RuntimeError):
+                change()
+            assert rows(session) == expected
+        assert session.select("library", year__ge=2000) == {0, 1}
+        assert len(snapshot.select("library")) == 2
+    session._wal = None
+    session.insert("library", book(2))  # unique index was restored too
+    assert rows(session) == [(0, book(0)), (1, book(1)), (2, book(2))]
+
+
+def test_checkpoint_syncs_snapshot_before_truncate(tmp_path, monkeypatch):
+    session = library()
+    session.open_wal(tmp_path / "library.wal")
+    session.insert("library", book(0))
+    calls = []
+    monkeypatch.setattr(os, "fsync", lambda fd: calls.append("fsync"))
+    monkeypatch.setattr(session._wal, "truncate", lambda: calls.append("truncate"))
+    session.checkpoint(tmp_path / "library.snap")
+    assert calls == ["fsync", "fsync", "truncate"]  # snapshot file, its directory, then log
+    session.close()
+
+
+def test_group_commit(tmp_path, monkeypatch):
+    fsync = os.fsync
+    calls = []
+
+    def slow_fsync(fd):
+        calls.append(fd)
+        time.sleep(0.005)
+        fsync(fd)
+
+    monkeypatch.setattr(wal.os, "fsync", slow_fsync)
+    log = wal.WriteAheadLog(tmp_path / "group.wal", cst.Durability.COMMIT)
+    threads = [threading.Thread(target=lambda: [log.append([("D", "t", n, None)]) for n in range(10)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    assert [seq for seq, _ in wal.WriteAheadLog.read(tmp_path / "group.wal")] == list(range(1, 81))
+    assert len(calls) < 80
+
+
+def test_rolled_back_savepoint_is_not_logged(tmp_path):
+    path = tmp_path / "library.wal"
+    session = library()
+    session.open_wal(path)
+    with session.transaction():
+        session.insert("library", book(1))
+        session.savepoint("before_insert")
+        session.insert("library", book(2))
+        session.rollback_to("before_insert")
+        session.insert("library", book(3))
+    session.close()
+
+    restored = library()
+    assert restored.open_wal(path) == 1
+    assert rows(restored) == rows(session) == [(0, book(1)), (1, book(3))]
+    restored.close()